@@ -1,63 +1,470 @@
+import base64
+import json
 import time
-import asyncio
-from fastapi import APIRouter, UploadFile, File, HTTPException, status
+import uuid
+import zipfile
+from typing import List, Optional
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, UploadFile, File, Header, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
-from APP.SCHEMAS.enhancement import EnhancementResponse, EnhancementMetrics
-from APP.SERVICES.pipeline import EnhancementPipeline
+from APP.SCHEMAS.enhancement import (
+    DEFAULT_OUTPUT_QUALITY,
+    BatchItemResult,
+    BatchStreamFormat,
+    EnhancementOptions,
+    EnhancementResponse,
+    EnhancementMetrics,
+    JobStatus,
+    JobStatusResponse,
+    JobSubmitResponse,
+    MetricsMode,
+    MetricsStatusResponse,
+    OutputFormat,
+    ResponseFormat,
+    SpeedTier,
+    UpscaleQuality,
+)
+from APP.SERVICES.batch import BatchProcessor, BatchTooLargeError, SUPPORTED_CONTENT_TYPES
+from APP.SERVICES.dispatcher import EnhancementDispatcher
+from APP.SERVICES.job_queue import Job, QueueFullError, job_queue
+from APP.SERVICES.image_utils import OUTPUT_FORMATS
+from APP.SERVICES.deferred_metrics import deferred_metrics
+from APP.SERVICES.profiler import request_profiler
+from APP.SERVICES.stages import stage_executors
+from APP.SERVICES.startup import startup
 from APP.CORE.config import settings
 from APP.CORE.logging import logger
+from APP.UTILS.timing import stage
 
 router = APIRouter()
 
-# GLOBAL SEMAPHORE
-request_semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_REQUESTS)
+# UPLOADS ARE READ IN CHUNKS OF THIS SIZE
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# RETRY-AFTER (SECONDS) WHILE THE WORKER IS STILL LOADING ITS MODELS
+NOT_READY_RETRY_AFTER = 5
+
+
+def require_ready():
+    """
+    ENHANCEMENT ENDPOINTS ANSWER 503 UNTIL THE MODELS ARE LOADED (THE SAME
+    CONDITION AS /ready), INSTEAD OF FAILING ON AN UNREGISTERED MODEL.
+    """
+    if startup.ready:
+        return
+    if startup.error:
+        raise HTTPException(status_code=503, detail="MODEL LOADING FAILED")
+    raise HTTPException(
+        status_code=503,
+        detail="MODELS ARE STILL LOADING",
+        headers={"Retry-After": str(NOT_READY_RETRY_AFTER)}
+    )
+
+
+async def read_upload(file: UploadFile) -> bytes:
+    """
+    VALIDATES CONTENT TYPE AND SIZE, RETURNS THE RAW UPLOAD BYTES.
+    THE REQUEST BODY IS ALREADY CAPPED BY UploadLimitMiddleware; THIS CHECKS
+    THE FILE ITSELF, STOPPING AT THE FIRST CHUNK OVER THE LIMIT.
+    """
+    # Validate type
+    if file.content_type not in SUPPORTED_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail="ONLY JPEG AND PNG IMAGES ARE SUPPORTED."
+        )
+
+    # Validate size (KNOWN ONCE THE MULTIPART PARSER HAS SPOOLED THE FILE)
+    limit = settings.MAX_UPLOAD_SIZE_BYTES
+    if file.size is not None and file.size > limit:
+        raise HTTPException(status_code=413, detail="FILE TOO LARGE")
+
+    chunks, size = [], 0
+    with stage("upload_read"):
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            size += len(chunk)
+            if size > limit:
+                raise HTTPException(status_code=413, detail="FILE TOO LARGE")
+            chunks.append(chunk)
+
+    return b"".join(chunks)
+
+
+async def read_batch_uploads(files: List[UploadFile]) -> list:
+    """
+    (FILENAME, CONTENT TYPE, BYTES) FOR EVERY FILE OF A BATCH. THE RUNNING
+    TOTAL IS CHECKED PER CHUNK, SO AN OVERSIZED BATCH IS REFUSED AT THE FIRST
+    CHUNK OVER MAX_BATCH_UPLOAD_MB INSTEAD OF AFTER BUFFERING EVERY FILE.
+    """
+    limit = settings.MAX_BATCH_UPLOAD_MB * 1024 * 1024
+    uploads, total = [], 0
+
+    with stage("upload_read"):
+        for file in files:
+            chunks = []
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                total += len(chunk)
+                if total > limit:
+                    raise HTTPException(status_code=413, detail=f"BATCH LARGER THAN {settings.MAX_BATCH_UPLOAD_MB}MB")
+                chunks.append(chunk)
+            uploads.append((file.filename, file.content_type, b"".join(chunks)))
+
+    return uploads
+
+
+def build_response(result: dict, duration_ms: float) -> EnhancementResponse:
+    return EnhancementResponse(
+        success=True,
+        message="IMAGE ENHANCED SUCCESSFULLY",
+        image_base64=base64.b64encode(result["image_bytes"]).decode("utf-8"),
+        media_type=result.get("media_type"),
+        metrics=EnhancementMetrics(**result["metrics"]) if result.get("metrics") else None,
+        metrics_id=result.get("metrics_id"),
+        processing_time_ms=duration_ms,
+        peak_rss_mb=result.get("peak_rss_mb"),
+        trace_id=result.get("trace_id")
+    )
+
+
+def build_binary_response(result: dict, duration_ms: float) -> Response:
+    """
+    RAW IMAGE BODY; METRICS TRAVEL IN X-METRIC-* HEADERS.
+    """
+    if not result.get("success"):
+        raise HTTPException(status_code=500, detail=result.get("message", "IMAGE PROCESSING FAILED"))
+
+    return Response(
+        content=result["image_bytes"],
+        media_type=result["media_type"],
+        headers=binary_headers(result, duration_ms)
+    )
+
+
+def binary_headers(result: dict, duration_ms: float) -> dict:
+    """
+    ONLY THE METRICS THAT WERE COMPUTED ARE SENT (SEE MetricsMode).
+    """
+    headers = {"X-Processing-Time-Ms": f"{duration_ms:.2f}"}
+
+    metrics = result.get("metrics") or {}
+    for key, header in (
+        ("psnr", "X-Metric-PSNR"),
+        ("ssim", "X-Metric-SSIM"),
+        ("lpips", "X-Metric-LPIPS"),
+        ("identity_score", "X-Metric-Identity-Score"),
+    ):
+        if metrics.get(key) is not None:
+            headers[header] = f"{metrics[key]:.4f}"
+    if metrics.get("face_identity_scores"):
+        headers["X-Metric-Face-Identity-Scores"] = json.dumps(metrics["face_identity_scores"], separators=(",", ":"))
+
+    if result.get("metrics_id"):
+        headers["X-Metrics-Id"] = result["metrics_id"]
+    if result.get("peak_rss_mb") is not None:
+        headers["X-Peak-RSS-MB"] = str(result["peak_rss_mb"])
+    if result.get("trace_id"):
+        headers["X-Profile-Trace-Id"] = result["trace_id"]
+    return headers
+
+
+def make_options(output_format: str, quality: int, metrics: Optional[MetricsMode],
+                 speed: Optional[SpeedTier] = None, scale: Optional[float] = None,
+                 upscale_quality: Optional[UpscaleQuality] = None) -> EnhancementOptions:
+    """
+    PER-REQUEST OPTIONS. PARAMETERS LEFT AS NONE KEEP THE SERVER DEFAULTS.
+    """
+    overrides = {"metrics": metrics, "speed": speed, "scale": scale, "upscale_quality": upscale_quality}
+    return EnhancementOptions(
+        output_format=output_format,
+        quality=quality,
+        **{name: value for name, value in overrides.items() if value is not None}
+    )
+
+
+def negotiate_output(
+    response_format: Optional[ResponseFormat],
+    output_format: Optional[OutputFormat],
+    accept: Optional[str]
+) -> tuple:
+    """
+    EXPLICIT QUERY PARAMETERS WIN. OTHERWISE AN `Accept: image/...` HEADER
+    SELECTS A BINARY RESPONSE (AND ITS FORMAT, IF SUPPORTED); ANYTHING ELSE
+    KEEPS THE ORIGINAL JSON RESPONSE.
+    """
+    media_types = {media_type: name for name, (_, media_type, _) in OUTPUT_FORMATS.items()}
+    accepted = [part.split(";")[0].strip() for part in (accept or "").split(",")]
+    wanted = next((media_types[m] for m in accepted if m in media_types), None)
+
+    if response_format is None:
+        binary = wanted is not None or (bool(accepted) and accepted[0] == "image/*")
+        response_format = ResponseFormat.BINARY if binary else ResponseFormat.JSON
+
+    if output_format is not None:
+        return response_format, output_format.value
+    return response_format, wanted or OutputFormat.JPEG.value
+
 
 @router.post(
     "/enhance",
     response_model=EnhancementResponse,
     status_code=status.HTTP_200_OK,
-    summary="ENHANCE A FACE IMAGE"
+    dependencies=[Depends(require_ready)],
+    summary="ENHANCE A FACE IMAGE",
+    responses={200: {"content": {media_type: {} for _, media_type, _ in OUTPUT_FORMATS.values()}}}
 )
-async def enhance_image(file: UploadFile = File(...)):
+async def enhance_image(
+    file: UploadFile = File(...),
+    response_format: Optional[ResponseFormat] = Query(None, description="JSON (BASE64 IMAGE) OR BINARY (RAW IMAGE, METRICS IN HEADERS)"),
+    output_format: Optional[OutputFormat] = Query(None, description="DEFAULTS TO THE ACCEPT HEADER, THEN JPEG"),
+    quality: int = Query(DEFAULT_OUTPUT_QUALITY, ge=1, le=100, description="JPEG / WEBP QUALITY"),
+    metrics: Optional[MetricsMode] = Query(None, description="NONE | FAST | FULL | DEFERRED (DEFAULT FROM SERVER CONFIG)"),
+    speed: Optional[SpeedTier] = Query(None, description="QUALITY | FAST PRECISION TIER (DEFAULT FROM SERVER CONFIG)"),
+    scale: Optional[float] = Query(None, ge=1, le=4, description="OUTPUT SCALE (DEFAULT FROM SERVER CONFIG)"),
+    upscale_quality: Optional[UpscaleQuality] = Query(None, description="FAST | HIGH UPSCALER (DEFAULT FROM SERVER CONFIG)"),
+    accept: Optional[str] = Header(None),
+    x_profile: Optional[str] = Header(None, description="PROFILE THIS REQUEST (EQUAL TO PROFILING_TOKEN)")
+):
     start_time = time.time()
     logger.info(f"RECEIVED REQUEST: {file.filename}")
 
-    # Validate type
-    if file.content_type not in ["image/jpeg", "image/png", "image/jpg"]:
-        raise HTTPException(
-            status_code=400,
-            detail="ONLY JPEG AND PNG IMAGES ARE SUPPORTED."
-        )
-
-    file_bytes = await file.read()
+    response_format, output_format = negotiate_output(response_format, output_format, accept)
+    file_bytes = await read_upload(file)
 
-    # Validate size
-    if len(file_bytes) > settings.MAX_UPLOAD_SIZE_BYTES:
-        raise HTTPException(
-            status_code=413,
-            detail="FILE TOO LARGE"
-        )
+    options = make_options(output_format, quality, metrics, speed, scale, upscale_quality)
 
     try:
-        async with request_semaphore:
-            logger.info("ACQUIRED GPU LOCK. PROCESSING...")
-            from fastapi.concurrency import run_in_threadpool
-            result = await run_in_threadpool(EnhancementPipeline.process_image, file_bytes)
+        result = await EnhancementDispatcher.run(file_bytes, options, profile=request_profiler.requested(x_profile))
 
         duration_ms = (time.time() - start_time) * 1000
         logger.info(f"REQUEST COMPLETED IN {duration_ms:.2f}ms")
 
-        return EnhancementResponse(
-            success=True,
-            message="IMAGE ENHANCED SUCCESSFULLY",
-            image_base64=result["image_base64"],
-            metrics=EnhancementMetrics(**result["metrics"]),
-            processing_time_ms=duration_ms
-        )
+        if response_format == ResponseFormat.BINARY:
+            return build_binary_response(result, duration_ms)
+        # BASE64 OF A MULTI-MEGABYTE IMAGE: OFF THE EVENT LOOP
+        return await stage_executors.run("encode", build_response, result, duration_ms)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"INTERNAL SERVER ERROR: {e}")
         raise HTTPException(
             status_code=500,
             detail="IMAGE PROCESSING FAILED"
         )
+
+
+@router.get(
+    "/metrics/{metrics_id}",
+    response_model=MetricsStatusResponse,
+    summary="GET DEFERRED METRICS OF A PREVIOUS REQUEST"
+)
+async def get_deferred_metrics(metrics_id: str):
+    entry = deferred_metrics.get(metrics_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="METRICS NOT FOUND OR EXPIRED")
+
+    return MetricsStatusResponse(
+        metrics_id=metrics_id,
+        status=entry["status"],
+        metrics=EnhancementMetrics(**entry["metrics"]) if entry["metrics"] else None,
+        error=entry["error"]
+    )
+
+
+# ---------------------------------------------------------
+# BATCH API
+# ---------------------------------------------------------
+def batch_item_result(item, result: dict, duration_ms: float) -> BatchItemResult:
+    if not result.get("success"):
+        return BatchItemResult(
+            index=item.index,
+            filename=item.filename,
+            success=False,
+            message=result.get("message", "IMAGE PROCESSING FAILED"),
+            processing_time_ms=duration_ms
+        )
+    return BatchItemResult(index=item.index, filename=item.filename, **build_response(result, duration_ms).model_dump())
+
+
+async def stream_ndjson(results):
+    try:
+        async for item, result, duration_ms in results:
+            yield batch_item_result(item, result, duration_ms).model_dump_json().encode() + b"\n"
+    finally:
+        # CANCELS UNFINISHED ITEMS IF THE CLIENT WENT AWAY
+        await results.aclose()
+
+
+async def stream_multipart(results, boundary: str):
+    """
+    ONE PART PER ITEM: THE RAW IMAGE WITH X-METRIC-* PART HEADERS, OR A JSON
+    BatchItemResult PART FOR A FAILED ITEM.
+    """
+    try:
+        async for item, result, duration_ms in results:
+            headers = {"X-Item-Index": str(item.index)}
+            if result.get("success"):
+                headers["Content-Type"] = result["media_type"]
+                headers.update(binary_headers(result, duration_ms))
+                body = result["image_bytes"]
+            else:
+                headers["Content-Type"] = "application/json"
+                body = batch_item_result(item, result, duration_ms).model_dump_json().encode()
+            headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(item.filename)}"
+
+            head = "".join(f"{key}: {value}\r\n" for key, value in headers.items())
+            yield f"--{boundary}\r\n{head}\r\n".encode() + body + b"\r\n"
+    finally:
+        await results.aclose()
+
+    yield f"--{boundary}--\r\n".encode()
+
+
+@router.post(
+    "/enhance/batch",
+    summary="ENHANCE MANY IMAGES (FILES OR ZIP), STREAMED IN COMPLETION ORDER",
+    dependencies=[Depends(require_ready)],
+    responses={200: {"content": {"application/x-ndjson": {}, "multipart/mixed": {}}}}
+)
+async def enhance_batch(
+    files: List[UploadFile] = File(..., description="JPEG / PNG IMAGES AND/OR ZIP ARCHIVES OF THEM"),
+    stream_format: BatchStreamFormat = Query(BatchStreamFormat.NDJSON),
+    output_format: OutputFormat = Query(OutputFormat.JPEG),
+    quality: int = Query(DEFAULT_OUTPUT_QUALITY, ge=1, le=100, description="JPEG / WEBP QUALITY"),
+    metrics: Optional[MetricsMode] = Query(None, description="NONE | FAST | FULL | DEFERRED (DEFAULT FROM SERVER CONFIG)"),
+    speed: Optional[SpeedTier] = Query(None, description="QUALITY | FAST PRECISION TIER (DEFAULT FROM SERVER CONFIG)"),
+    scale: Optional[float] = Query(None, ge=1, le=4, description="OUTPUT SCALE (DEFAULT FROM SERVER CONFIG)"),
+    upscale_quality: Optional[UpscaleQuality] = Query(None, description="FAST | HIGH UPSCALER (DEFAULT FROM SERVER CONFIG)"),
+):
+    # UPLOADS ARE CLOSED WHEN THIS HANDLER RETURNS, BEFORE THE STREAM IS SENT
+    uploads = await read_batch_uploads(files)
+
+    try:
+        items = await run_in_threadpool(BatchProcessor.expand, uploads)
+    except BatchTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="INVALID ZIP ARCHIVE")
+
+    if not items:
+        raise HTTPException(status_code=400, detail="NO IMAGES IN BATCH")
+
+    logger.info(f"RECEIVED BATCH: {len(items)} IMAGE(S) FROM {len(files)} UPLOAD(S)")
+    options = make_options(output_format, quality, metrics, speed, scale, upscale_quality)
+    results = BatchProcessor.run(items, options)
+
+    if stream_format == BatchStreamFormat.MULTIPART:
+        boundary = uuid.uuid4().hex
+        return StreamingResponse(
+            stream_multipart(results, boundary),
+            media_type=f"multipart/mixed; boundary={boundary}"
+        )
+    return StreamingResponse(stream_ndjson(results), media_type="application/x-ndjson")
+
+
+# ---------------------------------------------------------
+# ASYNC JOB API
+# ---------------------------------------------------------
+def job_to_response(job: Job) -> JobStatusResponse:
+    result = None
+    if job.result is not None:
+        duration_ms = (job.finished_at - job.created_at) * 1000
+        result = build_response(job.result, duration_ms)
+
+    return JobStatusResponse(
+        job_id=job.job_id,
+        status=job.status,
+        priority=job.priority,
+        queue_position=job_queue.queue_position(job),
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        error=job.error,
+        result=result
+    )
+
+
+@router.post(
+    "/jobs",
+    response_model=JobSubmitResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(require_ready)],
+    summary="SUBMIT AN ENHANCEMENT JOB"
+)
+async def submit_job(
+    file: UploadFile = File(...),
+    priority: int = Query(5, ge=0, le=9, description="0 IS SERVED FIRST, 9 LAST"),
+    output_format: OutputFormat = Query(OutputFormat.JPEG),
+    quality: int = Query(DEFAULT_OUTPUT_QUALITY, ge=1, le=100, description="JPEG / WEBP QUALITY"),
+    metrics: Optional[MetricsMode] = Query(None, description="NONE | FAST | FULL | DEFERRED (DEFAULT FROM SERVER CONFIG)"),
+    speed: Optional[SpeedTier] = Query(None, description="QUALITY | FAST PRECISION TIER (DEFAULT FROM SERVER CONFIG)"),
+    scale: Optional[float] = Query(None, ge=1, le=4, description="OUTPUT SCALE (DEFAULT FROM SERVER CONFIG)"),
+    upscale_quality: Optional[UpscaleQuality] = Query(None, description="FAST | HIGH UPSCALER (DEFAULT FROM SERVER CONFIG)"),
+):
+    logger.info(f"RECEIVED JOB: {file.filename}")
+
+    file_bytes = await read_upload(file)
+
+    options = make_options(output_format, quality, metrics, speed, scale, upscale_quality)
+
+    try:
+        job = job_queue.submit(file_bytes, priority, options)
+    except QueueFullError as e:
+        logger.warning(f"JOB REJECTED: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="SERVER BUSY. JOB QUEUE IS FULL.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    return JobSubmitResponse(
+        job_id=job.job_id,
+        status=job.status,
+        queue_position=job_queue.queue_position(job)
+    )
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=JobStatusResponse,
+    summary="GET JOB STATUS AND RESULT"
+)
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="JOB NOT FOUND")
+    return job_to_response(job)
+
+
+@router.delete(
+    "/jobs/{job_id}",
+    response_model=JobStatusResponse,
+    summary="CANCEL A JOB"
+)
+async def cancel_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="JOB NOT FOUND")
+
+    if job.is_finished:
+        raise HTTPException(status_code=409, detail=f"JOB ALREADY {job.status.value.upper()}")
+
+    return job_to_response(job_queue.cancel(job_id))
+
+
+@router.get(
+    "/jobs/{job_id}/image",
+    summary="DOWNLOAD A FINISHED JOB'S IMAGE (METRICS IN HEADERS)",
+    responses={200: {"content": {media_type: {} for _, media_type, _ in OUTPUT_FORMATS.values()}}}
+)
+async def get_job_image(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="JOB NOT FOUND")
+
+    if job.status != JobStatus.SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"JOB {job.status.value.upper()}")
+
+    return build_binary_response(job.result, (job.finished_at - job.created_at) * 1000)
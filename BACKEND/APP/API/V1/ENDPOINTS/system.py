@@ -0,0 +1,59 @@
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse
+
+from APP.CORE.config import settings
+from APP.SERVICES.deferred_metrics import deferred_metrics
+from APP.SERVICES.job_queue import job_queue
+from APP.SERVICES.model_manager import model_manager
+from APP.SERVICES.profiler import request_profiler
+from APP.SERVICES.result_cache import result_cache
+from APP.SERVICES.single_flight import single_flight
+from APP.SERVICES.stages import stage_executors
+from APP.SERVICES.thread_budget import model_slots, thread_budget
+
+router = APIRouter()
+
+
+@router.get("/stats", summary="QUEUE, CACHE, COALESCING, BATCHING, MODEL POOL, STAGE EXECUTOR AND THREAD BUDGET COUNTERS")
+async def get_stats():
+    gfpgan = model_manager.gfpgan
+    return {
+        "job_queue": job_queue.stats(),
+        "result_cache": result_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "deferred_metrics": deferred_metrics.stats(),
+        "gfpgan_batcher": gfpgan.batcher.stats() if gfpgan and gfpgan.batcher else None,
+        "model_pool": model_manager.pool.stats(),
+        "stage_executors": stage_executors.stats(),
+        "model_slots": model_slots.stats(),
+        "thread_budget": thread_budget.stats(),
+    }
+
+
+# ---------------------------------------------------------
+# PROFILE TRACES (SEE APP/SERVICES/profiler.py)
+# ---------------------------------------------------------
+def check_profiling_access(x_profile: Optional[str]):
+    # WITHOUT A TOKEN TRACES ARE ONLY READABLE ON THE SERVER (PROFILING_DIR)
+    if not settings.PROFILING_ENABLED or not request_profiler.token:
+        raise HTTPException(status_code=404, detail="PROFILING DISABLED")
+    if not request_profiler.authorized(x_profile):
+        raise HTTPException(status_code=403, detail="INVALID PROFILING TOKEN")
+
+
+@router.get("/profiles", summary="LIST STORED PROFILE TRACES (NEWEST LAST)")
+async def list_profiles(x_profile: Optional[str] = Header(None)):
+    check_profiling_access(x_profile)
+    return {"traces": request_profiler.list_traces()}
+
+
+@router.get("/profiles/{trace_id}", summary="DOWNLOAD A CHROME TRACE (chrome://tracing, PERFETTO)")
+async def get_profile(trace_id: str, x_profile: Optional[str] = Header(None)):
+    check_profiling_access(x_profile)
+    path = request_profiler.trace_path(trace_id)
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="TRACE NOT FOUND OR ROTATED OUT")
+    return FileResponse(path, media_type="application/json", filename=f"{trace_id}.json")
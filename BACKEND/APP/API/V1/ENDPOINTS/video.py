@@ -0,0 +1,125 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
+
+from APP.API.V1.ENDPOINTS.enhancement import make_options, require_ready
+from APP.CORE.config import settings
+from APP.CORE.logging import logger
+from APP.SCHEMAS.enhancement import DEFAULT_OUTPUT_QUALITY, MetricsMode, OutputFormat, SpeedTier, UpscaleQuality
+from APP.SERVICES.dispatcher import EnhancementDispatcher
+from APP.SERVICES.video import SUPPORTED_VIDEO_TYPES, VideoDecodeError, VideoPipeline, VideoTooLargeError
+from APP.UTILS.timing import stage
+
+router = APIRouter()
+
+# UPLOADS ARE COPIED TO DISK IN CHUNKS OF THIS SIZE
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+def remove_files(*paths: str):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def save_upload(file: UploadFile, suffix: str) -> str:
+    """
+    COPIES THE UPLOAD TO A TEMP FILE (FFMPEG READS FROM A PATH) WITHOUT
+    HOLDING IT IN MEMORY. RAISES HTTP 413 ABOVE MAX_VIDEO_UPLOAD_MB.
+    SYNCHRONOUS FUNCTION (CALLED INSIDE THREADPOOL).
+    """
+    limit = settings.MAX_VIDEO_UPLOAD_MB * 1024 * 1024
+    copied = 0
+
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as target:
+        while chunk := file.file.read(COPY_CHUNK_BYTES):
+            copied += len(chunk)
+            if copied > limit:
+                break
+            target.write(chunk)
+
+    if copied > limit:
+        remove_files(target.name)
+        raise HTTPException(status_code=413, detail="FILE TOO LARGE")
+    return target.name
+
+
+def video_headers(stats: dict) -> dict:
+    return {
+        "X-Video-Frames": str(stats["frames"]),
+        "X-Video-FPS": f"{stats['fps']:.3f}",
+        "X-Video-Stats": json.dumps(stats, separators=(",", ":")),
+        "X-Processing-Time-Ms": str(stats["processing_time_ms"]),
+        "X-Peak-RSS-MB": str(stats["peak_rss_mb"]),
+    }
+
+
+@router.post(
+    "/enhance",
+    summary="ENHANCE A VIDEO CLIP (MP4 OUT, NO AUDIO; STATS IN HEADERS)",
+    dependencies=[Depends(require_ready)],
+    responses={200: {"content": {"video/mp4": {}}}}
+)
+async def enhance_video(
+    file: UploadFile = File(...),
+    speed: Optional[SpeedTier] = Query(None, description="QUALITY | FAST PRECISION TIER (DEFAULT FROM SERVER CONFIG)"),
+    scale: Optional[float] = Query(None, ge=1, le=4, description="OUTPUT SCALE (DEFAULT FROM SERVER CONFIG)"),
+    upscale_quality: Optional[UpscaleQuality] = Query(None, description="FAST | HIGH UPSCALER (DEFAULT FROM SERVER CONFIG)"),
+):
+    start_time = time.time()
+    logger.info(f"RECEIVED VIDEO: {file.filename}")
+
+    if file.content_type not in SUPPORTED_VIDEO_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"SUPPORTED VIDEO TYPES: {', '.join(SUPPORTED_VIDEO_TYPES)}"
+        )
+
+    with stage("upload_read"):
+        input_path = await run_in_threadpool(save_upload, file, SUPPORTED_VIDEO_TYPES[file.content_type])
+    output_path = input_path + ".out.mp4"
+
+    # METRICS ARE NOT COMPUTED FOR VIDEO; THE FORMAT FIELDS ONLY APPLY TO STILLS
+    options = make_options(OutputFormat.JPEG.value, DEFAULT_OUTPUT_QUALITY, MetricsMode.NONE, speed, scale, upscale_quality)
+    loop = asyncio.get_running_loop()
+    pipeline = VideoPipeline(options, slot=lambda: EnhancementDispatcher.threaded_model_slot(loop))
+
+    success = False
+    try:
+        stats = await run_in_threadpool(pipeline.run, input_path, output_path)
+        success = True
+    except asyncio.CancelledError:
+        # CLIENT DISCONNECTED: THE THREAD WOULD OTHERWISE ENCODE THE WHOLE CLIP
+        pipeline.cancel()
+        raise
+    except VideoDecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except VideoTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.exception(f"VIDEO PROCESSING FAILED: {e}")
+        raise HTTPException(status_code=500, detail="VIDEO PROCESSING FAILED")
+    finally:
+        remove_files(input_path)
+        if not success:
+            remove_files(output_path)
+
+    logger.info(f"VIDEO REQUEST COMPLETED IN {(time.time() - start_time) * 1000:.2f}ms")
+    filename = f"{os.path.splitext(file.filename or 'video')[0]}_enhanced.mp4"
+    return FileResponse(
+        output_path,
+        media_type="video/mp4",
+        filename=filename,
+        headers=video_headers(stats),
+        background=BackgroundTask(remove_files, output_path)
+    )
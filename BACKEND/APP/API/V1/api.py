@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from APP.API.V1.ENDPOINTS import enhancement
+from APP.API.V1.ENDPOINTS import enhancement, system, video
 
 api_router = APIRouter()
 
@@ -8,4 +8,18 @@ api_router.include_router(
     enhancement.router, 
     prefix="/images", 
     tags=["IMAGE ENHANCEMENT"]
-)
\ No newline at end of file
+)
+
+# INCLUDE THE VIDEO ENHANCEMENT ROUTER
+api_router.include_router(
+    video.router,
+    prefix="/videos",
+    tags=["VIDEO ENHANCEMENT"]
+)
+
+# INCLUDE THE SYSTEM (STATS) ROUTER
+api_router.include_router(
+    system.router,
+    prefix="/system",
+    tags=["SYSTEM"]
+)
@@ -1,5 +1,5 @@
 import os
-from typing import List, Union
+from typing import Dict, List, Optional, Union
 from pydantic import AnyHttpUrl, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -41,10 +41,129 @@ class Settings(BaseSettings):
     MODEL_DIR: str = "WEIGHTS"
     GFPGAN_MODEL_PATH: str = "WEIGHTS/GFPGANv1.3.pth"
     REALESRGAN_MODEL_PATH: str = "WEIGHTS/RealESRGAN_x4plus.pth"
+    REALESRGAN_X2_MODEL_PATH: str = "WEIGHTS/RealESRGAN_x2plus.pth"
+    REALESRGAN_COMPACT_MODEL_PATH: str = "WEIGHTS/realesr-general-x4v3.pth"
     
     # INSIGHTFACE MODEL
     INSIGHTFACE_MODEL_NAME: str = "buffalo_l"
 
+    # =========================
+    # SHARED FACE DETECTION
+    # ONE INSIGHTFACE DETECTION PER IMAGE FEEDS BOTH GFPGAN ALIGNMENT AND
+    # IDENTITY SCORING. WHEN TRUE, GFPGAN'S OWN RETINAFACE IS UNLOADED.
+    # =========================
+    SHARED_FACE_DETECTION: bool = True
+    MIN_EYE_DISTANCE: float = 5.0
+
+    # =========================
+    # INFERENCE BACKENDS
+    # torch | torchscript | onnxruntime, CHOSEN PER MODEL.
+    # .onnx / .ts FILES ARE READ FROM NEXT TO THE .pth WEIGHTS AND ARE CREATED
+    # WITH `python -m SCRIPTS.export_onnx` (TORCHSCRIPT IS TRACED AT STARTUP
+    # IF NO .ts FILE EXISTS). WITH BACKEND_PARITY_CHECK EACH EXPORTED BACKEND
+    # IS COMPARED WITH THE EAGER MODEL ON ONE RANDOM INPUT WHEN IT LOADS; ONE
+    # THAT DIFFERS BY MORE THAN THE TOLERANCE IS REPLACED BY THE EAGER MODEL.
+    # =========================
+    GFPGAN_BACKEND: str = "torch"
+    REALESRGAN_BACKEND: str = "torch"
+    BACKEND_PARITY_CHECK: bool = True
+    BACKEND_PARITY_TOLERANCE: float = 1e-3
+    BACKEND_PARITY_TOLERANCE_INT8: float = 0.25
+
+    # =========================
+    # MODEL MEMORY BUDGET
+    # MODELS LOAD ON FIRST USE WHEN LAZY_MODEL_LOADING IS TRUE (OTHERWISE ALL
+    # AT STARTUP). ABOVE MODEL_MEMORY_BUDGET_MB THE LEAST RECENTLY USED IDLE
+    # MODELS ARE UNLOADED; MODELS IN USE BY A REQUEST ARE NEVER EVICTED.
+    # SIZES ARE MEASURED AS RSS GROWTH WHILE LOADING, SO UNDER A BUDGET MODELS
+    # LOAD ONE AT A TIME. 0 = NO BUDGET.
+    # =========================
+    MODEL_MEMORY_BUDGET_MB: int = 0
+    LAZY_MODEL_LOADING: bool = False
+
+    # =========================
+    # PRECISION MODES / SPEED TIERS
+    # fp32 | bf16 (CPU AUTOCAST, FAST ON AVX512-BF16 / AMX) | int8 (DYNAMICALLY
+    # QUANTIZED ONNX, `python -m SCRIPTS.export_onnx --int8`).
+    # REQUESTS PICK A SPEED TIER (quality | fast); EACH TIER MAPS TO ONE
+    # PRECISION FOR THIS DEPLOYMENT. UNAVAILABLE MODES FALL BACK TO fp32.
+    # CHANNELS_LAST APPLIES TO REAL-ESRGAN (GFPGAN HAS 5-D MODULATED WEIGHTS).
+    # =========================
+    SPEED_TIERS: Dict[str, str] = {"quality": "fp32", "fast": "bf16"}
+    DEFAULT_SPEED_TIER: str = "quality"
+    TORCH_CHANNELS_LAST: bool = True
+
+    # =========================
+    # GFPGAN MICRO-BATCHING
+    # ALIGNED 512x512 CROPS FROM CONCURRENT REQUESTS AND MULTI-FACE IMAGES
+    # ARE RESTORED TOGETHER. A BATCH RUNS WHEN FULL OR WHEN THE OLDEST CROP
+    # HAS WAITED GFPGAN_BATCH_WAIT_MS. 1 DISABLES BATCHING. CROSS-REQUEST
+    # BATCHING NEEDS MAX_CONCURRENT_REQUESTS > 1; WITH ONE SLOT ONLY THE FACES
+    # OF EACH IMAGE ARE BATCHED, ON THE REQUEST'S OWN THREAD.
+    # =========================
+    GFPGAN_MAX_BATCH_SIZE: int = 8
+    GFPGAN_BATCH_WAIT_MS: float = 10.0
+
+    # =========================
+    # UPSCALER REGISTRY
+    # REQUESTS ASK FOR AN OUTPUT SCALE (1-4, DEFAULT_UPSCALE_FACTOR) AND AN
+    # UPSCALE QUALITY (fast | high); THE CHEAPEST LOADED MODEL THAT REACHES THE
+    # SCALE AT THAT QUALITY RUNS. x4plus IS REQUIRED (IT COVERS EVERY REQUEST);
+    # THE OTHERS ARE SKIPPED IF THEIR WEIGHTS ARE MISSING.
+    # =========================
+    UPSCALERS: List[str] = ["x4plus", "x2plus", "general-x4v3"]
+    DEFAULT_UPSCALE_QUALITY: str = "high"
+
+    # =========================
+    # FUSED RESTORE + UPSCALE
+    # DEFAULT ORDER: GFPGAN PASTES THE RESTORED FACES AT 1x, THEN THE UPSCALER
+    # RUNS ON THE WHOLE RESTORED FRAME. FUSED: THE UPSCALER RUNS ON THE
+    # ORIGINAL FRAME AND THE 512x512 RESTORED FACES ARE PASTED STRAIGHT ONTO
+    # ITS OUTPUT AT THE TARGET SCALE (GFPGANER'S bg_upsampler FLOW).
+    # NEEDS SHARED_FACE_DETECTION. COMPARE WITH `python -m BENCHMARKS.fused`.
+    # =========================
+    FUSED_UPSCALE: bool = False
+
+    # =========================
+    # STUB MODELS (LOAD TESTING)
+    # STUB_MODELS=true REPLACES GFPGAN, REAL-ESRGAN AND INSIGHTFACE WITH THE
+    # DETERMINISTIC STAND-INS OF APP/MODELS/stubs.py (NO WEIGHTS NEEDED).
+    # EACH CALL TAKES BASE + PER_MP x MEGAPIXELS + PER_FACE x FACES MS (UPSCALE:
+    # FOR X4PLUS, SCALED BY EACH UPSCALER'S relative_cost), TIMES STUB_TIME_SCALE.
+    # THE DEFAULTS ARE ROUGH 4-CORE CPU FIGURES; CALIBRATE WITH BENCHMARKS/suite.py.
+    # STUB_LATENCY_MODE: sleep (NO CPU USED) | spin (BURNS CPU, SHARES CORES)
+    # =========================
+    STUB_MODELS: bool = False
+    STUB_LATENCY_MODE: str = "sleep"
+    STUB_TIME_SCALE: float = 1.0
+    STUB_FACES_PER_IMAGE: int = 1
+    STUB_LATENCY_MS: Dict[str, Dict[str, float]] = {
+        "detect": {"base": 15.0, "per_mp": 60.0},
+        "gfpgan": {"base": 5.0, "per_mp": 40.0, "per_face": 1500.0},
+        "upscale": {"base": 10.0, "per_mp": 20000.0},
+        "embed": {"base": 5.0, "per_face": 20.0},
+    }
+
+    # =========================
+    # MULTI-WORKER PRELOAD
+    # WHEN TRUE, THE GUNICORN MASTER LOADS THE PYTORCH WEIGHTS ONCE BEFORE
+    # FORKING AND WORKERS SHARE THEM COPY-ON-WRITE (SEE gunicorn.conf.py).
+    # JOBS AND DEFERRED METRICS STAY PER WORKER: POLL THEM WITH ONE WORKER ONLY
+    # =========================
+    PRELOAD_MODELS: bool = False
+
+    # =========================
+    # STARTUP
+    # MODELS LOAD CONCURRENTLY IN THE BACKGROUND WHILE THE SERVER ALREADY
+    # ANSWERS /health (LIVENESS). /ready RETURNS 503 UNTIL LOADING AND WARMUP
+    # FINISH: POINT LOAD BALANCER / READINESS PROBES AT /ready. UNTIL THEN THE
+    # ENHANCEMENT ENDPOINTS ALSO ANSWER 503.
+    # PARALLEL_MODEL_LOADING DEFAULTS TO TRUE, OR FALSE UNDER A
+    # MODEL_MEMORY_BUDGET_MB (THE POOL SIZES MODELS BY RSS GROWTH WHILE LOADING).
+    # =========================
+    PARALLEL_MODEL_LOADING: Optional[bool] = None
+    STARTUP_WARMUP: bool = True
+
     # =========================
     # PROCESSING LIMITS
     # MAX UPLOAD SIZE IN MB (CONVERTED TO BYTES BELOW)
@@ -75,8 +194,126 @@ class Settings(BaseSettings):
     MAX_CONCURRENT_REQUESTS: int = 1
     
     # MAX DIMENSION FOR INPUT IMAGES (PIXELS)
+    # REAL-ESRGAN MEMORY IS BOUNDED BY TILING, SO RAISING THIS COSTS LATENCY, NOT RAM
     MAX_INPUT_DIMENSION: int = 800
 
+    # UPLOADS WITH MORE PIXELS (PER THEIR HEADER) ARE REJECTED UNDECODED.
+    # LARGE JPEGS ARE DECODED AT 1/2 - 1/8 SCALE, DOWN TO MAX_INPUT_DIMENSION
+    MAX_INPUT_MEGAPIXELS: int = 100
+
+    # =========================
+    # STAGE EXECUTORS
+    # EACH PIPELINE STAGE RUNS ON ITS OWN THREAD POOL: decode (AND RESIZE),
+    # restore (DETECTION + GFPGAN), upscale, paste (FUSED MODE), metrics AND
+    # encode. ONLY restore, upscale AND paste HOLD A MODEL SLOT (ONE WORKER PER
+    # MAX_CONCURRENT_REQUESTS), SO
+    # THE OTHER STAGES OF NEIGHBOURING REQUESTS OVERLAP WITH INFERENCE. BEYOND
+    # ITS WORKERS A STAGE QUEUES AT MOST STAGE_QUEUE_DEPTH CALLS; MORE WAIT UPSTREAM.
+    # =========================
+    STAGE_WORKERS: Dict[str, int] = {"decode": 2, "metrics": 1, "encode": 2}
+    STAGE_QUEUE_DEPTH: int = 4
+
+    # =========================
+    # THREAD BUDGET
+    # THE WORKER'S CORES ARE SPLIT BETWEEN ITS MODEL SLOTS: EACH GETS
+    # CORES // SLOTS TORCH, ONNX RUNTIME AND OPENCV THREADS. THREAD_AFFINITY
+    # ALSO PINS EACH SLOT'S MODEL THREADS TO ITS OWN CORES (LINUX, ONE
+    # GUNICORN WORKER). AUTO_TUNE_CONCURRENCY BENCHMARKS 1, 2, 4, ... SLOTS UP
+    # TO MAX_CONCURRENT_REQUESTS AT STARTUP AND SERVES WITH THE SMALLEST LEVEL
+    # AFTER WHICH ANOTHER DOUBLING GAINS LESS THAN AUTO_TUNE_MIN_GAIN THROUGHPUT.
+    # =========================
+    THREAD_BUDGET: bool = True
+    THREAD_AFFINITY: bool = False
+    TORCH_INTEROP_THREADS: int = 1
+    AUTO_TUNE_CONCURRENCY: bool = False
+    AUTO_TUNE_IMAGE_SIZE: int = 256
+    AUTO_TUNE_ROUNDS: int = 2
+    AUTO_TUNE_MIN_GAIN: float = 0.1
+
+    # =========================
+    # REAL-ESRGAN TILING
+    # TILE SIZE IS DERIVED PER IMAGE SO THAT TILE_WORKERS CONCURRENT TILES
+    # STAY WITHIN MEMORY_BUDGET_MB. SMALL IMAGES RUN AS A SINGLE TILE.
+    # EACH TILE SEES TILE_PAD PX OF EXTRA CONTEXT (CROPPED BEFORE BLENDING);
+    # PARALLEL TILES SHARE THE SLOT'S TORCH THREADS.
+    # =========================
+    REALESRGAN_MEMORY_BUDGET_MB: int = 1024
+    REALESRGAN_TILE_WORKERS: int = 2
+    REALESRGAN_TILE_OVERLAP: int = 32
+    REALESRGAN_TILE_PAD: int = 16
+
+    # =========================
+    # QUALITY METRICS
+    # DEFAULT_METRICS_MODE: none | fast | full | deferred (OVERRIDABLE PER REQUEST)
+    # FAST MODE COMPARES AT METRICS_FAST_SIZE PX (LONG SIDE); LPIPS IN FULL MODE
+    # RUNS AT MOST AT METRICS_LPIPS_MAX_SIZE PX (0 = INPUT RESOLUTION).
+    # DEFERRED RESULTS ARE KEPT FOR DEFERRED_METRICS_TTL_SECONDS; BEYOND
+    # DEFERRED_METRICS_MAX_PENDING QUEUED EVALUATIONS, METRICS RUN INLINE.
+    # =========================
+    DEFAULT_METRICS_MODE: str = "full"
+    METRICS_FAST_SIZE: int = 256
+    METRICS_LPIPS_MAX_SIZE: int = 512
+    DEFERRED_METRICS_MAX_PENDING: int = 8
+    DEFERRED_METRICS_TTL_SECONDS: int = 600
+
+    # =========================
+    # BATCH ENDPOINT
+    # A BATCH MAY BE SEVERAL FILES OR ZIP ARCHIVES. EACH IMAGE IS STILL LIMITED
+    # BY MAX_UPLOAD_SIZE_MB. AT MOST MAX_CONCURRENT_REQUESTS + BATCH_PREFETCH_ITEMS
+    # IMAGES OF ONE BATCH ARE IN FLIGHT (DECODING / INFERRING / ENCODING).
+    # =========================
+    MAX_BATCH_ITEMS: int = 64
+    MAX_BATCH_UPLOAD_MB: int = 200
+    BATCH_PREFETCH_ITEMS: int = 1
+
+    # =========================
+    # VIDEO ENHANCEMENT
+    # CLIPS ARE DECODED, ENHANCED AND RE-ENCODED (MP4, NO AUDIO) AS A STREAM OF
+    # FRAMES THROUGH QUEUES OF VIDEO_QUEUE_FRAMES, SO MEMORY DOES NOT GROW WITH
+    # CLIP LENGTH. FACES ARE DETECTED EVERY VIDEO_KEYFRAME_INTERVAL FRAMES AND
+    # FOLLOWED WITH OPTICAL FLOW IN BETWEEN; A LANDMARK WHOSE FORWARD-BACKWARD
+    # FLOW ERROR EXCEEDS VIDEO_TRACK_MAX_ERROR PX TRIGGERS A NEW DETECTION.
+    # =========================
+    MAX_VIDEO_UPLOAD_MB: int = 200
+    MAX_VIDEO_FRAMES: int = 1800
+    VIDEO_KEYFRAME_INTERVAL: int = 12
+    VIDEO_TRACK_MAX_ERROR: float = 1.5
+    VIDEO_QUEUE_FRAMES: int = 4
+
+    # =========================
+    # ASYNC JOB QUEUE
+    # JOBS BEYOND MAX_QUEUED_JOBS ARE REJECTED WITH 429 + RETRY-AFTER
+    # JOB_ESTIMATED_SECONDS SEEDS THE RETRY-AFTER ESTIMATE UNTIL REAL TIMINGS EXIST
+    # =========================
+    MAX_QUEUED_JOBS: int = 16
+    JOB_ESTIMATED_SECONDS: int = 10
+    JOB_RESULT_TTL_SECONDS: int = 600
+
+    # =========================
+    # RESULT CACHE
+    # KEYED BY DECODED PIXELS + PIPELINE PARAMETERS. DEFERRED-METRICS
+    # REQUESTS ARE NOT CACHED (THEIR METRICS ID IS SINGLE-USE)
+    # SET RESULT_CACHE_DISK_MB=0 TO KEEP THE CACHE IN MEMORY ONLY
+    # =========================
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MEMORY_MB: int = 256
+    RESULT_CACHE_DIR: str = "CACHE/RESULTS"
+    RESULT_CACHE_DISK_MB: int = 2048
+
+    # =========================
+    # REQUEST PROFILING
+    # WHEN ENABLED, /enhance REQUESTS WITH AN X-Profile HEADER EQUAL TO
+    # PROFILING_TOKEN AND A PROFILING_SAMPLE_RATE FRACTION OF ALL REQUESTS
+    # RUN UNDER torch.profiler. CHROME TRACES ARE KEPT IN PROFILING_DIR (LAST
+    # PROFILING_MAX_TRACES, 0 = ALL) AND SERVED BY /system/profiles. WITHOUT A
+    # TOKEN ONLY SAMPLING RUNS AND THE TRACE ENDPOINTS ARE OFF.
+    # =========================
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_TOKEN: str = ""
+    PROFILING_DIR: str = "CACHE/PROFILES"
+    PROFILING_MAX_TRACES: int = 20
+
 
 # CREATE A SINGLE SETTINGS INSTANCE
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,115 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+
+# =========================
+# PROMETHEUS METRICS
+# EACH WORKER KEEPS ITS OWN VALUES. WITH SEVERAL GUNICORN WORKERS, SET
+# PROMETHEUS_MULTIPROC_DIR (AN EMPTY DIRECTORY) SO /metrics AGGREGATES THEM.
+# =========================
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+# PIPELINE STAGES, IN ORDER (ALSO THE Server-Timing ENTRIES). VIDEO FRAMES
+# OBSERVE detect (KEYFRAMES ONLY), gfpgan AND realesrgan ONCE PER FRAME.
+# paste ONLY RUNS IN FUSED MODE (FUSED_UPSCALE).
+STAGES = (
+    "upload_read", "decode", "video_decode", "detect", "gfpgan", "realesrgan", "paste", "metrics", "encode",
+    "video_encode"
+)
+
+# 5ms .. ~5min: DECODE OF A SMALL JPEG UP TO A 4x UPSCALE ON CPU
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160, 320)
+
+STAGE_SECONDS = Histogram(
+    "luma_stage_seconds", "DURATION OF ONE PIPELINE STAGE", ["stage"], buckets=LATENCY_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "luma_request_seconds", "END-TO-END HTTP REQUEST DURATION", ["endpoint"], buckets=LATENCY_BUCKETS
+)
+SEMAPHORE_WAIT_SECONDS = Histogram(
+    "luma_semaphore_wait_seconds", "TIME SPENT WAITING FOR A MODEL SLOT", buckets=LATENCY_BUCKETS
+)
+FACES_PER_IMAGE = Histogram(
+    "luma_faces_per_image", "FACES DETECTED PER IMAGE", buckets=(0, 1, 2, 3, 5, 8, 13, 21)
+)
+INPUT_MEGAPIXELS = Histogram(
+    "luma_input_megapixels", "DECODED INPUT SIZE BEFORE THE MAX_INPUT_DIMENSION LIMIT",
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 12, 16, 24, 50)
+)
+
+IN_FLIGHT = Gauge(
+    "luma_requests_in_flight", "REQUESTS HOLDING A MODEL SLOT", multiprocess_mode="livesum"
+)
+WAITING = Gauge(
+    "luma_requests_waiting", "REQUESTS WAITING FOR A MODEL SLOT", multiprocess_mode="livesum"
+)
+JOBS_QUEUED = Gauge(
+    "luma_jobs_queued", "ASYNC JOBS WAITING FOR A JOB WORKER", multiprocess_mode="livesum"
+)
+PROCESS_RSS_BYTES = Gauge(
+    "luma_process_rss_bytes", "RESIDENT MEMORY OF THE WORKER", multiprocess_mode="all"
+)
+TORCH_THREADS = Gauge(
+    "luma_torch_threads", "TORCH INTRA-OP THREADS OF THE WORKER", multiprocess_mode="all"
+)
+MODEL_SLOTS = Gauge(
+    "luma_model_slots", "CONCURRENT MODEL SLOTS OF THE WORKER (AFTER AUTO-TUNING)", multiprocess_mode="all"
+)
+
+# STAGE EXECUTORS (APP/SERVICES/stages.py). UTILIZATION OVER ANY RANGE:
+# rate(luma_executor_busy_seconds_total[5m]) / luma_executor_workers
+EXECUTOR_BUSY_SECONDS = Counter(
+    "luma_executor_busy_seconds", "THREAD-SECONDS SPENT RUNNING STAGE CALLS", ["executor"]
+)
+EXECUTOR_WORKERS = Gauge(
+    "luma_executor_workers", "THREADS OF THE STAGE EXECUTOR", ["executor"], multiprocess_mode="all"
+)
+EXECUTOR_PENDING = Gauge(
+    "luma_executor_pending", "STAGE CALLS WAITING FOR A THREAD", ["executor"], multiprocess_mode="livesum"
+)
+EXECUTOR_UTILIZATION = Gauge(
+    "luma_executor_utilization", "BUSY FRACTION OF THE STAGE'S THREADS OVER THE LAST MINUTE",
+    ["executor"], multiprocess_mode="all"
+)
+
+
+def refresh_process_gauges():
+    """
+    POINT-IN-TIME GAUGES. SET EXPLICITLY (NOT VIA CALLBACKS) SO THEY ALSO
+    WORK IN MULTIPROCESS MODE; CALLED AFTER EACH REQUEST AND ON SCRAPE.
+    """
+    import torch
+
+    from APP.SERVICES.job_queue import job_queue
+    from APP.SERVICES.stages import stage_executors
+    from APP.SERVICES.thread_budget import model_slots
+    from APP.UTILS.memory import current_rss_bytes
+
+    PROCESS_RSS_BYTES.set(current_rss_bytes())
+    TORCH_THREADS.set(torch.get_num_threads())
+    MODEL_SLOTS.set(model_slots.limit)
+    JOBS_QUEUED.set(job_queue.stats()["queued"])
+    stage_executors.refresh_gauges()
+
+
+def render_metrics() -> tuple:
+    """
+    (BODY, CONTENT TYPE) FOR THE /metrics ENDPOINT.
+    """
+    refresh_process_gauges()
+
+    registry = REGISTRY
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
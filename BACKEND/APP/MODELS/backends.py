@@ -0,0 +1,228 @@
+import os
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import torch
+
+from APP.CORE.logging import logger
+
+# BACKEND NAME -> CLASS. EXTENDED WITH @register_backend.
+BACKENDS: Dict[str, type] = {}
+
+# PRECISION MODES. bf16 IS AUTOCAST ON THE EAGER MODULE (WEIGHTS STAY FP32 AND
+# ARE SHARED); int8 IS A DYNAMICALLY QUANTIZED ONNX GRAPH, BECAUSE TORCH'S
+# DYNAMIC QUANTIZATION ONLY COVERS nn.Linear AND THESE NETWORKS ARE CONVS.
+PRECISIONS = ("fp32", "bf16", "int8")
+
+
+def register_backend(name: str) -> Callable[[type], type]:
+    def decorator(cls: type) -> type:
+        cls.name = name
+        BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+def artifact_path(model_path: str, backend_name: str, precision: str = "fp32") -> str:
+    """
+    DEFAULT LOCATION OF AN EXPORTED MODEL: NEXT TO THE .pth WEIGHTS.
+    """
+    extension = {"onnxruntime": ".onnx", "torchscript": ".ts"}[backend_name]
+    if precision != "fp32":
+        extension = f".{precision}{extension}"
+    return os.path.splitext(model_path)[0] + extension
+
+
+def precision_backend(backend_name: str, precision: str) -> str:
+    """
+    BACKEND THAT IMPLEMENTS A PRECISION MODE (fp32 KEEPS THE CONFIGURED ONE).
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"UNKNOWN PRECISION: {precision}. CHOOSE FROM {PRECISIONS}")
+    return {"fp32": backend_name, "bf16": "torch", "int8": "onnxruntime"}[precision]
+
+
+def bf16_supported(device: torch.device) -> bool:
+    """
+    TRUE IF THE DEVICE HAS NATIVE BF16 KERNELS (AVX512-BF16 / AMX ON CPU).
+    ELSEWHERE AUTOCAST STILL RUNS, BUT SLOWER THAN FP32.
+    """
+    if device.type == "cuda":
+        return torch.cuda.is_bf16_supported()
+    try:
+        return torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported()
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def resolve_precision(precision: str, model_path: str, device: torch.device) -> str:
+    """
+    THE PRECISION A MODE WILL RUN AT, DECIDED BEFORE ANY BACKEND IS BUILT:
+    FP32 WITHOUT NATIVE BF16 KERNELS OR WITHOUT THE INT8 EXPORT OF model_path.
+    """
+    if precision == "bf16" and not bf16_supported(device):
+        return "fp32"
+    if precision == "int8" and not os.path.exists(artifact_path(model_path, "onnxruntime", "int8")):
+        return "fp32"
+    return precision
+
+
+class ParityError(RuntimeError):
+    """
+    RAISED WHEN AN EXPORTED BACKEND DISAGREES WITH THE EAGER MODEL.
+    """
+
+
+def max_abs_diff(backend: "InferenceBackend", reference: "InferenceBackend", shape: Tuple[int, ...]) -> float:
+    """
+    LARGEST ABSOLUTE OUTPUT DIFFERENCE BETWEEN TWO BACKENDS ON ONE RANDOM INPUT.
+    """
+    sample = torch.rand(*shape) * 2 - 1
+    return (backend(sample).cpu() - reference(sample).cpu()).abs().max().item()
+
+
+class InferenceBackend(ABC):
+    """
+    RUNS ONE NETWORK ON AN NCHW FLOAT TENSOR AND RETURNS AN NCHW FLOAT TENSOR
+    ON THE CPU OR THE MODEL DEVICE. SUBCLASSES MUST BE SAFE TO CALL FROM
+    SEVERAL THREADS AT ONCE (TILE WORKERS, BATCHER).
+    ABSTRACT: A BACKEND WITHOUT __call__ FAILS WHEN create_backend BUILDS IT.
+    """
+
+    name = "base"
+    precision = "fp32"
+
+    @abstractmethod
+    def __call__(self, tensor: torch.Tensor) -> torch.Tensor:
+        """
+        INFERENCE ON ONE NCHW BATCH.
+        """
+
+    @staticmethod
+    def run_chunked(run: Callable[[torch.Tensor], torch.Tensor], tensor: torch.Tensor,
+                    static_batch: Optional[int]) -> torch.Tensor:
+        """
+        GRAPHS TRACED / EXPORTED WITH A FIXED BATCH SIZE ARE FED ONE CHUNK AT A TIME.
+        """
+        if static_batch is None or len(tensor) == static_batch:
+            return run(tensor)
+        return torch.cat([run(tensor[i:i + static_batch]) for i in range(0, len(tensor), static_batch)])
+
+
+@register_backend("torch")
+class TorchEagerBackend(InferenceBackend):
+    """
+    THE PYTORCH MODULE ITSELF. bf16 RUNS UNDER AUTOCAST; channels_last
+    CONVERTS THE (SHARED) WEIGHTS AND THE INPUTS TO NHWC FOR ONEDNN.
+    """
+
+    def __init__(self, module: torch.nn.Module, device: torch.device, half: bool = False,
+                 precision: str = "fp32", channels_last: bool = False, **_):
+        self.module = module.eval()
+        self.device = device
+        self.half = half
+        self.autocast_dtype = torch.bfloat16 if precision == "bf16" else None
+        self.memory_format = torch.channels_last if channels_last else torch.contiguous_format
+        if half:
+            self.module = self.module.half()
+        if channels_last:
+            self.module = self.module.to(memory_format=torch.channels_last)
+
+    @torch.no_grad()
+    def __call__(self, tensor: torch.Tensor) -> torch.Tensor:
+        tensor = tensor.to(self.device, memory_format=self.memory_format)
+        if self.half:
+            tensor = tensor.half()
+        with torch.autocast(self.device.type, dtype=self.autocast_dtype, enabled=self.autocast_dtype is not None):
+            return self.module(tensor).float()
+
+
+@register_backend("torchscript")
+class TorchScriptBackend(InferenceBackend):
+    """
+    LOADS A SCRIPTED MODULE FROM `path` IF IT EXISTS, OTHERWISE TRACES
+    `module` ON `example_shape` (SPATIAL SIZE STAYS FREE FOR CONVNETS).
+    `static_batch` IS SET FOR NETWORKS WHOSE TRACE BAKES IN THE BATCH SIZE.
+    """
+
+    def __init__(self, module: torch.nn.Module, device: torch.device, path: str = None,
+                 example_shape: Tuple[int, ...] = (1, 3, 64, 64), static_batch: Optional[int] = None, **_):
+        self.device = device
+        self.static_batch = static_batch
+        if path and os.path.exists(path):
+            logger.info(f"LOADING TORCHSCRIPT MODULE FROM {path}...")
+            self.module = torch.jit.load(path, map_location=device).eval()
+        else:
+            logger.warning(f"NO TORCHSCRIPT FILE AT {path}. TRACING AT STARTUP.")
+            self.module = trace_module(module, example_shape, device)
+
+    @torch.no_grad()
+    def __call__(self, tensor: torch.Tensor) -> torch.Tensor:
+        return self.run_chunked(lambda chunk: self.module(chunk).float(), tensor.to(self.device), self.static_batch)
+
+
+@register_backend("onnxruntime")
+class OnnxRuntimeBackend(InferenceBackend):
+    """
+    RUNS AN EXPORTED .onnx FILE (SEE SCRIPTS/export_onnx.py).
+    CUDA EXECUTION PROVIDER ON GPU DEVICES, CPU OTHERWISE.
+    THE BATCH SIZE IS FIXED IF THE GRAPH WAS EXPORTED WITHOUT A SYMBOLIC BATCH AXIS.
+    """
+
+    def __init__(self, device: torch.device, path: str = None, **_):
+        import onnxruntime
+
+        if not path or not os.path.exists(path):
+            raise FileNotFoundError(f"MISSING ONNX MODEL: {path}. RUN `python -m SCRIPTS.export_onnx` FIRST.")
+
+        providers = ["CPUExecutionProvider"]
+        if device.type == "cuda":
+            providers.insert(0, ("CUDAExecutionProvider", {"device_id": device.index or 0}))
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        logger.info(f"LOADING ONNX MODEL FROM {path} ON {device.type.upper()}...")
+        self.session = onnxruntime.InferenceSession(path, sess_options=options, providers=providers)
+        graph_input = self.session.get_inputs()[0]
+        self.input_name = graph_input.name
+        # SYMBOLIC AXES ARE STRINGS, FIXED AXES ARE INTS
+        self.static_batch = graph_input.shape[0] if isinstance(graph_input.shape[0], int) else None
+
+    def __call__(self, tensor: torch.Tensor) -> torch.Tensor:
+        return self.run_chunked(self._run, tensor.detach().cpu().float(), self.static_batch)
+
+    def _run(self, tensor: torch.Tensor) -> torch.Tensor:
+        array = np.ascontiguousarray(tensor.numpy())
+        return torch.from_numpy(self.session.run(None, {self.input_name: array})[0])
+
+
+def trace_module(module: torch.nn.Module, example_shape: Tuple[int, ...], device: torch.device) -> torch.jit.ScriptModule:
+    """
+    TRACED AND FROZEN (WEIGHTS INLINED AS CONSTANTS) FOR INFERENCE.
+    """
+    example = torch.rand(*example_shape, device=device)
+    with torch.no_grad():
+        traced = torch.jit.trace(module.eval(), example, check_trace=False)
+    return torch.jit.freeze(traced)
+
+
+def create_backend(name: str, module: torch.nn.Module, device: torch.device, path: Optional[str] = None,
+                   example_shape: Tuple[int, ...] = (1, 3, 64, 64), half: bool = False,
+                   static_batch: Optional[int] = None, precision: str = "fp32",
+                   channels_last: bool = False) -> InferenceBackend:
+    """
+    BUILDS THE NAMED BACKEND FOR A LOADED PYTORCH MODULE.
+    `static_batch` MARKS NETWORKS THAT CANNOT BE TRACED WITH A DYNAMIC BATCH.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"UNKNOWN INFERENCE BACKEND: {name}. CHOOSE FROM {sorted(BACKENDS)}")
+
+    backend = BACKENDS[name](
+        module=module, device=device, path=path, example_shape=example_shape, half=half,
+        static_batch=static_batch, precision=precision, channels_last=channels_last
+    )
+    # THE PRECISION THIS BACKEND RUNS (FALLBACKS REUSE AN FP32 BACKEND)
+    backend.precision = precision
+    return backend
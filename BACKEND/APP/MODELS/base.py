@@ -1,6 +1,18 @@
 from abc import ABC, abstractmethod
+from typing import Dict, Optional
 import torch
 import numpy as np
+from APP.CORE.config import settings
+from APP.CORE.logging import logger
+from APP.MODELS.backends import (
+    InferenceBackend,
+    ParityError,
+    artifact_path,
+    create_backend,
+    max_abs_diff,
+    precision_backend,
+    resolve_precision,
+)
 
 class BaseModel(ABC):
     """
@@ -12,6 +24,11 @@ class BaseModel(ABC):
         self.model_path = model_path
         self.device = torch.device(device)
         self.model = None
+        # INFERENCE BACKEND FOR THE CORE NETWORK (SEE APP/MODELS/backends.py):
+        # ONE PER PRECISION USED BY A SPEED TIER, self.backend IS THE DEFAULT TIER'S
+        self.backend: InferenceBackend = None
+        self.backends: Dict[str, InferenceBackend] = {}
+        self._backend_spec: dict = {}
 
     @abstractmethod
     def load(self):
@@ -26,4 +43,122 @@ class BaseModel(ABC):
         """
         RUN INFERENCE.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def unload(self):
+        """
+        RELEASES THE WEIGHTS (MODEL POOL EVICTION). load() CAN BE CALLED AGAIN.
+        """
+        self.model = None
+        self.backend = None
+        self.backends = {}
+        self._backend_spec = {}
+
+    def memory_bytes(self) -> int:
+        """
+        PARAMETER + BUFFER BYTES OF THE CORE NETWORK (A LOWER BOUND FOR THE MODEL POOL).
+        """
+        module = self._backend_spec.get("module")
+        if module is None:
+            return 0
+        return sum(t.numel() * t.element_size() for t in (*module.parameters(), *module.buffers()))
+
+    def init_backend(self, backend_name: str, module: torch.nn.Module,
+                     example_shape: tuple = (1, 3, 64, 64), half: bool = False,
+                     static_batch: int = None, channels_last: bool = False) -> InferenceBackend:
+        """
+        WRAPS THE LOADED PYTORCH NETWORK IN THE CONFIGURED BACKEND, ONCE PER
+        PRECISION NAMED IN SPEED_TIERS. EXPORTED ARTIFACTS (.onnx / .ts) ARE
+        LOOKED UP NEXT TO THE .pth FILE.
+        """
+        self._backend_spec = {
+            "backend_name": backend_name,
+            "module": module,
+            "example_shape": example_shape,
+            "half": half,
+            "static_batch": static_batch,
+            "channels_last": channels_last,
+        }
+        self.backends = {}
+        for precision in dict.fromkeys(settings.SPEED_TIERS.values()):
+            self.backends[precision] = self.build_backend(precision)
+
+        self.backend = self.backends[settings.SPEED_TIERS[settings.DEFAULT_SPEED_TIER]]
+        return self.backend
+
+    def build_backend(self, precision: str = "fp32") -> InferenceBackend:
+        """
+        BACKEND FOR ONE PRECISION MODE (SEE init_backend). A MODE THAT IS NOT
+        AVAILABLE HERE (NO BF16 KERNELS, NO INT8 EXPORT) FALLS BACK TO FP32.
+        AN EXPORTED BACKEND THAT FAILS ITS PARITY CHECK FALLS BACK TO FP32,
+        OR TO THE EAGER MODULE IF IT IS THE FP32 BACKEND ITSELF.
+        """
+        spec = self._backend_spec
+        name = precision_backend(spec["backend_name"], precision)
+        model_name = type(self).__name__.upper()
+
+        # THE SAME CHECK PREDICTS THE PRECISION OF MODELS NOT LOADED YET (RESULT CACHE KEY)
+        if resolve_precision(precision, self.model_path, self.device) != precision:
+            logger.warning(f"{model_name}: {precision.upper()} UNAVAILABLE ON {self.device}. USING FP32.")
+            return self.backends.get("fp32") or self.build_backend("fp32")
+
+        try:
+            backend = create_backend(
+                name, spec["module"], self.device,
+                path=artifact_path(self.model_path, name, precision) if name != "torch" else None,
+                example_shape=spec["example_shape"],
+                half=spec["half"],
+                static_batch=spec["static_batch"],
+                precision=precision,
+                channels_last=spec["channels_last"]
+            )
+            if name != "torch" and settings.BACKEND_PARITY_CHECK:
+                self.check_parity(backend, precision)
+        except FileNotFoundError as e:
+            if precision == "fp32":
+                raise
+            logger.warning(f"{model_name}: {precision.upper()} UNAVAILABLE ({e}). USING FP32.")
+            return self.backends.get("fp32") or self.build_backend("fp32")
+        except ParityError as e:
+            logger.error(f"{model_name}: {e}")
+            if precision != "fp32":
+                return self.backends.get("fp32") or self.build_backend("fp32")
+            logger.warning(f"{model_name}: USING THE TORCH BACKEND (FP32).")
+            return create_backend("torch", spec["module"], self.device, half=spec["half"],
+                                  channels_last=spec["channels_last"])
+
+        logger.info(f"{model_name} USING {name.upper()} BACKEND ({precision.upper()}).")
+        return backend
+
+    def check_parity(self, backend: InferenceBackend, precision: str):
+        """
+        RUNS THE EXPORTED BACKEND AND THE EAGER MODULE ON ONE RANDOM INPUT OF
+        THE EXAMPLE SHAPE (THE AUTOMATED FORM OF `export_onnx --verify`).
+        RAISES ParityError ABOVE BACKEND_PARITY_TOLERANCE (INT8: ITS OWN TOLERANCE).
+        """
+        spec = self._backend_spec
+        tolerance = settings.BACKEND_PARITY_TOLERANCE_INT8 if precision == "int8" else settings.BACKEND_PARITY_TOLERANCE
+        reference = create_backend("torch", spec["module"], self.device, half=spec["half"])
+        diff = max_abs_diff(backend, reference, spec["example_shape"])
+        if diff > tolerance:
+            raise ParityError(
+                f"{backend.name.upper()} ({precision.upper()}) DIFFERS FROM EAGER BY {diff:.2e} "
+                f"(TOLERANCE {tolerance:.0e}). RE-EXPORT WITH `python -m SCRIPTS.export_onnx --verify`."
+            )
+        logger.info(f"{type(self).__name__.upper()}: {backend.name.upper()} ({precision.upper()}) PARITY OK ({diff:.2e}).")
+
+    def backend_for(self, speed: Optional[str] = None) -> InferenceBackend:
+        """
+        BACKEND FOR A REQUEST'S SPEED TIER (NONE = DEPLOYMENT DEFAULT).
+        """
+        if speed is None:
+            return self.backend
+        return self.backends.get(settings.SPEED_TIERS.get(speed), self.backend)
+
+    def resolved_precision(self, speed: Optional[str] = None) -> str:
+        """
+        THE PRECISION A SPEED TIER ACTUALLY RUNS AT, AFTER FALLBACKS (FP32 FOR
+        A bf16 / int8 TIER THAT IS NOT AVAILABLE HERE).
+        """
+        backend = self.backend_for(speed)
+        return backend.precision if backend is not None else "fp32"
@@ -0,0 +1,132 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, List
+
+from APP.CORE.logging import logger
+
+
+class MicroBatcher:
+    """
+    DYNAMIC MICRO-BATCHING ACROSS CALLER THREADS.
+    CALLERS SUBMIT SINGLE ITEMS AND BLOCK ON A FUTURE; ONE SCHEDULER THREAD
+    COLLECTS ITEMS UNTIL `max_batch_size` IS REACHED OR `max_wait_ms` HAS
+    PASSED SINCE THE FIRST ONE ARRIVED, THEN RUNS THEM AS ONE BATCH.
+    ITEMS ARE ONLY BATCHED WITH OTHERS THAT SHARE THE SAME GROUP KEY.
+    """
+
+    def __init__(self, run_batch: Callable[[Hashable, List[Any]], List[Any]],
+                 max_batch_size: int, max_wait_ms: float, name: str = "batcher"):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue: "queue.Queue" = None
+        self._thread: threading.Thread = None
+
+        self.counters = {"batches": 0, "items": 0, "max_batch": 0}
+
+    # ---------------------------------------------------------
+    # PUBLIC API
+    # ---------------------------------------------------------
+    def submit(self, group: Hashable, item: Any) -> Future:
+        self._ensure_started()
+        future = Future()
+        self._queue.put((group, item, future))
+        return future
+
+    def map(self, group: Hashable, items: List[Any]) -> List[Any]:
+        """
+        SUBMITS ALL ITEMS AT ONCE (SO THEY CAN SHARE A BATCH) AND WAITS.
+        """
+        futures = [self.submit(group, item) for item in items]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """
+        STOPS THE SCHEDULER THREAD ONCE THE QUEUED ITEMS HAVE RUN.
+        """
+        with self._lock:
+            if self._pid == os.getpid():
+                self._queue.put(None)
+            self._pid = None
+
+    def stats(self) -> dict:
+        batches = self.counters["batches"]
+        return {
+            **self.counters,
+            "mean_batch": round(self.counters["items"] / batches, 2) if batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+    # ---------------------------------------------------------
+    # SCHEDULER
+    # ---------------------------------------------------------
+    def _ensure_started(self):
+        # STARTED LAZILY AND PER PROCESS: THREADS DO NOT SURVIVE A GUNICORN FORK
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            logger.info(
+                f"{self.name.upper()} STARTED (MAX BATCH {self.max_batch_size}, MAX WAIT {self.max_wait * 1000:.0f}ms)."
+            )
+
+    def _collect(self) -> list:
+        first = self._queue.get()
+        if first is None:
+            return None
+        pending = [first]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(pending) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                # DRAIN WHAT IS ALREADY QUEUED EVEN AFTER THE DEADLINE
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # close(): RUN WHAT WAS COLLECTED, THEN STOP
+                self._queue.put(None)
+                break
+            pending.append(item)
+
+        return pending
+
+    def _loop(self):
+        while True:
+            pending = self._collect()
+            if pending is None:
+                return
+
+            groups = {}
+            for group, item, future in pending:
+                groups.setdefault(group, []).append((item, future))
+
+            for group, entries in groups.items():
+                items = [item for item, _ in entries]
+                try:
+                    outputs = self.run_batch(group, items)
+                except Exception as e:
+                    for _, future in entries:
+                        future.set_exception(e)
+                    continue
+
+                for (_, future), output in zip(entries, outputs):
+                    future.set_result(output)
+
+                self.counters["batches"] += 1
+                self.counters["items"] += len(items)
+                self.counters["max_batch"] = max(self.counters["max_batch"], len(items))
@@ -0,0 +1,64 @@
+import numpy as np
+
+# FACEXLIB'S 5-POINT TEMPLATE FOR A 512x512 ALIGNED FACE (EYES, NOSE, MOUTH CORNERS)
+FACE_TEMPLATE_512 = np.array([
+    [192.98138, 239.94708], [318.90277, 240.1936], [256.63416, 314.01935],
+    [201.26117, 371.41043], [313.08905, 371.15118],
+], dtype=np.float32)
+
+
+class FaceDetections:
+    """
+    RESULT OF THE SHARED FACE DETECTION STAGE (ONE RUN PER IMAGE).
+    BOXES: (N, 4) x1, y1, x2, y2
+    SCORES: (N,)
+    LANDMARKS: (N, 5, 2) LEFT EYE, RIGHT EYE, NOSE, LEFT MOUTH, RIGHT MOUTH
+    ALL COORDINATES ARE IN PIXELS OF THE IMAGE THAT WAS DETECTED ON.
+    THE LANDMARK ORDER MATCHES BOTH FACEXLIB (GFPGAN) AND INSIGHTFACE.
+    """
+
+    def __init__(self, boxes: np.ndarray, scores: np.ndarray, landmarks: np.ndarray):
+        self.boxes = boxes.reshape(-1, 4).astype(np.float32)
+        self.scores = scores.reshape(-1).astype(np.float32)
+        self.landmarks = landmarks.reshape(-1, 5, 2).astype(np.float32)
+
+    @classmethod
+    def empty(cls) -> "FaceDetections":
+        return cls(np.zeros((0, 4)), np.zeros((0,)), np.zeros((0, 5, 2)))
+
+    @classmethod
+    def grid(cls, num_faces: int, size: int) -> "FaceDetections":
+        """
+        `num_faces` UPRIGHT FACES FILLING A SQUARE GRID OVER THE TOP-LEFT
+        size x size PIXELS (BENCHMARK IMAGES AND THE STUB DETECTOR).
+        """
+        if num_faces == 0:
+            return cls.empty()
+
+        grid = int(np.ceil(np.sqrt(num_faces)))
+        cell = size // grid
+        boxes, landmarks = [], []
+        for i in range(num_faces):
+            row, col = divmod(i, grid)
+            offset = np.array([col * cell, row * cell], dtype=np.float32)
+            boxes.append([offset[0], offset[1], offset[0] + cell, offset[1] + cell])
+            landmarks.append(FACE_TEMPLATE_512 * (cell / 512) + offset)
+
+        return cls(np.array(boxes), np.ones(num_faces), np.stack(landmarks))
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def filter(self, keep: np.ndarray) -> "FaceDetections":
+        return FaceDetections(self.boxes[keep], self.scores[keep], self.landmarks[keep])
+
+    def scaled(self, fx: float, fy: float = None) -> "FaceDetections":
+        """
+        SAME FACES IN THE COORDINATES OF AN IMAGE RESIZED BY (fx, fy).
+        """
+        fy = fx if fy is None else fy
+        return FaceDetections(
+            self.boxes * np.array([fx, fy, fx, fy], dtype=np.float32),
+            self.scores,
+            self.landmarks * np.array([fx, fy], dtype=np.float32)
+        )
@@ -1,9 +1,59 @@
 import os
+import copy
+import cv2
 import torch
 import numpy as np
-from gfpgan import GFPGANer
+from APP.CORE.config import settings
 from APP.CORE.logging import logger
 from APP.MODELS.base import BaseModel
+from APP.MODELS.batching import MicroBatcher
+from APP.MODELS.detections import FaceDetections
+from APP.UTILS.timing import annotate
+
+class GFPGANInferenceModule(torch.nn.Module):
+    """
+    GFPGAN FORWARD AS A PLAIN TENSOR -> TENSOR MODULE, SO EVERY BACKEND
+    (EAGER, TORCHSCRIPT, ONNX) RUNS THE SAME GRAPH.
+    NOISE INPUTS USE THE FIXED BUFFERS (randomize_noise=False), WHICH MAKES
+    THE OUTPUT DETERMINISTIC (REQUIRED FOR CACHING AND BACKEND PARITY).
+    """
+
+    def __init__(self, gfpgan: torch.nn.Module):
+        super().__init__()
+        self.gfpgan = gfpgan
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.gfpgan(x, return_rgb=False, randomize_noise=False)[0]
+
+
+class FaceRestoration:
+    """
+    THE FACES OF ONE IMAGE, RESTORED BUT NOT YET PASTED BACK (FUSED UPSCALING).
+    `helper` HOLDS THE INPUT IMAGE, THE RESTORED CROPS AND THEIR ALIGNMENTS;
+    NONE WHEN THE IMAGE HAS NO FACES. THE HELPER SHARES THE PARSING NETWORK OF
+    THE GFPGAN INSTANCE THAT MADE IT: keep() HOLDS THAT INSTANCE (AND ITS MODEL
+    POOL PIN) UNTIL release(), SO IT CANNOT BE EVICTED BEFORE THE PASTE.
+    """
+
+    def __init__(self, image: np.ndarray, helper=None):
+        self.image = image
+        self.helper = helper
+        self.model = None
+        self._pin = None
+
+    def keep(self, model, pin):
+        """
+        `pin` IS AN ExitStack HOLDING THE MODEL POOL PIN OF `model`.
+        """
+        self.model = model
+        self._pin = pin
+
+    def release(self):
+        # IDEMPOTENT: CALLED AFTER THE PASTE AND ON EVERY FAILURE PATH
+        pin, self._pin = self._pin, None
+        if pin is not None:
+            pin.close()
+
 
 class GFPGANWrapper(BaseModel):
     def load(self):
@@ -15,6 +65,9 @@ class GFPGANWrapper(BaseModel):
             raise FileNotFoundError(f"MISSING WEIGHTS: {self.model_path}")
 
         try:
+            # IMPORTED HERE: GFPGAN PULLS IN BASICSR, TORCHVISION AND FACEXLIB
+            from gfpgan import GFPGANer
+
             logger.info(f"LOADING GFPGAN FROM {self.model_path} ON {self.device}...")
             
             # INITIALIZE THE GFPGANER
@@ -29,21 +82,66 @@ class GFPGANWrapper(BaseModel):
                 bg_upsampler=None, # WE DISABLE INTERNAL BG UPSAMPLER
                 device=self.device
             )
+
+            # FACES COME FROM THE SHARED DETECTION STAGE, SO GFPGAN'S OWN
+            # RETINAFACE (RESNET50) IS NEVER CALLED. FREE ITS WEIGHTS.
+            if settings.SHARED_FACE_DETECTION:
+                self.model.face_helper.face_det = None
+
+            # THE STYLEGAN DECODER FIXES THE INPUT AT 512x512, AND ITS MODULATED
+            # CONVS (PER-SAMPLE WEIGHTS) TIE TRACED / EXPORTED GRAPHS TO ONE FACE.
+            # NO CHANNELS_LAST: THE MODULATED CONV WEIGHTS ARE 5-D
+            self.init_backend(
+                settings.GFPGAN_BACKEND,
+                GFPGANInferenceModule(self.model.gfpgan),
+                example_shape=(1, 3, 512, 512),
+                static_batch=1
+            )
+
+            # ALIGNED CROPS FROM ALL CONCURRENT REQUESTS SHARE FORWARD PASSES.
+            # WITH ONE MODEL SLOT NO TWO REQUESTS RESTORE AT ONCE: THE BATCHER
+            # WOULD ONLY ADD A THREAD HOP AND GFPGAN_BATCH_WAIT_MS
+            self.batcher = None
+            if settings.GFPGAN_MAX_BATCH_SIZE > 1 and settings.MAX_CONCURRENT_REQUESTS > 1:
+                self.batcher = MicroBatcher(
+                    run_batch=self.restore_batch,
+                    max_batch_size=settings.GFPGAN_MAX_BATCH_SIZE,
+                    max_wait_ms=settings.GFPGAN_BATCH_WAIT_MS,
+                    name="gfpgan-batcher"
+                )
+
             logger.info("GFPGAN LOADED SUCCESSFULLY.")
             
         except Exception as e:
             logger.error(f"FAILED TO LOAD GFPGAN: {e}")
             raise e
 
-    def predict(self, img: np.ndarray) -> np.ndarray:
+    def unload(self):
+        # THE BATCHER THREAD HOLDS restore_batch (AND SO THIS WRAPPER)
+        if self.batcher is not None:
+            self.batcher.close()
+            self.batcher = None
+        super().unload()
+
+    def predict(self, img: np.ndarray, weight: float = 0.5, detections: FaceDetections = None,
+                speed: str = None) -> np.ndarray:
         """
         RESTORES FACES IN THE INPUT IMAGE.
         INPUT: NUMPY ARRAY (BGR)
         OUTPUT: NUMPY ARRAY (BGR)
+        WITH `detections`, THE GIVEN LANDMARKS ARE USED FOR ALIGNMENT AND
+        GFPGAN'S INTERNAL FACE DETECTOR IS SKIPPED. `speed` SELECTS THE
+        PRECISION (SPEED_TIERS) AND ONLY APPLIES WITH `detections`.
         """
         if self.model is None:
             raise RuntimeError("GFPGAN MODEL NOT LOADED")
 
+        if detections is not None:
+            return self.restore_detected(img, detections, weight, speed)
+
+        if self.model.face_helper.face_det is None:
+            raise RuntimeError("GFPGAN DETECTOR UNLOADED (SHARED_FACE_DETECTION). PASS DETECTIONS.")
+
         # GFPGANER.ENHANCE RETURNS: (CROPPED_FACES, RESTORED_FACES, RESTORED_IMG)
         # WE ONLY CARE ABOUT THE FINAL RESTORED IMAGE
         _, _, restored_img = self.model.enhance(
@@ -51,7 +149,131 @@ class GFPGANWrapper(BaseModel):
             has_aligned=False, 
             only_center_face=False, 
             paste_back=True,
-            weight=0.5 # BALANCE BETWEEN ORIGINAL AND RESTORED (0.5 IS SAFE)
+            weight=weight # BALANCE BETWEEN ORIGINAL AND RESTORED (0.5 IS SAFE)
         )
         
-        return restored_img
\ No newline at end of file
+        return restored_img
+
+    def restore_detected(self, img: np.ndarray, detections: FaceDetections, weight: float = 0.5,
+                         speed: str = None) -> np.ndarray:
+        """
+        ALIGN -> RESTORE -> PASTE BACK USING PRE-COMPUTED LANDMARKS.
+        MIRRORS GFPGANER.ENHANCE WITHOUT ITS DETECTION STEP.
+        """
+        return self.paste_faces(self.restore_faces(img, detections, weight, speed))
+
+    def restore_faces(self, img: np.ndarray, detections: FaceDetections, weight: float = 0.5,
+                      speed: str = None) -> FaceRestoration:
+        """
+        ALIGN -> RESTORE, WITHOUT PASTING BACK (SEE paste_faces).
+        """
+        if len(detections) == 0:
+            return FaceRestoration(img)
+
+        # SHALLOW COPY: SHARES THE PARSING NETWORK, BUT clean_all() GIVES THIS
+        # CALL ITS OWN LANDMARK / CROP / AFFINE LISTS (SAFE ACROSS THREADS)
+        helper = copy.copy(self.model.face_helper)
+        helper.clean_all()
+
+        with annotate("gfpgan:align"):
+            helper.read_image(img)
+
+            for box, score, landmark in zip(detections.boxes, detections.scores, detections.landmarks):
+                helper.det_faces.append(np.append(box, score))
+                helper.all_landmarks_5.append(landmark)
+
+            helper.align_warp_face()
+
+        # CROPS ARE ONLY BATCHED WITH CROPS OF THE SAME SPEED TIER. WITHOUT
+        # THE BATCHER THE FACES OF THIS IMAGE STILL SHARE FORWARD PASSES
+        with annotate(f"gfpgan:restore x{len(helper.cropped_faces)}"):
+            if self.batcher is not None:
+                restored_faces = self.batcher.map((weight, speed), helper.cropped_faces)
+            else:
+                size = max(1, settings.GFPGAN_MAX_BATCH_SIZE)
+                restored_faces = [
+                    face
+                    for i in range(0, len(helper.cropped_faces), size)
+                    for face in self.restore_batch((weight, speed), helper.cropped_faces[i:i + size])
+                ]
+
+        for restored_face in restored_faces:
+            helper.add_restored_face(restored_face)
+        return FaceRestoration(img, helper)
+
+    def paste_faces(self, restoration: FaceRestoration, background: np.ndarray = None,
+                    scale: float = 1.0) -> np.ndarray:
+        """
+        PASTES RESTORED FACES ONTO `background`: THE INPUT ITSELF (scale 1), OR
+        THE INPUT ALREADY UPSCALED BY `scale`. IN THE LATTER CASE THE 512x512
+        CROPS ARE WARPED STRAIGHT TO THE OUTPUT RESOLUTION (GFPGANER'S
+        bg_upsampler FLOW), SO FACE DETAIL IS NOT LOST TO A 1x PASTE AND THE
+        FACES SKIP THE UPSCALER'S SECOND PASS.
+        """
+        if restoration.helper is None:
+            return background if background is not None else restoration.image
+
+        helper = restoration.helper
+        helper.upscale_factor = scale
+        with annotate("gfpgan:paste"):
+            helper.get_inverse_affine(None)
+            output = helper.paste_faces_to_input_image(upsample_img=background)
+
+        # THE PASTE SIZES ITS CANVAS WITH int(), THE UPSCALER WITH round()
+        if background is not None and output.shape != background.shape:
+            output = cv2.resize(output, (background.shape[1], background.shape[0]), interpolation=cv2.INTER_LANCZOS4)
+        return output
+
+    @torch.no_grad()
+    def restore_face(self, cropped_face: np.ndarray, weight: float = 0.5, speed: str = None) -> np.ndarray:
+        """
+        RUNS THE GFPGAN NETWORK ON ONE ALIGNED 512x512 CROP (BGR UINT8).
+        """
+        from basicsr.utils import img2tensor, tensor2img
+        from torchvision.transforms.functional import normalize
+
+        cropped_face_t = img2tensor(cropped_face / 255., bgr2rgb=True, float32=True)
+        normalize(cropped_face_t, (0.5, 0.5, 0.5), (0.5, 0.5, 0.5), inplace=True)
+        cropped_face_t = cropped_face_t.unsqueeze(0).to(self.device)
+
+        try:
+            # `weight` IS ACCEPTED FOR API COMPATIBILITY; GFPGANv1Clean IGNORES IT
+            output = self.backend_for(speed)(cropped_face_t)
+            restored_face = tensor2img(output.squeeze(0), rgb2bgr=True, min_max=(-1, 1))
+        # ANY BACKEND: TORCH RuntimeError, TORCHSCRIPT JIT ERRORS, ONNX RUNTIME Fail / InvalidArgument
+        except Exception as error:
+            logger.warning(f"GFPGAN INFERENCE FAILED FOR ONE FACE: {error}")
+            restored_face = cropped_face
+
+        return restored_face.astype("uint8")
+
+    @torch.no_grad()
+    def restore_batch(self, group: tuple, cropped_faces: list) -> list:
+        """
+        RUNS THE GFPGAN NETWORK ON N ALIGNED 512x512 CROPS AS ONE (N, 3, 512, 512) BATCH.
+        `group` IS THE BATCHER KEY (WEIGHT, SPEED TIER).
+        CALLED FROM THE BATCHER THREAD. FALLS BACK TO ONE CROP AT A TIME IF
+        THE BATCH FAILS (E.G. OUT OF MEMORY).
+        """
+        from basicsr.utils import img2tensor, tensor2img
+        from torchvision.transforms.functional import normalize
+
+        weight, speed = group
+        if len(cropped_faces) == 1:
+            return [self.restore_face(cropped_faces[0], weight, speed)]
+
+        batch = torch.stack([
+            normalize(img2tensor(face / 255., bgr2rgb=True, float32=True), (0.5, 0.5, 0.5), (0.5, 0.5, 0.5))
+            for face in cropped_faces
+        ]).to(self.device)
+
+        try:
+            output = self.backend_for(speed)(batch)
+        except Exception as error:
+            logger.warning(f"GFPGAN BATCH OF {len(cropped_faces)} FAILED ({error}). RETRYING ONE BY ONE.")
+            return [self.restore_face(face, weight, speed) for face in cropped_faces]
+
+        return [
+            tensor2img(face_t, rgb2bgr=True, min_max=(-1, 1)).astype("uint8")
+            for face_t in output
+        ]
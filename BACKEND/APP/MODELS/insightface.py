@@ -1,14 +1,18 @@
 import numpy as np
-from insightface.app import FaceAnalysis
+from APP.CORE.config import settings
 from APP.CORE.logging import logger
 from APP.MODELS.base import BaseModel
+from APP.MODELS.detections import FaceDetections
 
 
 class InsightFaceWrapper(BaseModel):
-    def __init__(self, model_name: str, device):
+    def __init__(self, model_name: str, device, num_threads: int = 0):
         # INSIGHTFACE USES A MODEL NAME (E.G., antelopev2)
         # MODELS ARE DOWNLOADED AUTOMATICALLY TO ~/.insightface/models
         super().__init__(model_path=model_name, device=device)
+        # ONNX RUNTIME INTRA-OP THREADS PER SESSION (0 = ONE PER CORE)
+        self.num_threads = num_threads
+        self.providers = None
 
     def load(self):
         """
@@ -25,7 +29,9 @@ class InsightFaceWrapper(BaseModel):
                 providers = ['CPUExecutionProvider']
                 ctx_id = -1
 
-            # INITIALIZE APP
+            # INITIALIZE APP (INSIGHTFACE IMPORTS ALBUMENTATIONS / SCIPY: LOAD TIME ONLY)
+            from insightface.app import FaceAnalysis
+
             self.model = FaceAnalysis(
                 name=self.model_path, 
                 providers=providers,
@@ -34,6 +40,9 @@ class InsightFaceWrapper(BaseModel):
 
             # PREPARE (THIS TRIGGERS MODEL LOAD)
             self.model.prepare(ctx_id=ctx_id, det_size=(640, 640))
+            self.providers = providers
+            if self.num_threads:
+                self._rebuild_sessions()
 
             logger.info("INSIGHTFACE LOADED SUCCESSFULLY.")
 
@@ -41,6 +50,40 @@ class InsightFaceWrapper(BaseModel):
             logger.exception(f"FAILED TO LOAD INSIGHTFACE: {e}")
             raise e
 
+    # ---------------------------------------------------------
+    # THREAD BUDGET
+    # ---------------------------------------------------------
+    def set_num_threads(self, num_threads: int):
+        """
+        RECREATES THE SESSIONS IF THE INTRA-OP THREAD COUNT CHANGED.
+        CALL WHILE NO REQUEST USES THE MODEL (STARTUP AUTO-TUNING).
+        """
+        if num_threads == self.num_threads:
+            return
+        self.num_threads = num_threads
+        if self.model is not None:
+            self._rebuild_sessions()
+
+    def _rebuild_sessions(self):
+        """
+        FaceAnalysis DOES NOT PASS SessionOptions THROUGH TO ITS SESSIONS, SO
+        EACH MODEL'S SESSION IS REPLACED WITH ONE LIMITED TO num_threads
+        (NO SPINNING: IDLE POOL THREADS WOULD BURN OTHER SLOTS' CORES).
+        """
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self.num_threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+
+        for model in self.model.models.values():
+            model.session = onnxruntime.InferenceSession(
+                model.model_file, sess_options=options, providers=self.providers
+            )
+        logger.info(f"INSIGHTFACE SESSIONS USE {self.num_threads} INTRA-OP THREAD(S).")
+
     def predict(self, img: np.ndarray):
         """
         REQUIRED BY BASEMODEL.
@@ -66,4 +109,61 @@ class InsightFaceWrapper(BaseModel):
             reverse=True
         )
 
-        return faces[0].embedding
\ No newline at end of file
+        return faces[0].embedding
+
+    # ---------------------------------------------------------
+    # SHARED DETECTION STAGE
+    # ---------------------------------------------------------
+    def detect(self, img: np.ndarray) -> FaceDetections:
+        """
+        RUNS ONLY THE DETECTOR (NO RECOGNITION) AND RETURNS BOXES + 5-POINT LANDMARKS.
+        FACES WITH A TINY EYE DISTANCE (SIDE FACES, NOISE) ARE DROPPED,
+        MATCHING THE FILTER GFPGAN APPLIES TO ITS OWN DETECTIONS.
+        """
+        if self.model is None:
+            raise RuntimeError("INSIGHTFACE NOT LOADED")
+
+        bboxes, kpss = self.model.det_model.detect(img, max_num=0, metric="default")
+        if bboxes.shape[0] == 0 or kpss is None:
+            return FaceDetections.empty()
+
+        detections = FaceDetections(bboxes[:, :4], bboxes[:, 4], kpss)
+        eye_dist = np.linalg.norm(detections.landmarks[:, 0] - detections.landmarks[:, 1], axis=1)
+        return detections.filter(eye_dist >= settings.MIN_EYE_DISTANCE)
+
+    def get_face_embeddings(self, img: np.ndarray, landmarks: np.ndarray) -> np.ndarray:
+        """
+        RUNS THE RECOGNITION HEAD ON PRE-DETECTED FACES (NO SECOND DETECTION).
+        RETURNS ONE EMBEDDING PER LANDMARK SET: (N, 512).
+        """
+        return self.get_batched_embeddings([(img, landmarks)])[0]
+
+    def get_batched_embeddings(self, sources: list) -> list:
+        """
+        EMBEDS FACES FROM SEVERAL IMAGES IN ONE FORWARD PASS.
+        SOURCES: [(IMG, LANDMARKS (N_i, 5, 2)), ...]
+        RETURNS: [EMBEDDINGS (N_i, 512), ...] IN THE SAME ORDER.
+        ALL CROPS ARE ALIGNED TO 112x112 AND STACKED INTO A SINGLE BATCH.
+        """
+        if self.model is None:
+            raise RuntimeError("INSIGHTFACE NOT LOADED")
+
+        from insightface.utils import face_align
+
+        recognizer = self.model.models["recognition"]
+        crop_size = recognizer.input_size[0]
+
+        crops, counts = [], []
+        for img, landmarks in sources:
+            crops.extend(
+                face_align.norm_crop(img, landmark=kps, image_size=crop_size)
+                for kps in landmarks
+            )
+            counts.append(len(landmarks))
+
+        if not crops:
+            return [np.zeros((0, 512), dtype=np.float32) for _ in sources]
+
+        # get_feat TAKES A LIST AND BUILDS ONE (B, 3, 112, 112) BLOB
+        embeddings = recognizer.get_feat(crops)
+        return np.split(embeddings, np.cumsum(counts)[:-1])
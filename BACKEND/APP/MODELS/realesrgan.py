@@ -1,61 +1,163 @@
 import os
 import torch
 import numpy as np
-from basicsr.archs.rrdbnet_arch import RRDBNet
-from realesrgan import RealESRGANer
+from typing import Callable
+from APP.CORE.config import settings
 from APP.CORE.logging import logger
 from APP.MODELS.base import BaseModel
+from APP.MODELS.tiling import TileEngine
+
+# UPSCALE QUALITY LEVELS: A REQUEST FOR "high" ONLY RUNS "high" MODELS
+UPSCALE_QUALITY_LEVELS = {"fast": 0, "high": 1}
+
+
+class UpscalerSpec:
+    """
+    ONE ENTRY OF THE UPSCALER REGISTRY.
+    `scale` IS THE NETWORK'S NATIVE FACTOR (OUTPUTS ARE ONLY RESIZED DOWN FROM IT).
+    `relative_cost` IS CPU TIME PER INPUT PIXEL RELATIVE TO X4PLUS (BENCHMARKS/upscalers.py).
+    `bytes_per_pixel` IS PEAK INFERENCE MEMORY PER INPUT PIXEL: IT SIZES THE TILES.
+    """
+
+    def __init__(self, build: Callable[[], torch.nn.Module], scale: int, relative_cost: float,
+                 quality: str, path_setting: str, bytes_per_pixel: int):
+        self.build = build
+        self.scale = scale
+        self.relative_cost = relative_cost
+        self.bytes_per_pixel = bytes_per_pixel
+        self.quality = quality
+        self.path_setting = path_setting
+
+    @property
+    def model_path(self) -> str:
+        return getattr(settings, self.path_setting)
+
+
+# BASICSR / REALESRGAN ARE IMPORTED ON FIRST LOAD (THEY PULL IN TORCHVISION AND SCIPY)
+def build_rrdbnet(scale: int) -> torch.nn.Module:
+    from basicsr.archs.rrdbnet_arch import RRDBNet
+    return RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64, num_block=23, num_grow_ch=32, scale=scale)
+
+
+def build_srvgg_compact() -> torch.nn.Module:
+    from realesrgan.archs.srvgg_arch import SRVGGNetCompact
+    return SRVGGNetCompact(num_in_ch=3, num_out_ch=3, num_feat=64, num_conv=32, upscale=4, act_type="prelu")
+
+
+# MEASURED PEAK ACTIVATION MEMORY OF RRDBNET (23 BLOCKS, FP32, CPU) PER INPUT
+# PIXEL FOR THE X4 MODEL. THE HR LAYERS DOMINATE AND GROW WITH SCALE^2.
+RRDBNET_X4_BYTES_PER_PIXEL = 13 * 1024
+
+# SRVGGNETCOMPACT KEEPS ~3 LIVE 64-CHANNEL FP32 MAPS AT INPUT RESOLUTION, PLUS
+# THE X4 OUTPUT AND ITS NEAREST-UPSAMPLED BASE (2 x 3 x 16 FLOATS)
+SRVGG_COMPACT_BYTES_PER_PIXEL = 3 * 64 * 4 + 2 * 3 * 16 * 4 + 1024
+
+
+def rrdbnet_bytes_per_pixel(scale: int) -> int:
+    return int(RRDBNET_X4_BYTES_PER_PIXEL * (scale * scale) / 16) + 1024
+
+
+UPSCALERS = {
+    # RRDBNET, 23 BLOCKS AT INPUT RESOLUTION
+    "x4plus": UpscalerSpec(
+        lambda: build_rrdbnet(scale=4),
+        scale=4, relative_cost=1.0, quality="high", path_setting="REALESRGAN_MODEL_PATH",
+        bytes_per_pixel=rrdbnet_bytes_per_pixel(4)
+    ),
+    # SAME BLOCKS ON A PIXEL-UNSHUFFLED (HALF RESOLUTION) INPUT
+    "x2plus": UpscalerSpec(
+        lambda: build_rrdbnet(scale=2),
+        scale=2, relative_cost=0.24, quality="high", path_setting="REALESRGAN_X2_MODEL_PATH",
+        bytes_per_pixel=rrdbnet_bytes_per_pixel(2)
+    ),
+    # COMPACT VGG-STYLE NETWORK (32 CONVS, PIXEL-SHUFFLE UPSAMPLING)
+    "general-x4v3": UpscalerSpec(
+        build_srvgg_compact,
+        scale=4, relative_cost=0.06, quality="fast", path_setting="REALESRGAN_COMPACT_MODEL_PATH",
+        bytes_per_pixel=SRVGG_COMPACT_BYTES_PER_PIXEL
+    ),
+}
+
 
 class RealESRGANWrapper(BaseModel):
+    def __init__(self, model_path: str, device: str, name: str = "x4plus"):
+        super().__init__(model_path, device)
+        self.name = name
+        self.spec = UPSCALERS[name]
+        self.tiler: TileEngine = None
+
     def load(self):
         """
-        INITIALIZES REAL-ESRGAN WITH X4PLUS ARCHITECTURE.
+        INITIALIZES REAL-ESRGAN WITH THE REGISTERED ARCHITECTURE (SEE UPSCALERS).
         """
         if not os.path.exists(self.model_path):
             logger.error(f"REAL-ESRGAN WEIGHTS NOT FOUND AT: {self.model_path}")
             raise FileNotFoundError(f"MISSING WIEGHTS: {self.model_path}")
 
         try:
-            logger.info(f"LOADING REAL-ESRGAN FROM {self.model_path} ON {self.device}...")
-
-            # DEFINE THE NETWORK ARCHITECTURE (RRDBNET) FOR X4PLUS
-            model_arch = RRDBNet(
-                num_in_ch=3, 
-                num_out_ch=3, 
-                num_feat=64, 
-                num_block=23, 
-                num_grow_ch=32, 
-                scale=4
-            )
+            from realesrgan import RealESRGANer
+
+            logger.info(f"LOADING REAL-ESRGAN {self.name.upper()} FROM {self.model_path} ON {self.device}...")
+
+            # DEFINE THE NETWORK ARCHITECTURE
+            model_arch = self.spec.build()
 
             # USE FP16 IF ON GPU
             use_half = True if self.device.type == 'cuda' else False
 
             self.model = RealESRGANer(
-                scale=4,
+                scale=self.spec.scale,
                 model_path=self.model_path,
                 model=model_arch,
-                tile=0, # 0 = NO TILING (FASTER, BUT HIGHER VRAM). USE 400 IF OOM.
+                tile=0, # TILING IS HANDLED BY OUR TileEngine (SEE BELOW)
                 tile_pad=10,
                 pre_pad=0,
                 half=use_half,
                 device=self.device
             )
-            logger.info("REAL-ESRGAN LOADED SUCCESSFULLY.")
+
+            # ALL REGISTERED NETWORKS ARE FULLY CONVOLUTIONAL: ANY TILE SIZE RUNS ON EVERY BACKEND
+            self.init_backend(
+                settings.REALESRGAN_BACKEND,
+                self.model.model,
+                example_shape=(1, 3, 64, 64),
+                half=use_half,
+                channels_last=settings.TORCH_CHANNELS_LAST
+            )
+
+            # MEMORY-BUDGETED TILING ON TOP OF THE BACKEND (WHICH OWNS PRECISION)
+            self.tiler = TileEngine(
+                network=self.backend,
+                scale=self.spec.scale,
+                device=self.device,
+                memory_budget_mb=settings.REALESRGAN_MEMORY_BUDGET_MB,
+                bytes_per_pixel=self.spec.bytes_per_pixel,
+                workers=settings.REALESRGAN_TILE_WORKERS,
+                overlap=settings.REALESRGAN_TILE_OVERLAP,
+                pad=settings.REALESRGAN_TILE_PAD
+            )
+            logger.info(f"REAL-ESRGAN {self.name.upper()} LOADED SUCCESSFULLY.")
 
         except Exception as e:
-            logger.error(f"FAILED TO LOAD REAL-ESRGAN: {e}")
+            logger.error(f"FAILED TO LOAD REAL-ESRGAN {self.name.upper()}: {e}")
             raise e
 
-    def predict(self, img: np.ndarray, outscale: float = 2.0) -> np.ndarray:
+    def unload(self):
+        if self.tiler is not None:
+            self.tiler.close()
+            self.tiler = None
+        super().unload()
+
+    def predict(self, img: np.ndarray, outscale: float = 2.0, speed: str = None) -> np.ndarray:
         """
         UPSCALES THE IMAGE.
         INPUT: NUMPY ARRAY (BGR)
         OUTPUT: NUMPY ARRAY (BGR)
+        `speed` SELECTS THE PRECISION (SPEED_TIERS).
         """
         if self.model is None:
             raise RuntimeError("REAL-ESRGAN MODEL NOT LOADED")
 
-        # ENHANCE RETURNS (OUTPUT, IMAGE_MODE)
-        output, _ = self.model.enhance(img, outscale=outscale)
+        # TILE SIZE IS CHOSEN PER IMAGE FROM THE MEMORY BUDGET
+        output, _ = self.tiler.upscale(img, outscale=outscale, network=self.backend_for(speed))
         return output
\ No newline at end of file
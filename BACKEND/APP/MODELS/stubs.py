@@ -0,0 +1,121 @@
+import time
+
+import cv2
+import numpy as np
+from APP.CORE.config import settings
+from APP.MODELS.base import BaseModel
+from APP.MODELS.detections import FaceDetections
+from APP.MODELS.gfpgan import FaceRestoration
+from APP.MODELS.realesrgan import UPSCALERS
+
+# ARCFACE EMBEDDING SIZE. EVERY STUB FACE GETS THE SAME UNIT VECTOR (IDENTITY SCORE 1.0)
+EMBEDDING_DIM = 512
+
+
+def simulate_latency(stage: str, megapixels: float, faces: int = 0, cost: float = 1.0):
+    """
+    TAKES AS LONG AS THE STUB_LATENCY_MS MODEL SAYS `stage` TAKES:
+    (BASE + PER_MP * MEGAPIXELS + PER_FACE * FACES) * cost * STUB_TIME_SCALE.
+    "sleep" WAITS WITHOUT USING THE CPU. "spin" BURNS THIS THREAD'S CPU TIME
+    UNDER THE GIL, SO CONCURRENT CALLS IN ONE WORKER SHARE A CORE AND SLOW
+    EACH OTHER DOWN THE WAY COMPETING INFERENCE DOES.
+    """
+    model = settings.STUB_LATENCY_MS.get(stage, {})
+    ms = model.get("base", 0.0) + model.get("per_mp", 0.0) * megapixels + model.get("per_face", 0.0) * faces
+    seconds = ms * cost * settings.STUB_TIME_SCALE / 1000
+    if seconds <= 0:
+        return
+
+    if settings.STUB_LATENCY_MODE == "spin":
+        deadline = time.thread_time() + seconds
+        while time.thread_time() < deadline:
+            pass
+    else:
+        time.sleep(seconds)
+
+
+def megapixels(img: np.ndarray) -> float:
+    return img.shape[0] * img.shape[1] / 1e6
+
+
+class StubGFPGANWrapper(BaseModel):
+    """
+    STAND-IN FOR GFPGANWrapper (STUB_MODELS): NO WEIGHTS, RETURNS THE INPUT
+    UNCHANGED AFTER THE MODELLED RESTORATION TIME.
+    """
+
+    def load(self):
+        self.model = "stub"
+        # NO MICRO-BATCHING: /system/stats READS THIS
+        self.batcher = None
+
+    def predict(self, img: np.ndarray, weight: float = 0.5, detections: FaceDetections = None,
+                speed: str = None) -> np.ndarray:
+        faces = len(detections) if detections is not None else settings.STUB_FACES_PER_IMAGE
+        simulate_latency("gfpgan", megapixels(img), faces)
+        return img.copy()
+
+    def restore_faces(self, img: np.ndarray, detections: FaceDetections, weight: float = 0.5,
+                      speed: str = None) -> FaceRestoration:
+        simulate_latency("gfpgan", megapixels(img), len(detections))
+        return FaceRestoration(img)
+
+    def paste_faces(self, restoration: FaceRestoration, background: np.ndarray = None,
+                    scale: float = 1.0) -> np.ndarray:
+        return background if background is not None else restoration.image.copy()
+
+
+class StubRealESRGANWrapper(BaseModel):
+    """
+    STAND-IN FOR RealESRGANWrapper (STUB_MODELS): BICUBIC RESIZE, TIMED AS
+    THE REGISTERED UPSCALER'S relative_cost TIMES THE X4PLUS MODEL.
+    """
+
+    def __init__(self, model_path: str, device: str, name: str = "x4plus"):
+        super().__init__(model_path, device)
+        self.name = name
+        self.spec = UPSCALERS[name]
+
+    def load(self):
+        self.model = "stub"
+
+    def predict(self, img: np.ndarray, outscale: float = 2.0, speed: str = None) -> np.ndarray:
+        simulate_latency("upscale", megapixels(img), cost=self.spec.relative_cost)
+        h, w = img.shape[:2]
+        return cv2.resize(img, (round(w * outscale), round(h * outscale)), interpolation=cv2.INTER_CUBIC)
+
+
+class StubInsightFaceWrapper(BaseModel):
+    """
+    STAND-IN FOR InsightFaceWrapper (STUB_MODELS): "FINDS" STUB_FACES_PER_IMAGE
+    FACES ON A FIXED GRID OF EVERY IMAGE.
+    """
+
+    def __init__(self, model_name: str, device, num_threads: int = 0):
+        super().__init__(model_path=model_name, device=device)
+        self.num_threads = num_threads
+
+    def load(self):
+        self.model = "stub"
+
+    def predict(self, img: np.ndarray):
+        return self.detect(img)
+
+    def set_num_threads(self, num_threads: int):
+        self.num_threads = num_threads
+
+    def get_embedding(self, img: np.ndarray):
+        faces = self.get_face_embeddings(img, self.detect(img).landmarks)
+        return faces[0] if len(faces) else None
+
+    def detect(self, img: np.ndarray) -> FaceDetections:
+        simulate_latency("detect", megapixels(img))
+        return FaceDetections.grid(settings.STUB_FACES_PER_IMAGE, min(img.shape[:2]))
+
+    def get_face_embeddings(self, img: np.ndarray, landmarks: np.ndarray) -> np.ndarray:
+        return self.get_batched_embeddings([(img, landmarks)])[0]
+
+    def get_batched_embeddings(self, sources: list) -> list:
+        simulate_latency("embed", 0.0, sum(len(landmarks) for _, landmarks in sources))
+        embedding = np.full(EMBEDDING_DIM, 1 / np.sqrt(EMBEDDING_DIM), dtype=np.float32)
+        return [np.tile(embedding, (len(landmarks), 1)) for _, landmarks in sources]
@@ -0,0 +1,201 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+from APP.CORE.logging import logger
+from APP.UTILS.timing import annotate
+
+# SMALLEST TILE WORTH RUNNING (RECEPTIVE FIELD / EFFICIENCY)
+MIN_TILE_SIZE = 64
+
+
+class TileEngine:
+    """
+    MEMORY-BUDGETED TILED SUPER-RESOLUTION WITH PARALLEL TILE EXECUTION.
+    - THE TILE SIZE IS DERIVED FROM THE MEMORY BUDGET, THE WORKER COUNT, THE
+      NETWORK'S PEAK MEMORY PER INPUT PIXEL (`bytes_per_pixel`, SEE
+      UpscalerSpec) AND THE INPUT SHAPE (WHOLE FRAME IF IT FITS).
+    - EACH TILE IS INFERRED WITH `pad` PIXELS OF IMAGE CONTEXT AROUND IT,
+      CROPPED OFF AGAIN BEFORE BLENDING, SO THE NETWORK NEVER SEES A HARD
+      TILE EDGE INSIDE THE PART OF THE TILE THAT IS KEPT.
+    - NEIGHBOURING TILES OVERLAP; EACH TILE'S OUTPUT IS WEIGHTED BY A LINEAR
+      RAMP ACROSS THE OVERLAP SO SEAMS ARE BLENDED, NOT CUT.
+    - PARALLEL TILES SPLIT THE CALLER'S TORCH INTRA-OP THREADS BETWEEN THEM
+      INSTEAD OF EACH STARTING A FULL TEAM.
+    - TILE OUTPUTS ARE RESIZED TO THE REQUESTED OUTSCALE BEFORE MERGING, SO THE
+      ACCUMULATOR NEVER HOLDS THE FULL NATIVE-SCALE IMAGE.
+    STATELESS PER CALL, SO IT IS SAFE TO SHARE ACROSS REQUEST THREADS.
+    """
+
+    def __init__(self, network: torch.nn.Module, scale: int, device: torch.device,
+                 memory_budget_mb: int, bytes_per_pixel: int, workers: int = 1, overlap: int = 32,
+                 pad: int = 16, half: bool = False):
+        self.network = network
+        self.scale = scale
+        self.device = device
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.workers = max(1, workers)
+        self.overlap = overlap
+        self.half = half
+
+        # PIXEL-UNSHUFFLE MODELS NEED INPUT SIZES DIVISIBLE BY THIS
+        self.mod_scale = {2: 2, 1: 4}.get(scale, 1)
+        # PADDED WINDOWS MUST KEEP THE SIZE MULTIPLE
+        self.pad = max(0, pad) + (-max(0, pad)) % self.mod_scale
+        self.bytes_per_pixel = bytes_per_pixel
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sr-tile")
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        self.network = None
+
+    # ---------------------------------------------------------
+    # TILE PLANNING
+    # ---------------------------------------------------------
+    def choose_tile_size(self, h: int, w: int) -> int:
+        """
+        LARGEST SQUARE TILE SUCH THAT `workers` CONCURRENT TILES (WITH THEIR
+        CONTEXT PADDING) FIT THE BUDGET. RETURNS 0 IF THE WHOLE FRAME FITS IN ONE PASS.
+        """
+        if h * w * self.bytes_per_pixel <= self.memory_budget:
+            return 0
+
+        pixels_per_tile = self.memory_budget / (self.workers * self.bytes_per_pixel)
+        tile = int(math.sqrt(pixels_per_tile)) - 2 * self.pad
+        tile -= tile % self.mod_scale
+        return max(MIN_TILE_SIZE, tile)
+
+    def plan_tiles(self, h: int, w: int, tile: int) -> List[Tuple[int, int, int, int]]:
+        """
+        (Y0, Y1, X0, X1) WINDOWS COVERING THE IMAGE WITH `overlap` PIXELS OF OVERLAP.
+        """
+        if tile == 0:
+            return [(0, h, 0, w)]
+
+        def starts(length: int) -> List[int]:
+            if length <= tile:
+                return [0]
+            stride = max(self.mod_scale, tile - self.overlap)
+            stride -= stride % self.mod_scale
+            positions = list(range(0, length - tile, stride))
+            last = length - tile
+            last -= last % self.mod_scale
+            if not positions or positions[-1] != last:
+                positions.append(last)
+            return positions
+
+        return [
+            (y0, min(y0 + tile, h), x0, min(x0 + tile, w))
+            for y0 in starts(h)
+            for x0 in starts(w)
+        ]
+
+    # ---------------------------------------------------------
+    # EXECUTION
+    # ---------------------------------------------------------
+    def upscale(self, img: np.ndarray, outscale: float, network: Callable = None) -> Tuple[np.ndarray, int]:
+        """
+        UPSCALES A BGR UINT8 IMAGE BY `outscale`. RETURNS (IMAGE, NUMBER OF TILES).
+        `network` OVERRIDES THE ENGINE'S NETWORK FOR THIS CALL (E.G. ANOTHER PRECISION).
+        """
+        network = network or self.network
+        h_in, w_in = img.shape[:2]
+
+        # REFLECT-PAD TO THE MODEL'S SIZE MULTIPLE
+        pad_h = (-h_in) % self.mod_scale
+        pad_w = (-w_in) % self.mod_scale
+        if pad_h or pad_w:
+            img = cv2.copyMakeBorder(img, 0, pad_h, 0, pad_w, cv2.BORDER_REFLECT_101)
+
+        h, w = img.shape[:2]
+        tile = self.choose_tile_size(h, w)
+        windows = self.plan_tiles(h, w, tile)
+
+        # NORMALIZE ONCE: BGR UINT8 -> RGB FLOAT [0, 1]
+        rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
+
+        out_h, out_w = round(h * outscale), round(w * outscale)
+        accumulator = np.zeros((out_h, out_w, 3), dtype=np.float32)
+        weights = np.zeros((out_h, out_w, 1), dtype=np.float32)
+
+        parallel = len(windows) > 1 and self.workers > 1
+        caller_threads = torch.get_num_threads()
+        tile_threads = max(1, caller_threads // min(self.workers, len(windows))) if parallel else caller_threads
+
+        def run(window):
+            y0, y1, x0, x1 = window
+            # CONTEXT AROUND THE TILE, CLIPPED AT THE IMAGE BORDER
+            py0, py1 = max(0, y0 - self.pad), min(h, y1 + self.pad)
+            px0, px1 = max(0, x0 - self.pad), min(w, x1 + self.pad)
+            if parallel:
+                torch.set_num_threads(tile_threads)
+            with annotate(f"sr:tile {x1 - x0}x{y1 - y0}"):
+                tile_out = self._infer(network, rgb[py0:py1, px0:px1])
+            # DROP THE CONTEXT (NATIVE SCALE) BEFORE RESIZING AND BLENDING
+            s = self.scale
+            tile_out = tile_out[(y0 - py0) * s:(y1 - py0) * s, (x0 - px0) * s:(x1 - px0) * s]
+            oy0, oy1 = round(y0 * outscale), round(y1 * outscale)
+            ox0, ox1 = round(x0 * outscale), round(x1 * outscale)
+            if tile_out.shape[:2] != (oy1 - oy0, ox1 - ox0):
+                tile_out = cv2.resize(tile_out, (ox1 - ox0, oy1 - oy0), interpolation=cv2.INTER_LANCZOS4)
+            return (oy0, oy1, ox0, ox1), tile_out
+
+        if not parallel:
+            results = [run(window) for window in windows]
+        else:
+            # COLLECTED HERE SO THAT sr:blend ONLY COVERS THE BLENDING
+            try:
+                results = list(self._pool.map(run, windows))
+            finally:
+                # TORCH ALSO STORES THE COUNT AS THE PROCESS DEFAULT FOR NEW THREADS
+                torch.set_num_threads(caller_threads)
+
+        with annotate("sr:blend"):
+            for (oy0, oy1, ox0, ox1), tile_out in results:
+                mask = self._blend_mask(oy1 - oy0, ox1 - ox0, oy0 == 0, oy1 == out_h, ox0 == 0, ox1 == out_w, outscale)
+                accumulator[oy0:oy1, ox0:ox1] += tile_out * mask
+                weights[oy0:oy1, ox0:ox1] += mask
+
+        output = accumulator / np.maximum(weights, 1e-6)
+        output = (np.clip(output, 0.0, 1.0) * 255.0).round().astype(np.uint8)
+        output = cv2.cvtColor(output, cv2.COLOR_RGB2BGR)
+
+        # DROP THE MOD PADDING
+        output = output[:round(h_in * outscale), :round(w_in * outscale)]
+
+        if len(windows) > 1:
+            logger.info(
+                f"REAL-ESRGAN TILED: {len(windows)} TILES OF {tile}px (+{self.pad}px CONTEXT), "
+                f"{self.workers if parallel else 1} WORKER(S) x {tile_threads} THREAD(S)."
+            )
+        return output, len(windows)
+
+    @torch.no_grad()
+    def _infer(self, network: Callable, rgb_tile: np.ndarray) -> np.ndarray:
+        tensor = torch.from_numpy(np.ascontiguousarray(rgb_tile.transpose(2, 0, 1))).unsqueeze(0).to(self.device)
+        if self.half:
+            tensor = tensor.half()
+        output = network(tensor)
+        return output.squeeze(0).float().clamp_(0, 1).cpu().numpy().transpose(1, 2, 0)
+
+    def _blend_mask(self, h: int, w: int, top: bool, bottom: bool, left: bool, right: bool,
+                    outscale: float) -> np.ndarray:
+        """
+        LINEAR RAMP OVER THE OVERLAP ON INTERIOR EDGES, FLAT 1.0 ON IMAGE BORDERS.
+        """
+        ramp = max(1, round(self.overlap * outscale))
+
+        def profile(length: int, start_flat: bool, end_flat: bool) -> np.ndarray:
+            p = np.ones(length, dtype=np.float32)
+            edge = np.linspace(1.0 / (ramp + 1), 1.0, num=min(ramp, length), endpoint=False, dtype=np.float32)
+            if not start_flat:
+                p[:len(edge)] = np.minimum(p[:len(edge)], edge)
+            if not end_flat:
+                p[-len(edge):] = np.minimum(p[-len(edge):], edge[::-1])
+            return p
+
+        return (profile(h, top, bottom)[:, None] * profile(w, left, right)[None, :])[:, :, None]
@@ -1,15 +1,141 @@
-from pydantic import BaseModel
-from typing import Dict, Optional
+from pydantic import BaseModel, Field
+from enum import Enum
+from typing import Dict, List, Optional
+
+from APP.CORE.config import settings
+
+# RESPONSE HEADERS CARRYING THE METRICS WHEN THE IMAGE IS RETURNED AS BINARY
+BINARY_RESPONSE_HEADERS = (
+    "X-Metric-PSNR",
+    "X-Metric-SSIM",
+    "X-Metric-LPIPS",
+    "X-Metric-Identity-Score",
+    "X-Metric-Face-Identity-Scores",
+    "X-Metrics-Id",
+    "X-Processing-Time-Ms",
+    "X-Peak-RSS-MB",
+    "X-Profile-Trace-Id",
+)
+
+# RESPONSE HEADERS OF THE VIDEO ENDPOINT (X-Video-Stats IS THE FULL JSON REPORT)
+VIDEO_RESPONSE_HEADERS = (
+    "X-Video-Frames",
+    "X-Video-FPS",
+    "X-Video-Stats",
+    "X-Processing-Time-Ms",
+    "X-Peak-RSS-MB",
+)
+
+class OutputFormat(str, Enum):
+    JPEG = "jpeg"
+    WEBP = "webp"
+    PNG = "png"
+
+class MetricsMode(str, Enum):
+    # NONE: SKIP METRICS. FAST: DOWNSAMPLED PSNR / SSIM ONLY.
+    # FULL: PSNR, SSIM, LPIPS AND IDENTITY BEFORE RESPONDING.
+    # DEFERRED: FULL, COMPUTED AFTER THE RESPONSE (GET /images/metrics/{metrics_id})
+    NONE = "none"
+    FAST = "fast"
+    FULL = "full"
+    DEFERRED = "deferred"
+
+class SpeedTier(str, Enum):
+    # MAPPED TO A PRECISION MODE (fp32 / bf16 / int8) BY SETTINGS.SPEED_TIERS
+    QUALITY = "quality"
+    FAST = "fast"
+
+class UpscaleQuality(str, Enum):
+    # FAST ALLOWS THE COMPACT SRVGG UPSCALER; HIGH ONLY RUNS RRDBNET MODELS
+    FAST = "fast"
+    HIGH = "high"
+
+# CV2'S OWN JPEG DEFAULT, SO CLIENTS THAT DO NOT ASK SEE NO CHANGE
+DEFAULT_OUTPUT_QUALITY = 95
+
+class EnhancementOptions(BaseModel):
+    # PER-REQUEST PIPELINE OPTIONS. EVERY FIELD IS PART OF THE RESULT CACHE KEY.
+    output_format: OutputFormat = OutputFormat.JPEG
+    quality: int = Field(DEFAULT_OUTPUT_QUALITY, ge=1, le=100)
+    metrics: MetricsMode = Field(default_factory=lambda: MetricsMode(settings.DEFAULT_METRICS_MODE))
+    speed: SpeedTier = Field(default_factory=lambda: SpeedTier(settings.DEFAULT_SPEED_TIER))
+    # OUTPUT SIZE RELATIVE TO THE (SIZE-LIMITED) INPUT; 1 SKIPS UPSCALING
+    scale: float = Field(default_factory=lambda: float(settings.DEFAULT_UPSCALE_FACTOR), ge=1, le=4)
+    upscale_quality: UpscaleQuality = Field(default_factory=lambda: UpscaleQuality(settings.DEFAULT_UPSCALE_QUALITY))
+
+class ResponseFormat(str, Enum):
+    # JSON WITH A BASE64 IMAGE (ORIGINAL API) OR THE RAW IMAGE BYTES
+    JSON = "json"
+    BINARY = "binary"
+
+class FaceIdentityScore(BaseModel):
+    # FACE BOX IN INPUT COORDINATES (X1, Y1, X2, Y2)
+    box: List[float]
+    score: float
 
 class EnhancementMetrics(BaseModel):
     psnr: float
     ssim: float
-    lpips: float
-    identity_score: float
+    # LPIPS AND IDENTITY ARE NONE IN FAST MODE
+    lpips: Optional[float] = None
+    # MEAN OVER ALL DETECTED FACES (0.0 IF NO FACE)
+    identity_score: Optional[float] = None
+    face_identity_scores: List[FaceIdentityScore] = []
 
 class EnhancementResponse(BaseModel):
     success: bool
     message: str
     image_base64: Optional[str] = None
+    media_type: Optional[str] = None
     metrics: Optional[EnhancementMetrics] = None
-    processing_time_ms: float
\ No newline at end of file
+    # SET IN DEFERRED METRICS MODE: POLL GET /images/metrics/{metrics_id}
+    metrics_id: Optional[str] = None
+    processing_time_ms: float
+    # PEAK PROCESS RSS WHILE THE PIPELINE RAN (OF THE RUN THAT PRODUCED A CACHED RESULT)
+    peak_rss_mb: Optional[float] = None
+    # SET FOR PROFILED REQUESTS: GET /system/profiles/{trace_id}
+    trace_id: Optional[str] = None
+
+class BatchStreamFormat(str, Enum):
+    # ONE JSON OBJECT PER LINE (BASE64 IMAGES) OR multipart/mixed (RAW IMAGE PARTS)
+    NDJSON = "ndjson"
+    MULTIPART = "multipart"
+
+class BatchItemResult(EnhancementResponse):
+    # POSITION IN THE UPLOAD (ZIP ENTRIES IN ARCHIVE ORDER); RESULTS ARRIVE IN COMPLETION ORDER
+    index: int
+    filename: str
+
+class MetricsStatus(str, Enum):
+    PENDING = "pending"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class MetricsStatusResponse(BaseModel):
+    metrics_id: str
+    status: MetricsStatus
+    metrics: Optional[EnhancementMetrics] = None
+    error: Optional[str] = None
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: JobStatus
+    queue_position: Optional[int] = None
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: JobStatus
+    priority: int
+    queue_position: Optional[int] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    result: Optional[EnhancementResponse] = None
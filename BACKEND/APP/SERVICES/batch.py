@@ -0,0 +1,141 @@
+import asyncio
+import io
+import os
+import time
+import zipfile
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from APP.CORE.config import settings
+from APP.CORE.logging import logger
+from APP.SCHEMAS.enhancement import EnhancementOptions
+from APP.SERVICES.dispatcher import EnhancementDispatcher
+from APP.SERVICES.pipeline import EnhancementPipeline
+
+SUPPORTED_CONTENT_TYPES = ("image/jpeg", "image/png", "image/jpg")
+SUPPORTED_EXTENSIONS = (".jpg", ".jpeg", ".png")
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+
+
+class BatchTooLargeError(Exception):
+    """
+    RAISED WHEN A BATCH EXPANDS TO MORE THAN MAX_BATCH_ITEMS IMAGES.
+    (MAX_BATCH_UPLOAD_MB IS ENFORCED WHILE THE UPLOADS ARE READ.)
+    """
+
+
+class BatchItem:
+    """
+    ONE IMAGE OF A BATCH. ZIP ENTRIES ARE ONLY DECOMPRESSED WHEN THEIR TURN COMES.
+    AN ITEM WITH `error` SET IS REPORTED AS FAILED WITHOUT BEING PROCESSED.
+    """
+
+    def __init__(self, index: int, filename: str, loader: Callable[[], bytes] = None, error: str = None):
+        self.index = index
+        self.filename = filename
+        self.loader = loader
+        self.error = error
+
+
+class BatchProcessor:
+    """
+    EXPANDS UPLOADS (FILES AND ZIP ARCHIVES) INTO ITEMS AND RUNS THEM THROUGH
+    THE DISPATCHER, YIELDING RESULTS IN COMPLETION ORDER.
+    """
+
+    # ---------------------------------------------------------
+    # EXPANSION
+    # ---------------------------------------------------------
+    @staticmethod
+    def is_zip(filename: str, content_type: Optional[str]) -> bool:
+        return content_type in ZIP_CONTENT_TYPES or (filename or "").lower().endswith(".zip")
+
+    @staticmethod
+    def expand(uploads: List[Tuple[str, Optional[str], bytes]]) -> List[BatchItem]:
+        """
+        (FILENAME, CONTENT TYPE, BYTES) UPLOADS -> BATCH ITEMS.
+        RAISES BatchTooLargeError FOR TOO MANY IMAGES AND zipfile.BadZipFile
+        FOR CORRUPT ARCHIVES. UNSUPPORTED OR OVERSIZED IMAGES BECOME FAILED ITEMS.
+        SYNCHRONOUS FUNCTION (CALLED INSIDE THREADPOOL).
+        """
+        items: List[BatchItem] = []
+
+        def add(filename: str, loader: Callable[[], bytes] = None, error: str = None):
+            if len(items) >= settings.MAX_BATCH_ITEMS:
+                raise BatchTooLargeError(f"BATCH HAS MORE THAN {settings.MAX_BATCH_ITEMS} IMAGES")
+            items.append(BatchItem(len(items), filename, loader, error))
+
+        for filename, content_type, data in uploads:
+            if BatchProcessor.is_zip(filename, content_type):
+                BatchProcessor._expand_zip(data, add)
+            elif content_type not in SUPPORTED_CONTENT_TYPES:
+                add(filename, error="ONLY JPEG AND PNG IMAGES ARE SUPPORTED.")
+            elif len(data) > settings.MAX_UPLOAD_SIZE_BYTES:
+                add(filename, error="FILE TOO LARGE")
+            else:
+                add(filename, loader=lambda data=data: data)
+
+        return items
+
+    @staticmethod
+    def _expand_zip(data: bytes, add: Callable):
+        archive = zipfile.ZipFile(io.BytesIO(data))
+
+        for info in archive.infolist():
+            name = info.filename
+            basename = os.path.basename(name)
+            # DIRECTORIES, MACOS RESOURCE FORKS AND HIDDEN FILES
+            if info.is_dir() or name.startswith("__MACOSX/") or basename.startswith("."):
+                continue
+
+            if not basename.lower().endswith(SUPPORTED_EXTENSIONS):
+                add(name, error="ONLY JPEG AND PNG IMAGES ARE SUPPORTED.")
+            elif info.file_size > settings.MAX_UPLOAD_SIZE_BYTES:
+                # DECLARED SIZE IS CHECKED BEFORE DECOMPRESSING (ZIP BOMBS)
+                add(name, error="FILE TOO LARGE")
+            else:
+                add(name, loader=lambda info=info: BatchProcessor._read_entry(archive, info))
+
+    @staticmethod
+    def _read_entry(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> bytes:
+        with archive.open(info) as entry:
+            data = entry.read(settings.MAX_UPLOAD_SIZE_BYTES + 1)
+        if len(data) > settings.MAX_UPLOAD_SIZE_BYTES:
+            raise ValueError("FILE TOO LARGE")
+        return data
+
+    # ---------------------------------------------------------
+    # EXECUTION
+    # ---------------------------------------------------------
+    @staticmethod
+    async def run(items: List[BatchItem], options: EnhancementOptions) -> AsyncIterator[Tuple[BatchItem, dict, float]]:
+        """
+        YIELDS (ITEM, RESULT, DURATION MS) AS ITEMS FINISH.
+        A FEW ITEMS ARE ADMITTED BEYOND THE MODEL SLOTS SO THAT DECODE AND
+        ENCODE OF NEIGHBOURING IMAGES OVERLAP WITH INFERENCE.
+        REMAINING ITEMS ARE CANCELLED IF THE CONSUMER STOPS (CLIENT DISCONNECT).
+        """
+        in_flight = asyncio.Semaphore(settings.MAX_CONCURRENT_REQUESTS + settings.BATCH_PREFETCH_ITEMS)
+
+        async def run_item(item: BatchItem):
+            if item.error:
+                return item, EnhancementPipeline.failure_result(ValueError(item.error), 0.0), 0.0
+
+            async with in_flight:
+                start_time = time.time()
+                try:
+                    image_bytes = await run_in_threadpool(item.loader)
+                    result = await EnhancementDispatcher.run(image_bytes, options)
+                except Exception as e:
+                    logger.error(f"BATCH ITEM {item.index} ({item.filename}) FAILED: {e}")
+                    result = EnhancementPipeline.failure_result(e, time.time() - start_time)
+                return item, result, (time.time() - start_time) * 1000
+
+        tasks = [asyncio.create_task(run_item(item)) for item in items]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
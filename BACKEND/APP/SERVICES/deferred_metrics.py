@@ -0,0 +1,107 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from APP.CORE.config import settings
+from APP.CORE.logging import logger
+from APP.SCHEMAS.enhancement import MetricsStatus
+
+
+class DeferredMetrics:
+    """
+    RUNS FULL QUALITY METRICS AFTER THE RESPONSE HAS BEEN SENT.
+    ONE BACKGROUND THREAD EVALUATES SUBMISSIONS IN ORDER; RESULTS ARE KEPT
+    BY METRICS ID UNTIL THE TTL EXPIRES. THE BACKLOG IS BOUNDED BECAUSE EACH
+    PENDING ENTRY HOLDS THE INPUT AND OUTPUT IMAGES IN MEMORY.
+    """
+
+    def __init__(self, max_pending: int, ttl_seconds: int):
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="metrics")
+
+    def submit(self, fn: Callable[..., dict], *args) -> Optional[str]:
+        """
+        SCHEDULES fn(*args) AND RETURNS ITS METRICS ID, OR NONE IF THE BACKLOG IS FULL.
+        """
+        with self._lock:
+            self._purge_expired()
+            if self._pending >= self.max_pending:
+                return None
+
+            metrics_id = uuid.uuid4().hex
+            self._entries[metrics_id] = {
+                "status": MetricsStatus.PENDING,
+                "metrics": None,
+                "error": None,
+                "finished_at": None,
+            }
+            self._pending += 1
+
+        self._executor.submit(self._run, metrics_id, fn, args)
+        return metrics_id
+
+    def share(self, metrics_id: str) -> Optional[str]:
+        """
+        A NEW METRICS ID FOR THE SAME EVALUATION (COALESCED IDENTICAL REQUESTS),
+        OR NONE IF THE ENTRY IS GONE.
+        """
+        with self._lock:
+            entry = self._entries.get(metrics_id)
+            if entry is None:
+                return None
+
+            # SAME DICT: _run() UPDATES IT IN PLACE FOR EVERY ID
+            shared_id = uuid.uuid4().hex
+            self._entries[shared_id] = entry
+            return shared_id
+
+    def get(self, metrics_id: str) -> Optional[dict]:
+        with self._lock:
+            self._purge_expired()
+            entry = self._entries.get(metrics_id)
+            return dict(entry) if entry is not None else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "stored": len(self._entries),
+                "max_pending": self.max_pending,
+            }
+
+    def _run(self, metrics_id: str, fn: Callable[..., dict], args: tuple):
+        try:
+            metrics, status, error = fn(*args), MetricsStatus.SUCCEEDED, None
+        except Exception as e:
+            logger.error(f"DEFERRED METRICS {metrics_id} FAILED: {e}")
+            metrics, status, error = None, MetricsStatus.FAILED, str(e)
+
+        with self._lock:
+            self._pending -= 1
+            entry = self._entries.get(metrics_id)
+            if entry is not None:
+                entry.update(status=status, metrics=metrics, error=error, finished_at=time.time())
+
+    def _purge_expired(self):
+        # CALLER HOLDS THE LOCK
+        cutoff = time.time() - self.ttl_seconds
+        expired = [
+            metrics_id for metrics_id, entry in self._entries.items()
+            if entry["finished_at"] is not None and entry["finished_at"] < cutoff
+        ]
+        for metrics_id in expired:
+            del self._entries[metrics_id]
+
+
+# GLOBAL SINGLETON INSTANCE
+deferred_metrics = DeferredMetrics(
+    max_pending=settings.DEFERRED_METRICS_MAX_PENDING,
+    ttl_seconds=settings.DEFERRED_METRICS_TTL_SECONDS
+)
@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Iterator
+from fastapi.concurrency import run_in_threadpool
+
+from APP.CORE.config import settings
+from APP.CORE.logging import logger
+from APP.CORE.telemetry import IN_FLIGHT, SEMAPHORE_WAIT_SECONDS, WAITING
+from APP.SCHEMAS.enhancement import EnhancementOptions, MetricsMode
+from APP.SERVICES.deferred_metrics import deferred_metrics
+from APP.SERVICES.pipeline import EnhancementPipeline
+from APP.SERVICES.profiler import request_profiler
+from APP.SERVICES.result_cache import ResultCache, result_cache
+from APP.SERVICES.single_flight import single_flight
+from APP.SERVICES.stages import stage_executors
+from APP.SERVICES.thread_budget import model_slots
+from APP.UTILS.memory import PeakRSSMonitor
+
+
+class EnhancementDispatcher:
+    """
+    SINGLE ENTRY POINT FOR RUNNING THE PIPELINE FROM ASYNC CODE.
+    LIMITS MODEL CONCURRENCY AND KEEPS THE EVENT LOOP FREE.
+    """
+
+    @staticmethod
+    async def run(image_bytes: bytes, options: EnhancementOptions = None, profile: bool = False) -> dict:
+        """
+        RETURNS A CACHED RESULT IF AVAILABLE, OTHERWISE WAITS FOR A FREE
+        MODEL SLOT AND RUNS THE PIPELINE IN THE THREADPOOL. IDENTICAL IN-FLIGHT
+        REQUESTS SHARE ONE RUN, WHETHER OR NOT THE CACHE IS ENABLED.
+        ONLY THE MODEL STAGES HOLD THE SEMAPHORE: DECODE AND ENCODE OF OTHER
+        IMAGES OVERLAP WITH INFERENCE.
+        `profile` (OR PROFILING_SAMPLE_RATE) RUNS THE REQUEST UNDER THE PROFILER.
+        """
+        options = options or EnhancementOptions()
+        if profile or request_profiler.sampled():
+            return await EnhancementDispatcher.run_profiled(image_bytes, options)
+
+        params = EnhancementPipeline.pipeline_params(options)
+        upload_key = None
+        # A DEFERRED RESULT CARRIES A ONE-TIME metrics_id THAT EXPIRES (AND
+        # BELONGS TO THIS WORKER): A CACHED COPY WOULD HAND OUT A DEAD ID
+        cacheable = settings.RESULT_CACHE_ENABLED and options.metrics != MetricsMode.DEFERRED
+
+        # 1. BYTE-IDENTICAL RE-UPLOAD: NO DECODE, NO THREADPOOL, NO SEMAPHORE
+        if cacheable:
+            upload_key = ResultCache.make_key(hashlib.sha256(image_bytes).hexdigest(), params)
+            cached = result_cache.get(upload_key)
+            if cached is not None:
+                logger.info("RESULT CACHE HIT (UPLOAD HASH).")
+                return cached
+
+        # 2. DECODE OUTSIDE THE SEMAPHORE
+        try:
+            original_img = await stage_executors.run("decode", EnhancementPipeline.decode_image, image_bytes)
+        except Exception as e:
+            logger.error(f"PIPELINE ERROR: {str(e)}")
+            return EnhancementPipeline.failure_result(e, 0.0)
+
+        # 3. LOOK UP BY PIXEL HASH (THE KEY ALSO COALESCES WHEN NOT CACHING)
+        pixel_key = ResultCache.make_key(EnhancementPipeline.pixel_digest(original_img), params)
+        if cacheable:
+            cached = result_cache.get(pixel_key)
+            if cached is not None:
+                logger.info("RESULT CACHE HIT (PIXEL HASH).")
+                result_cache.alias(upload_key, pixel_key)
+                return cached
+
+        # 4. MISS: RUN THE MODELS ONCE FOR ALL IDENTICAL IN-FLIGHT REQUESTS
+        led = False
+
+        async def compute() -> dict:
+            nonlocal led
+            led = True
+            result = await EnhancementDispatcher.infer_and_encode(original_img, options)
+            if cacheable and result.get("success"):
+                await run_in_threadpool(result_cache.put, pixel_key, result)
+            return result
+
+        result = await single_flight.do(pixel_key, compute)
+        if not led and result.get("metrics_id"):
+            # EACH FOLLOWER GETS ITS OWN ID FOR THE LEADER'S (SINGLE) EVALUATION
+            result = {**result, "metrics_id": deferred_metrics.share(result["metrics_id"])}
+        if cacheable and result.get("success"):
+            result_cache.alias(upload_key, pixel_key)
+
+        return result
+
+    @staticmethod
+    async def run_profiled(image_bytes: bytes, options: EnhancementOptions) -> dict:
+        """
+        THE WHOLE process_image (DECODE TO ENCODE) IN ONE PROFILED THREADPOOL
+        CALL, HOLDING A MODEL SLOT. BYPASSES THE CACHE: A HIT WOULD TRACE NOTHING.
+        """
+        async with EnhancementDispatcher.model_slot():
+            result, trace_id = await run_in_threadpool(
+                request_profiler.run, EnhancementPipeline.process_image, image_bytes, options
+            )
+        result["trace_id"] = trace_id
+        return result
+
+    @staticmethod
+    @asynccontextmanager
+    async def model_slot():
+        """
+        WAITS FOR A MODEL SLOT (SHARED BY THE SYNCHRONOUS ENDPOINT, THE JOB
+        QUEUE WORKERS AND VIDEO FRAMES) AND YIELDS ITS NUMBER.
+        """
+        wait_start = time.perf_counter()
+        with WAITING.track_inprogress():
+            slot = await model_slots.acquire()
+        SEMAPHORE_WAIT_SECONDS.observe(time.perf_counter() - wait_start)
+
+        try:
+            logger.info(f"ACQUIRED MODEL SLOT {slot}. PROCESSING...")
+            with IN_FLIGHT.track_inprogress():
+                yield slot
+        finally:
+            model_slots.release(slot)
+
+    @staticmethod
+    @contextmanager
+    def threaded_model_slot(loop: asyncio.AbstractEventLoop) -> Iterator[int]:
+        """
+        model_slot() FOR CODE RUNNING IN A WORKER THREAD (VIDEO FRAMES). THE
+        SLOTS BELONG TO THE EVENT LOOP, SO ONE IS TAKEN AND RELEASED THERE.
+        """
+        slot = EnhancementDispatcher.model_slot()
+        number = asyncio.run_coroutine_threadsafe(slot.__aenter__(), loop).result()
+        try:
+            yield number
+        finally:
+            asyncio.run_coroutine_threadsafe(slot.__aexit__(None, None, None), loop).result()
+
+    @staticmethod
+    async def infer_and_encode(original_img, options: EnhancementOptions) -> dict:
+        """
+        RUNS EACH STAGE ON ITS OWN EXECUTOR (SEE APP/SERVICES/stages.py).
+        A MODEL SLOT IS HELD ONLY AROUND THE MODEL STAGES: METRICS AND
+        ENCODING OF THIS IMAGE OVERLAP WITH INFERENCE OF THE NEXT ONE.
+        IN FUSED MODE THE UPSCALER WORKS ON THE ORIGINAL IMAGE, SO restore AND
+        upscale RUN CONCURRENTLY (EACH IN ITS OWN SLOT) BEFORE THE paste STAGE
+        (ITS OWN EXECUTOR, ALSO IN A SLOT) BLENDS THE FACES IN. GFPGAN STAYS
+        PINNED FROM restore TO paste, SO THE POOL CANNOT EVICT IT IN BETWEEN.
+        """
+        start_time = time.time()
+        logger.info("--- STARTING PIPELINE ---")
+
+        async def run_model_stage(name, fn, *args):
+            async with EnhancementDispatcher.model_slot() as slot:
+                return await stage_executors.run(name, fn, *args, slot=slot)
+
+        try:
+            with PeakRSSMonitor() as memory:
+                if EnhancementPipeline.fused(options):
+                    restored, background = await asyncio.gather(
+                        run_model_stage("restore", EnhancementPipeline.restore, original_img, options),
+                        run_model_stage("upscale", EnhancementPipeline.upscale, original_img, options),
+                        # LET BOTH FINISH: A RESTORATION MUST RELEASE ITS PIN EVEN IF upscale FAILED
+                        return_exceptions=True
+                    )
+                    restoration = None if isinstance(restored, BaseException) else restored[1]
+                    try:
+                        for outcome in (restored, background):
+                            if isinstance(outcome, BaseException):
+                                raise outcome
+                        detections = restored[0]
+                        upscaled_img = await run_model_stage(
+                            "paste", EnhancementPipeline.paste, restoration, background, options
+                        )
+                    finally:
+                        if restoration is not None:
+                            restoration.release()
+                else:
+                    detections, restored_img = await run_model_stage(
+                        "restore", EnhancementPipeline.restore, original_img, options
+                    )
+                    upscaled_img = await run_model_stage("upscale", EnhancementPipeline.upscale, restored_img, options)
+                metrics_response, metrics_id = await stage_executors.run(
+                    "metrics", EnhancementPipeline.evaluate, original_img, upscaled_img, detections, options
+                )
+        except Exception as e:
+            logger.error(f"PIPELINE ERROR: {str(e)}")
+            return EnhancementPipeline.failure_result(e, time.time() - start_time)
+
+        result = EnhancementPipeline.success_result(upscaled_img, metrics_response, metrics_id, start_time)
+        result["peak_rss_mb"] = memory.peak_mb
+        logger.info(f"PEAK RSS DURING PIPELINE: {memory.peak_mb}MB")
+        return await stage_executors.run("encode", EnhancementPipeline.encode_result, result, options)
@@ -5,32 +5,94 @@ from PIL import Image
 import io
 from APP.CORE.config import settings
 
+# OUTPUT FORMAT -> (CV2 EXTENSION, MEDIA TYPE, QUALITY FLAG)
+OUTPUT_FORMATS = {
+    "jpeg": (".jpg", "image/jpeg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", "image/webp", cv2.IMWRITE_WEBP_QUALITY),
+    "png": (".png", "image/png", None),
+}
+
+# JPEG DCT SCALING: DECODE AT 1/N RESOLUTION WITHOUT MATERIALIZING THE FULL IMAGE
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
 class ImageUtils:
     @staticmethod
-    def bytes_to_numpy(image_bytes: bytes) -> np.ndarray:
+    def bytes_to_numpy(image_bytes: bytes, reduction: int = 1) -> np.ndarray:
         """
         CONVERTS RAW BYTES TO OPENCV IMAGE (BGR).
+        REDUCTION (1, 2, 4 OR 8) DECODES AT 1/REDUCTION OF THE SIZE (SEE reduction_factor).
         """
         # CONVERT BYTES TO NUMPY ARRAY
         nparr = np.frombuffer(image_bytes, np.uint8)
         # DECODE IMAGE
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        img = cv2.imdecode(nparr, REDUCED_DECODE_FLAGS[reduction])
         if img is None:
             raise ValueError("FAILED TO DECODE IMAGE")
         return img
 
     @staticmethod
-    def numpy_to_base64(img: np.ndarray) -> str:
+    def probe_image(image_bytes: bytes) -> tuple:
         """
-        CONVERTS OPENCV IMAGE (BGR) TO BASE64 STRING.
+        (WIDTH, HEIGHT, FORMAT) FROM THE FILE HEADER; PIL READS NO PIXELS HERE.
+        (NONE, NONE, NONE) IF PIL CANNOT PARSE IT (THE DECODER THEN DECIDES).
+        SIZES ARE BEFORE EXIF ROTATION.
+        """
+        try:
+            with Image.open(io.BytesIO(image_bytes)) as img:
+                return img.width, img.height, img.format
+        except Image.DecompressionBombError:
+            raise ValueError("IMAGE HAS TOO MANY PIXELS")
+        except Exception:
+            return None, None, None
+
+    @staticmethod
+    def reduction_factor(width: int, height: int, image_format: str, max_dim: int) -> int:
+        """
+        LARGEST JPEG DCT SCALE (8, 4, 2) THAT STILL DECODES AT LEAST max_dim ON
+        THE LONG SIDE, SO constrain_image_size ONLY FINISHES THE DOWNSCALE.
+        OTHER FORMATS HAVE NO REDUCED DECODE (OPENCV WOULD DECODE IN FULL AND RESIZE).
+        """
+        if image_format != "JPEG" or not width or not height:
+            return 1
+        long_side = max(width, height)
+        for factor in (8, 4, 2):
+            # LIBJPEG ROUNDS SCALED SIZES UP
+            if -(-long_side // factor) >= max_dim:
+                return factor
+        return 1
+
+    @staticmethod
+    def encode_image(img: np.ndarray, output_format: str = "jpeg", quality: int = 95) -> bytes:
         """
-        # ENCODE TO JPEG
-        success, buffer = cv2.imencode('.jpg', img)
+        ENCODES OPENCV IMAGE (BGR) AS JPEG, WEBP OR PNG.
+        QUALITY (1-100) APPLIES TO JPEG AND WEBP; PNG IS LOSSLESS.
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"UNSUPPORTED OUTPUT FORMAT: {output_format}")
+
+        extension, _, quality_flag = OUTPUT_FORMATS[output_format]
+        params = [quality_flag, int(quality)] if quality_flag is not None else [cv2.IMWRITE_PNG_COMPRESSION, 3]
+
+        success, buffer = cv2.imencode(extension, img, params)
         if not success:
             raise ValueError("FAILED TO ENCODE IMAGE")
-        # CONVERT TO BASE64
-        img_str = base64.b64encode(buffer).decode('utf-8')
-        return img_str
+        return buffer.tobytes()
+
+    @staticmethod
+    def media_type(output_format: str) -> str:
+        return OUTPUT_FORMATS[output_format][1]
+
+    @staticmethod
+    def numpy_to_base64(img: np.ndarray, output_format: str = "jpeg", quality: int = 95) -> str:
+        """
+        CONVERTS OPENCV IMAGE (BGR) TO BASE64 STRING.
+        """
+        return base64.b64encode(ImageUtils.encode_image(img, output_format, quality)).decode('utf-8')
 
     @staticmethod
     def denoise_image(img: np.ndarray, strength: float = 3.0) -> np.ndarray:
@@ -0,0 +1,250 @@
+import asyncio
+import itertools
+import math
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from APP.CORE.config import settings
+from APP.CORE.logging import logger
+from APP.SCHEMAS.enhancement import EnhancementOptions, JobStatus
+from APP.SERVICES.dispatcher import EnhancementDispatcher
+
+
+FINISHED_STATUSES = (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class QueueFullError(Exception):
+    """
+    RAISED WHEN THE QUEUE IS AT CAPACITY.
+    CARRIES AN ESTIMATE (SECONDS) OF WHEN A SLOT WILL FREE UP.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"JOB QUEUE FULL. RETRY AFTER {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Job:
+    """
+    A SINGLE ENHANCEMENT JOB AND ITS LIFECYCLE TIMESTAMPS.
+    THE UPLOAD IS DROPPED AS SOON AS THE JOB LEAVES THE QUEUE.
+    """
+
+    def __init__(self, image_bytes: bytes, priority: int, sequence: int, options: EnhancementOptions = None):
+        self.job_id = uuid.uuid4().hex
+        self.priority = priority
+        self.options = options or EnhancementOptions()
+        self.sequence = sequence
+        self.status = JobStatus.QUEUED
+        self.image_bytes: Optional[bytes] = image_bytes
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def finish(self, status: JobStatus, result: Optional[dict] = None, error: Optional[str] = None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.image_bytes = None
+        self.finished_at = time.time()
+
+
+class JobQueue:
+    """
+    BOUNDED IN-PROCESS PRIORITY QUEUE DRAINED BY A POOL OF ASYNC WORKERS.
+    LOWER PRIORITY VALUES ARE SERVED FIRST; EQUAL PRIORITIES ARE FIFO.
+    """
+
+    def __init__(self, max_size: int, num_workers: int):
+        self.max_size = max_size
+        self.num_workers = max(1, num_workers)
+
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._janitor: Optional[asyncio.Task] = None
+        self._jobs: Dict[str, Job] = {}
+        self._sequence = itertools.count()
+
+        # NUMBER OF QUEUED (NOT CANCELLED) JOBS AND CURRENTLY RUNNING JOBS
+        self._pending = 0
+        self._running = 0
+
+        # EXPONENTIAL MOVING AVERAGE OF JOB DURATION, USED FOR RETRY-AFTER
+        self._avg_duration = float(settings.JOB_ESTIMATED_SECONDS)
+
+    # ---------------------------------------------------------
+    # LIFECYCLE
+    # ---------------------------------------------------------
+    async def start(self):
+        """
+        SPAWNS THE WORKER POOL AND THE EXPIRY TASK. CALLED FROM THE APP LIFESPAN.
+        """
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"job-worker-{i}")
+            for i in range(self.num_workers)
+        ]
+        self._janitor = asyncio.create_task(self._expire_periodically(), name="job-janitor")
+        logger.info(f"JOB QUEUE STARTED WITH {self.num_workers} WORKER(S), CAPACITY {self.max_size}.")
+
+    async def stop(self):
+        """
+        CANCELS THE WORKER POOL. QUEUED JOBS ARE DROPPED.
+        """
+        tasks = self._workers + ([self._janitor] if self._janitor else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._janitor = None
+        logger.info("JOB QUEUE STOPPED.")
+
+    # ---------------------------------------------------------
+    # PUBLIC API
+    # ---------------------------------------------------------
+    def submit(self, image_bytes: bytes, priority: int, options: EnhancementOptions = None) -> Job:
+        """
+        ENQUEUES A JOB OR RAISES QueueFullError WITHOUT BLOCKING.
+        """
+        if self._queue is None:
+            raise RuntimeError("JOB QUEUE NOT STARTED")
+
+        self._purge_expired()
+
+        if self._pending >= self.max_size:
+            raise QueueFullError(self.estimate_retry_after())
+
+        job = Job(image_bytes, priority, next(self._sequence), options)
+        self._jobs[job.job_id] = job
+        self._queue.put_nowait((priority, job.sequence, job.job_id))
+        self._pending += 1
+
+        logger.info(f"JOB {job.job_id} QUEUED (PRIORITY {priority}, DEPTH {self._pending}).")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._purge_expired()
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        CANCELS A QUEUED OR RUNNING JOB.
+        A RUNNING PIPELINE CANNOT BE INTERRUPTED, SO ITS RESULT IS DISCARDED.
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.is_finished:
+            return job
+
+        if job.status == JobStatus.QUEUED:
+            self._pending -= 1
+
+        job.finish(JobStatus.CANCELLED)
+        logger.info(f"JOB {job_id} CANCELLED.")
+        return job
+
+    def queue_position(self, job: Job) -> Optional[int]:
+        """
+        1-BASED POSITION OF A QUEUED JOB (NONE IF NOT QUEUED).
+        """
+        if job.status != JobStatus.QUEUED:
+            return None
+
+        ahead = sum(
+            1 for other in self._jobs.values()
+            if other.status == JobStatus.QUEUED
+            and (other.priority, other.sequence) < (job.priority, job.sequence)
+        )
+        return ahead + 1
+
+    def estimate_retry_after(self) -> int:
+        """
+        SECONDS UNTIL THE BACKLOG SHOULD HAVE DRAINED ENOUGH TO ACCEPT A NEW JOB.
+        """
+        backlog = self._pending + self._running
+        seconds = self._avg_duration * backlog / self.num_workers
+        return max(1, math.ceil(seconds))
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._pending,
+            "running": self._running,
+            "capacity": self.max_size,
+            "workers": self.num_workers,
+            "avg_job_seconds": round(self._avg_duration, 3),
+        }
+
+    # ---------------------------------------------------------
+    # INTERNALS
+    # ---------------------------------------------------------
+    async def _worker(self, index: int):
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+
+            # CANCELLED OR EXPIRED WHILE WAITING
+            if job is None or job.status != JobStatus.QUEUED:
+                continue
+
+            self._pending -= 1
+            self._running += 1
+            job.status = JobStatus.RUNNING
+            job.started_at = time.time()
+            image_bytes, job.image_bytes = job.image_bytes, None
+
+            try:
+                result = await EnhancementDispatcher.run(image_bytes, job.options)
+            except Exception as e:
+                logger.exception(f"JOB {job_id} FAILED: {e}")
+                result = {"success": False, "message": "IMAGE PROCESSING FAILED"}
+            finally:
+                self._running -= 1
+
+            duration = time.time() - job.started_at
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+
+            if job.status == JobStatus.CANCELLED:
+                logger.info(f"JOB {job_id} FINISHED AFTER CANCELLATION. RESULT DISCARDED.")
+                continue
+
+            if result.get("success"):
+                job.finish(JobStatus.SUCCEEDED, result=result)
+            else:
+                job.finish(JobStatus.FAILED, error=result.get("message", "IMAGE PROCESSING FAILED"))
+
+            logger.info(f"JOB {job_id} {job.status.value.upper()} IN {duration:.2f}s (WORKER {index}).")
+
+    async def _expire_periodically(self):
+        """
+        FINISHED JOBS HOLD THEIR ENCODED RESULT: PURGE THEM EVEN WITHOUT TRAFFIC,
+        SO JOB_RESULT_TTL_SECONDS BOUNDS MEMORY.
+        """
+        interval = max(1, min(settings.JOB_RESULT_TTL_SECONDS, 60))
+        while True:
+            await asyncio.sleep(interval)
+            self._purge_expired()
+
+    def _purge_expired(self):
+        """
+        FORGETS FINISHED JOBS OLDER THAN THE CONFIGURED TTL.
+        """
+        cutoff = time.time() - settings.JOB_RESULT_TTL_SECONDS
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.is_finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+# GLOBAL SINGLETON INSTANCE
+job_queue = JobQueue(
+    max_size=settings.MAX_QUEUED_JOBS,
+    num_workers=settings.MAX_CONCURRENT_REQUESTS
+)
@@ -1,16 +1,25 @@
+import os
 import torch
 import gc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from APP.CORE.config import settings
 from APP.CORE.logging import logger
+from APP.MODELS.backends import resolve_precision
 from APP.MODELS.gfpgan import GFPGANWrapper
-from APP.MODELS.realesrgan import RealESRGANWrapper
+from APP.MODELS.realesrgan import UPSCALE_QUALITY_LEVELS, UPSCALERS, RealESRGANWrapper
 from APP.MODELS.insightface import InsightFaceWrapper
+from APP.SERVICES.model_pool import ModelPool
+from APP.SERVICES.startup import startup
+from APP.SERVICES.thread_budget import thread_budget
 
 
 class ModelManager:
     """
     SINGLETON CLASS TO MANAGE ALL AI MODELS.
-    ENSURES MODELS ARE LOADED ONLY ONCE AND SHARED ACROSS REQUESTS.
+    MODELS ARE REGISTERED WITH A ModelPool AND SHARED ACROSS REQUESTS. EACH CALL
+    PINS ITS MODEL, SO UNDER MODEL_MEMORY_BUDGET_MB IDLE MODELS CAN BE EVICTED
+    (AND RELOADED ON THEIR NEXT USE) WITHOUT AFFECTING IN-FLIGHT REQUESTS.
     """
     _instance = None
 
@@ -18,76 +27,282 @@ class ModelManager:
         # SINGLETON INITIALIZATION
         if cls._instance is None:
             cls._instance = super(ModelManager, cls).__new__(cls)
-            cls._instance.gfpgan = None
-            cls._instance.realesrgan = None
-            cls._instance.insightface = None
+            cls._instance.pool = ModelPool(budget_mb=settings.MODEL_MEMORY_BUDGET_MB)
+            cls._instance.upscaler_names = []
         return cls._instance
 
     # ---------------------------------------------------------
-    # MODEL LOADING
+    # LOADED INSTANCES (NONE WHILE NOT RESIDENT)
     # ---------------------------------------------------------
+    @property
+    def gfpgan(self):
+        return self.pool.peek("gfpgan")
+
+    @property
+    def realesrgan(self):
+        return self.pool.peek("upscaler:x4plus")
+
+    @property
+    def insightface(self):
+        return self.pool.peek("insightface")
+
+    @property
+    def upscalers(self):
+        return {
+            name: upscaler for name in self.upscaler_names
+            if (upscaler := self.pool.peek(f"upscaler:{name}")) is not None
+        }
+
+    # ---------------------------------------------------------
+    # MODEL REGISTRATION / LOADING
+    # ---------------------------------------------------------
+    def register_models(self):
+        """
+        REGISTERS EVERY MODEL WITH THE POOL. NOTHING IS LOADED HERE.
+        OPTIONAL UPSCALERS WITHOUT WEIGHTS ARE LEFT OUT OF SELECTION.
+        """
+        def load(model):
+            model.load()
+            return model
+
+        gfpgan_class, upscaler_class, insightface_class = self.model_classes()
+
+        self.pool.register("gfpgan", lambda: load(
+            gfpgan_class(model_path=settings.GFPGAN_MODEL_PATH, device=settings.DEVICE)
+        ))
+        self.pool.register("insightface", lambda: load(
+            insightface_class(
+                model_name=settings.INSIGHTFACE_MODEL_NAME,
+                device=settings.DEVICE,
+                num_threads=thread_budget.threads_per_slot if settings.THREAD_BUDGET else 0
+            )
+        ))
+
+        for name in settings.UPSCALERS:
+            if name in self.upscaler_names:
+                continue
+            # X4PLUS IS THE FALLBACK FOR EVERY SCALE AND QUALITY: ITS LOAD FAILS LOUDLY
+            if name != "x4plus" and not settings.STUB_MODELS and not os.path.exists(UPSCALERS[name].model_path):
+                logger.warning(f"REAL-ESRGAN {name.upper()} SKIPPED (NO WEIGHTS).")
+                continue
+            self.pool.register(f"upscaler:{name}", lambda name=name: load(
+                upscaler_class(model_path=UPSCALERS[name].model_path, device=settings.DEVICE, name=name)
+            ))
+            self.upscaler_names.append(name)
+
+    @staticmethod
+    def model_classes():
+        """
+        (GFPGAN, REAL-ESRGAN, INSIGHTFACE) WRAPPER CLASSES. WITH STUB_MODELS,
+        THE WEIGHTLESS STAND-INS OF APP/MODELS/stubs.py (LOAD TESTING).
+        """
+        if settings.STUB_MODELS:
+            from APP.MODELS.stubs import StubGFPGANWrapper, StubInsightFaceWrapper, StubRealESRGANWrapper
+
+            logger.warning("STUB_MODELS IS SET: SERVING STAND-IN MODELS, NOT REAL ENHANCEMENT.")
+            return StubGFPGANWrapper, StubRealESRGANWrapper, StubInsightFaceWrapper
+        return GFPGANWrapper, RealESRGANWrapper, InsightFaceWrapper
+
     def load_all_models(self):
         """
-        LOADS ALL MODELS INTO MEMORY.
+        REGISTERS ALL MODELS AND, UNLESS LAZY_MODEL_LOADING, LOADS THEM.
         CALLED ON APPLICATION STARTUP.
+        MODELS ALREADY LOADED BY THE GUNICORN MASTER (PRELOAD MODE) ARE REUSED.
         """
         logger.info("INITIALIZING MODEL MANAGER...")
+        self.register_models()
+
+        if settings.LAZY_MODEL_LOADING:
+            logger.info(f"LAZY MODEL LOADING: {len(self.pool.names())} MODELS LOAD ON FIRST USE.")
+            return
 
-        # LOAD GFPGAN
-        logger.info("LOADING GFPGAN...")
-        self.gfpgan = GFPGANWrapper(
-            model_path=settings.GFPGAN_MODEL_PATH,
-            device=settings.DEVICE
-        )
-        self.gfpgan.load()
-
-        # LOAD REAL-ESRGAN
-        logger.info("LOADING REAL-ESRGAN...")
-        self.realesrgan = RealESRGANWrapper(
-            model_path=settings.REALESRGAN_MODEL_PATH,
-            device=settings.DEVICE
-        )
-        self.realesrgan.load()
-
-        # LOAD INSIGHTFACE
-        logger.info("LOADING INSIGHTFACE...")
-        self.insightface = InsightFaceWrapper(
-            model_name=settings.INSIGHTFACE_MODEL_NAME,
-            device=settings.DEVICE
-        )
-        self.insightface.load()
+        # INSIGHTFACE ALWAYS LOADS PER WORKER: ONNXRUNTIME SESSIONS ARE NOT
+        # FORK-SAFE. MODELS PRELOADED BY THE GUNICORN MASTER ARE SKIPPED.
+        self.load_models(self.shared_model_names() + ["insightface"])
 
         logger.info("ALL MODELS LOADED AND READY.")
 
+    def load_shared_models(self):
+        """
+        LOADS THE PYTORCH MODELS (GFPGAN, REAL-ESRGAN).
+        SAFE TO CALL IN THE GUNICORN MASTER BEFORE FORKING: THE WEIGHTS ARE
+        ONLY READ DURING INFERENCE, SO WORKERS SHARE THEM COPY-ON-WRITE.
+        """
+        self.register_models()
+        self.load_models(self.shared_model_names())
+
+    def shared_model_names(self):
+        return ["gfpgan"] + [f"upscaler:{name}" for name in self.upscaler_names]
+
+    def load_models(self, names):
+        """
+        LOADS THE NAMED POOL MODELS, CONCURRENTLY IF PARALLEL_MODEL_LOADING
+        (DEFAULT: UNLESS A MEMORY BUDGET IS SET): WEIGHT READS, LIBRARY IMPORTS
+        AND ONNX SESSION SETUP OVERLAP.
+        EVERY LOAD RUNS TO COMPLETION BEFORE THE FIRST FAILURE IS RAISED.
+        """
+        names = [name for name in names if self.pool.peek(name) is None]
+
+        def load(name):
+            with startup.phase(f"load {name}"):
+                self.pool.load(name)
+
+        parallel = settings.PARALLEL_MODEL_LOADING
+        if parallel is None:
+            parallel = settings.MODEL_MEMORY_BUDGET_MB <= 0
+
+        if not parallel or len(names) < 2:
+            for name in names:
+                load(name)
+            return
+
+        with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="model-load") as executor:
+            futures = [executor.submit(load, name) for name in names]
+        for future in futures:
+            future.result()
+
+    def preload_for_fork(self):
+        """
+        LOADS SHARED MODELS IN THE GUNICORN MASTER AND FREEZES THE HEAP.
+        gc.freeze() MOVES EVERY LIVE OBJECT TO A PERMANENT GENERATION SO THE
+        WORKERS' GARBAGE COLLECTOR NEVER WRITES TO (AND UN-SHARES) THEIR PAGES.
+        """
+        logger.info("PRELOADING SHARED MODELS IN MASTER PROCESS...")
+        self.load_shared_models()
+        gc.collect()
+        gc.freeze()
+        logger.info(f"PRELOAD COMPLETE. {gc.get_freeze_count()} OBJECTS FROZEN.")
+
     # ---------------------------------------------------------
     # BACKWARD COMPATIBILITY METHODS
     # FIXES: 'ModelManager' object has no attribute 'enhance_face'
     # ---------------------------------------------------------
-    def enhance_face(self, img):
+    def enhance_face(self, img, weight=0.5, detections=None, speed=None):
         """
         FACE RESTORATION USING GFPGAN.
-        USED BY OLD PIPELINE IMPLEMENTATIONS.
+        PASS `detections` (FROM detect_faces) TO SKIP GFPGAN'S OWN DETECTOR.
         """
-        if self.gfpgan is None:
-            raise RuntimeError("GFPGAN MODEL NOT LOADED")
-        return self.gfpgan.predict(img)
+        with self.pool.acquire("gfpgan") as gfpgan:
+            return gfpgan.predict(img, weight=weight, detections=detections, speed=speed)
 
-    def upscale_image(self, img, scale=2):
+    def restore_faces(self, img, detections, weight=0.5, speed=None):
+        """
+        FUSED MODE, FIRST HALF: RESTORED FACE CROPS, NOT YET PASTED (SEE paste_faces).
+        THE RESULT KEEPS GFPGAN PINNED UNTIL paste_faces() OR ITS release().
         """
-        IMAGE UPSCALING USING REAL-ESRGAN.
+        with ExitStack() as pin:
+            gfpgan = pin.enter_context(self.pool.acquire("gfpgan"))
+            restoration = gfpgan.restore_faces(img, detections, weight=weight, speed=speed)
+            restoration.keep(gfpgan, pin.pop_all())
+        return restoration
+
+    def paste_faces(self, restoration, background=None, scale=1):
+        """
+        FUSED MODE, SECOND HALF: PASTES THE FACES ONTO THE UPSCALED BACKGROUND
+        WITH THE GFPGAN INSTANCE THAT RESTORED THEM, THEN RELEASES ITS PIN.
+        """
+        try:
+            if restoration.model is not None:
+                return restoration.model.paste_faces(restoration, background=background, scale=scale)
+            with self.pool.acquire("gfpgan") as gfpgan:
+                return gfpgan.paste_faces(restoration, background=background, scale=scale)
+        finally:
+            restoration.release()
+
+    def select_upscaler(self, scale, quality=None):
+        """
+        CHEAPEST AVAILABLE UPSCALER WHOSE NATIVE SCALE REACHES `scale` AT `quality`
+        OR BETTER. NONE FOR SCALE 1 (NO UPSCALING NEEDED).
+        """
+        if scale <= 1:
+            return None
+
+        level = UPSCALE_QUALITY_LEVELS[quality or settings.DEFAULT_UPSCALE_QUALITY]
+        candidates = [
+            name for name in self.upscaler_names
+            if UPSCALERS[name].scale >= scale and UPSCALE_QUALITY_LEVELS[UPSCALERS[name].quality] >= level
+        ]
+        if not candidates:
+            raise RuntimeError(f"NO UPSCALER AVAILABLE FOR {scale}x AT {quality} QUALITY")
+        return min(candidates, key=lambda name: UPSCALERS[name].relative_cost)
+
+    def resolved_precision(self, name, speed=None):
+        """
+        PRECISION POOL MODEL `name` RUNS AT FOR A SPEED TIER, AFTER FALLBACKS.
+        A MODEL THAT IS NOT RESIDENT IS PREDICTED WITH THE SAME CHECKS AS
+        build_backend (BF16 KERNELS, INT8 EXPORT), SO BOTH GIVE ONE CACHE KEY.
+        """
+        model = self.pool.peek(name)
+        if model is not None and model.backends:
+            return model.resolved_precision(speed)
+
+        precision = settings.SPEED_TIERS.get(speed or settings.DEFAULT_SPEED_TIER, "fp32")
+        return resolve_precision(precision, self.model_path(name), torch.device(settings.DEVICE))
+
+    @staticmethod
+    def model_path(name):
+        """
+        WEIGHTS OF POOL MODEL `name` (EXPORTS LIVE NEXT TO THEM).
+        """
+        if name == "gfpgan":
+            return settings.GFPGAN_MODEL_PATH
+        return UPSCALERS[name.split(":", 1)[1]].model_path
+
+    def upscale_image(self, img, scale=2, speed=None, quality=None):
+        """
+        IMAGE UPSCALING USING THE CHEAPEST SUITABLE REAL-ESRGAN MODEL.
         OPTIONAL HELPER FOR PIPELINE.
         """
-        if self.realesrgan is None:
+        if not self.upscaler_names:
             raise RuntimeError("REAL-ESRGAN MODEL NOT LOADED")
-        return self.realesrgan.predict(img, outscale=scale)
+
+        name = self.select_upscaler(scale, quality)
+        if name is None:
+            return img
+
+        logger.info(f"UPSCALING {scale}x WITH REAL-ESRGAN {name.upper()}.")
+        with self.pool.acquire(f"upscaler:{name}") as upscaler:
+            return upscaler.predict(img, outscale=scale, speed=speed)
 
     def get_face_embedding(self, img):
         """
         RETURNS FACE EMBEDDING USING INSIGHTFACE.
         """
-        if self.insightface is None:
-            raise RuntimeError("INSIGHTFACE MODEL NOT LOADED")
-        return self.insightface.get_embedding(img)
+        with self.pool.acquire("insightface") as insightface:
+            return insightface.get_embedding(img)
+
+    def detect_faces(self, img):
+        """
+        SHARED DETECTION STAGE: BOXES + LANDMARKS FOR RESTORATION AND IDENTITY.
+        """
+        with self.pool.acquire("insightface") as insightface:
+            return insightface.detect(img)
+
+    def get_face_embeddings(self, img, landmarks):
+        """
+        RECOGNITION EMBEDDINGS FOR ALREADY-DETECTED FACES.
+        """
+        with self.pool.acquire("insightface") as insightface:
+            return insightface.get_face_embeddings(img, landmarks)
+
+    def get_batched_embeddings(self, sources):
+        """
+        RECOGNITION EMBEDDINGS FOR FACES FROM SEVERAL IMAGES IN ONE BATCH.
+        """
+        with self.pool.acquire("insightface") as insightface:
+            return insightface.get_batched_embeddings(sources)
+
+    def set_num_threads(self, num_threads):
+        """
+        NEW THREAD BUDGET FOR THE LOADED ONNX RUNTIME SESSIONS (TORCH AND
+        OPENCV COUNTS ARE PROCESS-WIDE, SET BY thread_budget.apply).
+        MODELS LOADED LATER READ thread_budget WHEN THEY LOAD.
+        """
+        if not settings.THREAD_BUDGET:
+            return
+        insightface = self.pool.peek("insightface")
+        if insightface is not None:
+            insightface.set_num_threads(num_threads)
 
     # ---------------------------------------------------------
     # MODEL UNLOAD / MEMORY CLEANUP
@@ -99,13 +314,8 @@ class ModelManager:
         """
         logger.info("UNLOADING MODELS...")
 
-        # REMOVE REFERENCES
-        self.gfpgan = None
-        self.realesrgan = None
-        self.insightface = None
-
-        # FORCE PYTHON GARBAGE COLLECTION
-        gc.collect()
+        # RELEASES THE WEIGHTS AND RUNS THE GARBAGE COLLECTOR
+        self.pool.unload_all()
 
         # CLEAR CUDA CACHE IF AVAILABLE
         if torch.cuda.is_available():
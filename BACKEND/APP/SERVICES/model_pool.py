@@ -0,0 +1,215 @@
+import gc
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from APP.CORE.logging import logger
+from APP.UTILS.memory import current_rss_bytes
+
+MB = 1024 * 1024
+
+
+class PoolEntry:
+    """
+    ONE REGISTERED MODEL: ITS LOADER, THE LOADED INSTANCE (IF ANY) AND COUNTERS.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self.name = name
+        self.loader = loader
+        self.instance = None
+        self.pins = 0
+        # RSS GROWTH DURING THE LAST LOAD (LOADS ARE SERIALIZED UNDER A
+        # BUDGET), AT LEAST THE SIZE THE MODEL REPORTS VIA memory_bytes().
+        # WITHOUT A BUDGET LOADS MAY OVERLAP, SO ONLY memory_bytes() COUNTS
+        self.size_bytes = 0
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+        self.last_load_ms = None
+        self.last_used = None
+        # ONE LOAD PER MODEL AT A TIME; OTHER MODELS STAY USABLE MEANWHILE
+        self.load_lock = threading.Lock()
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.instance is not None,
+            "pinned": self.pins,
+            "size_mb": round(self.size_bytes / MB, 1),
+            "last_load_ms": self.last_load_ms,
+            "loads": self.loads,
+            "hits": self.hits,
+            "evictions": self.evictions,
+            "last_used": self.last_used,
+        }
+
+
+class ModelPool:
+    """
+    LOADS MODELS ON FIRST USE AND KEEPS THE RESIDENT TOTAL UNDER A BUDGET BY
+    EVICTING THE LEAST RECENTLY USED IDLE MODELS.
+    acquire() PINS A MODEL FOR THE DURATION OF A CALL: A PINNED MODEL IS NEVER
+    EVICTED, SO IN-FLIGHT REQUESTS KEEP THEIR MODELS. IF EVERYTHING RESIDENT IS
+    PINNED THE BUDGET IS EXCEEDED (WITH A WARNING) RATHER THAN FAILING REQUESTS.
+    UNDER A BUDGET, LOADS RUN ONE AT A TIME: A MODEL IS SIZED BY THE RSS GROWTH
+    WHILE IT LOADS, WHICH WOULD ALSO COUNT ANY OTHER LOAD RUNNING ALONGSIDE.
+    """
+
+    def __init__(self, budget_mb: int = 0):
+        # 0 = UNLIMITED (NOTHING IS EVER EVICTED)
+        self.budget_bytes = budget_mb * MB
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        # LRU ORDER: LEAST RECENTLY USED FIRST
+        self._entries: "OrderedDict[str, PoolEntry]" = OrderedDict()
+
+    # ---------------------------------------------------------
+    # REGISTRATION
+    # ---------------------------------------------------------
+    def register(self, name: str, loader: Callable[[], Any]):
+        """
+        loader() MUST RETURN A READY (LOADED) MODEL. NOTHING IS LOADED YET.
+        """
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = PoolEntry(name, loader)
+
+    def names(self) -> List[str]:
+        return list(self._entries)
+
+    def peek(self, name: str) -> Optional[Any]:
+        """
+        THE LOADED INSTANCE OR NONE. NEVER LOADS, NEVER PINS.
+        """
+        entry = self._entries.get(name)
+        return entry.instance if entry is not None else None
+
+    # ---------------------------------------------------------
+    # USE
+    # ---------------------------------------------------------
+    @contextmanager
+    def acquire(self, name: str, count_hit: bool = True) -> Iterator[Any]:
+        """
+        YIELDS THE MODEL, LOADING IT IF NEEDED, PINNED UNTIL THE BLOCK EXITS.
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            raise RuntimeError(f"MODEL NOT REGISTERED: {name}")
+
+        with self._lock:
+            entry.pins += 1
+            self._entries.move_to_end(name)
+            if entry.instance is not None and count_hit:
+                entry.hits += 1
+
+        try:
+            yield entry.instance if entry.instance is not None else self._load(entry)
+        finally:
+            with self._lock:
+                entry.pins -= 1
+                entry.last_used = time.time()
+
+    def load(self, name: str) -> Any:
+        """
+        LOADS A MODEL WITHOUT PINNING IT (STARTUP / PRELOAD). COUNTED AS A
+        LOAD (IF IT WAS NOT RESIDENT), NEVER AS A HIT.
+        """
+        with self.acquire(name, count_hit=False) as instance:
+            return instance
+
+    def _load(self, entry: PoolEntry) -> Any:
+        with entry.load_lock, (self._load_lock if self.budget_bytes > 0 else nullcontext()):
+            if entry.instance is not None:
+                return entry.instance
+
+            # MAKE ROOM FOR WHAT THIS MODEL TOOK LAST TIME (UNKNOWN ON FIRST LOAD)
+            self._evict(extra_bytes=entry.size_bytes)
+
+            rss_before = current_rss_bytes()
+            start = time.perf_counter()
+            instance = entry.loader()
+            load_ms = round((time.perf_counter() - start) * 1000, 1)
+
+            # FREED MEMORY REUSED BY THE ALLOCATOR DOES NOT SHOW UP AS RSS GROWTH
+            reported = instance.memory_bytes() if hasattr(instance, "memory_bytes") else 0
+            if self.budget_bytes > 0:
+                reported = max(reported, current_rss_bytes() - rss_before)
+            with self._lock:
+                entry.instance = instance
+                entry.size_bytes = reported
+                entry.loads += 1
+                entry.last_load_ms = load_ms
+
+            logger.info(
+                f"MODEL POOL: LOADED {entry.name.upper()} IN {load_ms:.0f}ms "
+                f"(~{entry.size_bytes / MB:.0f}MB, {self.resident_bytes() / MB:.0f}MB RESIDENT)."
+            )
+            self._evict()
+            return instance
+
+    # ---------------------------------------------------------
+    # EVICTION
+    # ---------------------------------------------------------
+    def resident_bytes(self) -> int:
+        return sum(entry.size_bytes for entry in self._entries.values() if entry.instance is not None)
+
+    def _evict(self, extra_bytes: int = 0):
+        """
+        UNLOADS IDLE MODELS, LEAST RECENTLY USED FIRST, UNTIL RESIDENT + extra_bytes FITS.
+        """
+        if self.budget_bytes <= 0:
+            return
+
+        evicted = []
+        with self._lock:
+            total = self.resident_bytes() + extra_bytes
+            for entry in self._entries.values():
+                if total <= self.budget_bytes:
+                    break
+                if entry.instance is None or entry.pins > 0:
+                    continue
+                evicted.append(entry.instance)
+                entry.instance = None
+                entry.evictions += 1
+                total -= entry.size_bytes
+                logger.info(f"MODEL POOL: EVICTED {entry.name.upper()} (~{entry.size_bytes / MB:.0f}MB).")
+
+            if total > self.budget_bytes:
+                logger.warning(
+                    f"MODEL POOL: {total / MB:.0f}MB NEEDED, BUDGET {self.budget_bytes / MB:.0f}MB. "
+                    f"REMAINING MODELS ARE IN USE."
+                )
+
+        # OUTSIDE THE LOCK: RELEASING WEIGHTS CAN TAKE A WHILE
+        self._release(evicted)
+
+    def unload_all(self):
+        with self._lock:
+            instances = [entry.instance for entry in self._entries.values() if entry.instance is not None]
+            for entry in self._entries.values():
+                entry.instance = None
+
+        self._release(instances)
+
+    @staticmethod
+    def _release(instances: List[Any]):
+        # unload() DROPS THE WEIGHTS EVEN IF SOMETHING STILL REFERENCES THE WRAPPER
+        for instance in instances:
+            unload = getattr(instance, "unload", None)
+            if unload is not None:
+                unload()
+        if instances:
+            gc.collect()
+
+    # ---------------------------------------------------------
+    # METRICS
+    # ---------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "budget_mb": round(self.budget_bytes / MB, 1) if self.budget_bytes else None,
+                "resident_mb": round(self.resident_bytes() / MB, 1),
+                "models": {name: entry.stats() for name, entry in self._entries.items()},
+            }
@@ -1,103 +1,374 @@
 import numpy as np
 import cv2
+import hashlib
 import logging
+import os
 import time
+from contextlib import nullcontext
 
 from APP.CORE.config import settings
+from APP.CORE.telemetry import FACES_PER_IMAGE, INPUT_MEGAPIXELS
+from APP.SCHEMAS.enhancement import EnhancementOptions, MetricsMode, OutputFormat
+from APP.MODELS.gfpgan import FaceRestoration
+from APP.MODELS.realesrgan import UPSCALERS
+from APP.SERVICES.deferred_metrics import deferred_metrics
 from APP.SERVICES.model_manager import model_manager
 from APP.SERVICES.image_utils import ImageUtils
 from APP.UTILS.metrics import MetricsCalculator
+from APP.UTILS.memory import PeakRSSMonitor
+from APP.UTILS.timing import stage
 
 logger = logging.getLogger("face_enhancer")
 
+# PIPELINE PARAMETERS
+# EVERYTHING THAT CHANGES THE OUTPUT MUST BE LISTED IN pipeline_params()
+RESTORE_WEIGHT = 0.5
+
+
+def model_version(path: str) -> str:
+    """
+    IDENTIFIES A WEIGHTS FILE BY NAME AND SIZE (CHEAP, NO HASHING).
+    """
+    try:
+        return f"{os.path.basename(path)}:{os.path.getsize(path)}"
+    except OSError:
+        return os.path.basename(path)
+
 
 class EnhancementPipeline:
     @staticmethod
-    def process_image(image_bytes: bytes) -> dict:
+    def pipeline_params(options: EnhancementOptions) -> dict:
+        """
+        ALL PARAMETERS THAT AFFECT THE RESULT. USED AS PART OF THE CACHE KEY.
+        """
+        upscaler = model_manager.select_upscaler(options.scale, options.upscale_quality.value)
+
+        return {
+            "scale": options.scale,
+            # THE MODEL THAT WOULD RUN (DEPENDS ON WHICH UPSCALERS HAVE WEIGHTS)
+            "upscaler": upscaler,
+            "restore_weight": RESTORE_WEIGHT,
+            "fused_upscale": EnhancementPipeline.fused(options),
+            "output_format": options.output_format.value,
+            # PNG IS LOSSLESS: QUALITY DOES NOT CHANGE THE BYTES
+            "quality": None if options.output_format == OutputFormat.PNG else options.quality,
+            "metrics": options.metrics.value,
+            # THE PRECISION EACH MODEL RESOLVED TO (NOT THE TIER NAME, NOR A
+            # CONFIGURED MODE THAT FELL BACK TO FP32) DETERMINES THE PIXELS
+            "precision": {
+                "gfpgan": model_manager.resolved_precision("gfpgan", options.speed.value),
+                "upscaler": model_manager.resolved_precision(f"upscaler:{upscaler}", options.speed.value) if upscaler else None,
+            },
+            "metrics_fast_size": settings.METRICS_FAST_SIZE,
+            "metrics_lpips_max_size": settings.METRICS_LPIPS_MAX_SIZE,
+            "max_input_dimension": settings.MAX_INPUT_DIMENSION,
+            "gfpgan": model_version(settings.GFPGAN_MODEL_PATH),
+            "realesrgan": model_version(UPSCALERS[upscaler].model_path) if upscaler else None,
+            "insightface": settings.INSIGHTFACE_MODEL_NAME,
+            # STAND-IN OUTPUTS MUST NEVER BE SERVED AS REAL RESULTS (OR VICE VERSA)
+            "stub_models": settings.STUB_MODELS,
+        }
+
+    @staticmethod
+    def fused(options: EnhancementOptions) -> bool:
+        """
+        WHETHER FACES ARE PASTED AT THE TARGET SCALE (SEE FUSED_UPSCALE).
+        """
+        return settings.FUSED_UPSCALE and settings.SHARED_FACE_DETECTION and options.scale > 1
+
+    @staticmethod
+    def decode_image(image_bytes: bytes) -> np.ndarray:
+        """
+        DECODES THE UPLOAD AND LIMITS ITS SIZE. THE HEADER IS READ FIRST: A
+        LARGE JPEG IS DECODED DIRECTLY AT 1/2, 1/4 OR 1/8 SCALE, AND IMAGES
+        ABOVE MAX_INPUT_MEGAPIXELS ARE REJECTED BEFORE ANY PIXEL IS DECODED.
+        """
+        with stage("decode"):
+            width, height, image_format = ImageUtils.probe_image(image_bytes)
+            if width and height:
+                megapixels = width * height / 1e6
+                INPUT_MEGAPIXELS.observe(megapixels)
+                if megapixels > settings.MAX_INPUT_MEGAPIXELS:
+                    raise ValueError(f"IMAGE LARGER THAN {settings.MAX_INPUT_MEGAPIXELS} MEGAPIXELS")
+
+            reduction = ImageUtils.reduction_factor(width, height, image_format, settings.MAX_INPUT_DIMENSION)
+            original_img = ImageUtils.bytes_to_numpy(image_bytes, reduction)
+            if not (width and height):
+                INPUT_MEGAPIXELS.observe(original_img.shape[0] * original_img.shape[1] / 1e6)
+
+            # LIMIT MAX SIZE TO PREVENT AWS OOM
+            original_img = ImageUtils.constrain_image_size(
+                original_img,
+                settings.MAX_INPUT_DIMENSION
+            )
+
+        h, w = original_img.shape[:2]
+        logger.info(f"IMAGE DECODED (1/{reduction} SCALE) AND RESIZED. SHAPE: ({h}, {w}, 3)")
+        return original_img
+
+    @staticmethod
+    def pixel_digest(img: np.ndarray) -> str:
+        """
+        CONTENT HASH OF THE DECODED PIXELS (INDEPENDENT OF FILE ENCODING/METADATA).
+        """
+        digest = hashlib.sha256(str(img.shape).encode())
+        digest.update(np.ascontiguousarray(img).data)
+        return digest.hexdigest()
+
+    @staticmethod
+    def process_image(image_bytes: bytes, options: EnhancementOptions = None) -> dict:
         """
         MAIN FACE ENHANCEMENT PIPELINE.
         SYNCHRONOUS FUNCTION (CALLED INSIDE THREADPOOL).
         """
+        try:
+            original_img = EnhancementPipeline.decode_image(image_bytes)
+        except Exception as e:
+            logger.error(f"PIPELINE ERROR: {str(e)}")
+            return EnhancementPipeline.failure_result(e, 0.0)
+
+        return EnhancementPipeline.process_decoded(original_img, options)
+
+    @staticmethod
+    def failure_result(error: Exception, total_time: float) -> dict:
+        return {
+            "success": False,
+            "message": f"Processing failed: {str(error)}",
+            "image_bytes": b"",
+            "media_type": None,
+            "metrics": {
+                "psnr": 0.0,
+                "ssim": 0.0,
+                "lpips": 0.0,
+                "identity_score": 0.0
+            },
+            "processing_time_ms": int(total_time * 1000)
+        }
+
+    @staticmethod
+    def compute_identity(original_img: np.ndarray, output_img: np.ndarray, detections) -> tuple:
+        """
+        PER-FACE ARCFACE SIMILARITY BETWEEN INPUT AND OUTPUT, PLUS THEIR MEAN.
+        EACH ORIGINAL FACE IS MATCHED TO THE OUTPUT BY BOX POSITION: ITS BOX AND
+        LANDMARKS ARE MAPPED INTO OUTPUT COORDINATES, SO NO SECOND DETECTION RUNS.
+        ALL 2N CROPS GO THROUGH THE RECOGNITION MODEL AS ONE BATCH.
+        """
+        if detections is None or len(detections) == 0:
+            return 0.0, []
+
+        try:
+            fx = output_img.shape[1] / original_img.shape[1]
+            fy = output_img.shape[0] / original_img.shape[0]
+            output_faces = detections.scaled(fx, fy)
+
+            original_embeddings, output_embeddings = model_manager.get_batched_embeddings([
+                (original_img, detections.landmarks),
+                (output_img, output_faces.landmarks),
+            ])
+            scores = MetricsCalculator.calculate_identity(original_embeddings, output_embeddings)
+        except Exception as e:
+            logger.warning(f"IDENTITY SCORING FAILED: {e}")
+            return 0.0, []
+
+        face_scores = [
+            {"box": [round(float(v), 1) for v in box], "score": round(float(score), 4)}
+            for box, score in zip(detections.boxes, scores)
+        ]
+        return round(float(scores.mean()), 4), face_scores
+
+    @staticmethod
+    def compute_metrics(original_img: np.ndarray, output_img: np.ndarray, detections) -> dict:
+        """
+        FULL METRICS: PSNR, SSIM, LPIPS AND PER-FACE IDENTITY.
+        """
+        metrics = MetricsCalculator.calculate_all(original_img, output_img)
+
+        identity_score, face_scores = EnhancementPipeline.compute_identity(
+            original_img, output_img, detections
+        )
+
+        return {
+            "psnr": float(metrics.get("psnr", 0.0)),
+            "ssim": float(metrics.get("ssim", 0.0)),
+            "lpips": float(metrics.get("lpips", 0.0)),
+            "identity_score": identity_score,
+            "face_identity_scores": face_scores
+        }
+
+    @staticmethod
+    def process_decoded(original_img: np.ndarray, options: EnhancementOptions = None) -> dict:
+        """
+        RUNS RESTORATION, UPSCALING, METRICS AND ENCODING ON A DECODED IMAGE.
+        SYNCHRONOUS FUNCTION (CALLED INSIDE THREADPOOL).
+        """
+        options = options or EnhancementOptions()
+        return EnhancementPipeline.encode_result(
+            EnhancementPipeline.infer(original_img, options), options
+        )
+
+    @staticmethod
+    def infer(original_img: np.ndarray, options: EnhancementOptions = None) -> dict:
+        """
+        MODEL STAGES ONLY. THE RESULT CARRIES THE UPSCALED IMAGE AS AN ARRAY
+        UNDER "image"; encode_result() TURNS IT INTO BYTES. SPLIT SO CALLERS
+        CAN ENCODE AFTER RELEASING THE MODEL SLOT.
+        SYNCHRONOUS FUNCTION (CALLED INSIDE THREADPOOL).
+        """
         start_time = time.time()
         logger.info("--- STARTING PIPELINE ---")
 
+        with PeakRSSMonitor() as memory:
+            result = EnhancementPipeline._run_models(original_img, start_time, options or EnhancementOptions())
+
+        result["peak_rss_mb"] = memory.peak_mb
+        logger.info(f"PEAK RSS DURING PIPELINE: {memory.peak_mb}MB")
+        return result
+
+    @staticmethod
+    def encode_result(result: dict, options: EnhancementOptions = None) -> dict:
+        """
+        ENCODES THE IMAGE OF AN infer() RESULT (RAW BYTES; BASE64 ONLY FOR JSON RESPONSES).
+        SYNCHRONOUS FUNCTION (CALLED INSIDE THREADPOOL).
+        """
+        image = result.pop("image", None)
+        if not result.get("success"):
+            return result
+
+        options = options or EnhancementOptions()
+        start_time = time.time()
         try:
-            # ---------------------------------------------------------
-            # 1. DECODE IMAGE AND LIMIT SIZE
-            # ---------------------------------------------------------
-            original_img = ImageUtils.bytes_to_numpy(image_bytes)
+            with stage("encode"):
+                result["image_bytes"] = ImageUtils.encode_image(image, options.output_format.value, options.quality)
+        except Exception as e:
+            logger.error(f"ENCODING ERROR: {str(e)}")
+            return EnhancementPipeline.failure_result(e, result["processing_time_ms"] / 1000)
 
-            # LIMIT MAX SIZE TO PREVENT AWS OOM
-            original_img = ImageUtils.constrain_image_size(
+        result["media_type"] = ImageUtils.media_type(options.output_format.value)
+        result["processing_time_ms"] += int((time.time() - start_time) * 1000)
+        return result
+
+    # ---------------------------------------------------------
+    # MODEL STAGES (EACH RUNS ON ITS OWN EXECUTOR UNDER THE DISPATCHER,
+    # SEE APP/SERVICES/stages.py; _run_models CHAINS THEM IN ONE THREAD)
+    # ---------------------------------------------------------
+    @staticmethod
+    def restore(original_img: np.ndarray, options: EnhancementOptions) -> tuple:
+        """
+        SHARED FACE DETECTION (ONCE PER IMAGE) + GFPGAN RESTORATION.
+        RETURNS (DETECTIONS OR NONE, RESTORED IMAGE). IN FUSED MODE THE FACES
+        ARE NOT PASTED YET: THE SECOND VALUE IS A FaceRestoration FOR upscale().
+        """
+        detections = None
+        if settings.SHARED_FACE_DETECTION:
+            with stage("detect"):
+                detections = model_manager.detect_faces(original_img)
+            FACES_PER_IMAGE.observe(len(detections))
+            logger.info(f"DETECTED {len(detections)} FACE(S).")
+
+        logger.info("STARTING GFPGAN RESTORATION...")
+        if EnhancementPipeline.fused(options):
+            with stage("gfpgan"):
+                restoration = model_manager.restore_faces(
+                    original_img, detections, weight=RESTORE_WEIGHT, speed=options.speed.value
+                )
+            logger.info("GFPGAN RESTORATION COMPLETED (FACES PASTED AFTER UPSCALING).")
+            return detections, restoration
+
+        with stage("gfpgan"):
+            restored_img = model_manager.enhance_face(
                 original_img,
-                settings.MAX_INPUT_DIMENSION
+                weight=RESTORE_WEIGHT,
+                detections=detections,
+                speed=options.speed.value
             )
+        logger.info("GFPGAN RESTORATION COMPLETED.")
+        return detections, restored_img
 
-            h, w = original_img.shape[:2]
-            logger.info(f"IMAGE DECODED AND RESIZED. SHAPE: ({h}, {w}, 3)")
-
-            # ---------------------------------------------------------
-            # 2. GFPGAN FACE RESTORATION
-            # ---------------------------------------------------------
-            logger.info("STARTING GFPGAN RESTORATION...")
-            restored_img = model_manager.enhance_face(original_img)
-            logger.info("GFPGAN RESTORATION COMPLETED.")
-
-            # ---------------------------------------------------------
-            # 3. REAL-ESRGAN UPSCALING
-            # ---------------------------------------------------------
-            logger.info("STARTING REAL-ESRGAN UPSCALING...")
-            upscaled_img = model_manager.upscale_image(restored_img)
-            logger.info("REAL-ESRGAN UPSCALING COMPLETED.")
-
-            # ---------------------------------------------------------
-            # 4. METRICS
-            # ---------------------------------------------------------
-            logger.info("CALCULATING PERCEPTUAL METRICS...")
-            metrics = MetricsCalculator.calculate_all(original_img, upscaled_img)
-
-            metrics_response = {
-                "psnr": float(metrics.get("psnr", 0.0)),
-                "ssim": float(metrics.get("ssim", 0.0)),
-                "lpips": float(metrics.get("lpips", 0.0)),
-                "identity_score": float(metrics.get("identity_score", 0.0))
-            }
-
-            # ---------------------------------------------------------
-            # 5. ENCODE FINAL IMAGE
-            # ---------------------------------------------------------
-            image_base64 = ImageUtils.numpy_to_base64(upscaled_img)
-
-            # ---------------------------------------------------------
-            # 6. TIMING
-            # ---------------------------------------------------------
-            total_time = time.time() - start_time
-            logger.info(f"--- PIPELINE FINISHED IN {total_time:.2f}s ---")
-
-            # ---------------------------------------------------------
-            # 7. RETURN (FRONTEND FORMAT)
-            # ---------------------------------------------------------
-            return {
-                "success": True,
-                "message": "IMAGE ENHANCED SUCCESSFULLY",
-                "image_base64": image_base64,
-                "metrics": metrics_response,
-                "processing_time_ms": int(total_time * 1000)
-            }
+    @staticmethod
+    def upscale(restored, options: EnhancementOptions) -> np.ndarray:
+        """
+        REAL-ESRGAN UPSCALING OF THE RESTORED IMAGE. GIVEN A FaceRestoration
+        (FUSED MODE), UPSCALES THE ORIGINAL IMAGE AND PASTES THE FACES ONTO IT.
+        """
+        if isinstance(restored, FaceRestoration):
+            try:
+                background = EnhancementPipeline.upscale(restored.image, options)
+                return EnhancementPipeline.paste(restored, background, options)
+            finally:
+                restored.release()
+
+        logger.info("STARTING REAL-ESRGAN UPSCALING...")
+        upscale_start = time.time()
+        with stage("realesrgan"):
+            upscaled_img = model_manager.upscale_image(
+                restored,
+                scale=options.scale,
+                speed=options.speed.value,
+                quality=options.upscale_quality.value
+            )
+        logger.info(f"REAL-ESRGAN UPSCALING COMPLETED IN {time.time() - upscale_start:.2f}s.")
+        return upscaled_img
+
+    @staticmethod
+    def paste(restoration: FaceRestoration, background: np.ndarray, options: EnhancementOptions) -> np.ndarray:
+        """
+        FUSED MODE: PASTES THE RESTORED FACES ONTO THE UPSCALED ORIGINAL AT
+        options.scale. RELEASES THE GFPGAN PIN TAKEN BY restore().
+        """
+        with stage("paste"):
+            return model_manager.paste_faces(restoration, background, scale=options.scale)
+
+    @staticmethod
+    def evaluate(original_img: np.ndarray, upscaled_img: np.ndarray, detections,
+                 options: EnhancementOptions) -> tuple:
+        """
+        METRICS (TIER CHOSEN PER REQUEST). RETURNS (METRICS OR NONE, DEFERRED METRICS ID OR NONE).
+        """
+        metrics_response, metrics_id = None, None
+
+        with stage("metrics") if options.metrics != MetricsMode.NONE else nullcontext():
+            if options.metrics == MetricsMode.FAST:
+                metrics_response = MetricsCalculator.calculate_fast(original_img, upscaled_img)
+
+            elif options.metrics == MetricsMode.DEFERRED:
+                metrics_id = deferred_metrics.submit(
+                    EnhancementPipeline.compute_metrics, original_img, upscaled_img, detections
+                )
+                if metrics_id is None:
+                    logger.warning("DEFERRED METRICS BACKLOG FULL. COMPUTING INLINE.")
+
+            if options.metrics == MetricsMode.FULL or (options.metrics == MetricsMode.DEFERRED and metrics_id is None):
+                logger.info("CALCULATING PERCEPTUAL METRICS...")
+                metrics_response = EnhancementPipeline.compute_metrics(original_img, upscaled_img, detections)
+
+        return metrics_response, metrics_id
+
+    @staticmethod
+    def success_result(upscaled_img: np.ndarray, metrics_response, metrics_id, start_time: float) -> dict:
+        """
+        THE infer() RESULT (IMAGE IS ENCODED BY encode_result).
+        """
+        total_time = time.time() - start_time
+        logger.info(f"--- PIPELINE FINISHED IN {total_time:.2f}s ---")
+
+        return {
+            "success": True,
+            "message": "IMAGE ENHANCED SUCCESSFULLY",
+            "image": upscaled_img,
+            "metrics": metrics_response,
+            "metrics_id": metrics_id,
+            "processing_time_ms": int(total_time * 1000)
+        }
+
+    @staticmethod
+    def _run_models(original_img: np.ndarray, start_time: float, options: EnhancementOptions) -> dict:
+        try:
+            detections, restored_img = EnhancementPipeline.restore(original_img, options)
+            upscaled_img = EnhancementPipeline.upscale(restored_img, options)
+            metrics_response, metrics_id = EnhancementPipeline.evaluate(original_img, upscaled_img, detections, options)
+            return EnhancementPipeline.success_result(upscaled_img, metrics_response, metrics_id, start_time)
 
         except Exception as e:
             total_time = time.time() - start_time
             logger.error(f"PIPELINE ERROR: {str(e)}")
-
-            return {
-                "success": False,
-                "message": f"Processing failed: {str(e)}",
-                "image_base64": "",
-                "metrics": {
-                    "psnr": 0.0,
-                    "ssim": 0.0,
-                    "lpips": 0.0,
-                    "identity_score": 0.0
-                },
-                "processing_time_ms": int(total_time * 1000)
-            }
+            return EnhancementPipeline.failure_result(e, total_time)
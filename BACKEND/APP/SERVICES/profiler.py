@@ -0,0 +1,157 @@
+import hmac
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Any, Callable, List, Optional, Tuple
+
+import torch
+
+from APP.CORE.config import settings
+from APP.CORE.logging import logger
+from APP.UTILS.timing import profiling_active
+
+# <UTC TIMESTAMP>-<RANDOM>; ALSO GUARDS THE DOWNLOAD ENDPOINT AGAINST PATH TRAVERSAL
+TRACE_ID_PATTERN = re.compile(r"\d{8}T\d{6}-[0-9a-f]{8}")
+
+
+def all_threads_config() -> Optional[Any]:
+    """
+    TILE WORKERS AND THE GFPGAN BATCHER RUN OPS ON THEIR OWN THREADS, WHICH THE
+    PROFILER ONLY SEES WITH profile_all_threads (TORCH >= 2.6). OLDER TORCH
+    RECORDS THE CALLING THREAD ONLY.
+    """
+    try:
+        return torch._C._profiler._ExperimentalConfig(profile_all_threads=True)
+    except (AttributeError, TypeError):
+        return None
+
+
+class RequestProfiler:
+    """
+    OPT-IN torch.profiler CAPTURE OF SINGLE REQUESTS.
+    A REQUEST IS PROFILED WHEN IT SENDS AN X-Profile HEADER EQUAL TO
+    PROFILING_TOKEN OR IS PICKED BY PROFILING_SAMPLE_RATE. WITHOUT A TOKEN
+    ONLY SAMPLING RUNS: NO CLIENT CAN TRIGGER A PROFILE OR READ TRACES.
+    THE TORCH PROFILER IS PROCESS-WIDE: ONE PROFILE RUNS AT A TIME (OTHERS RUN
+    UNPROFILED) AND OPS OF CONCURRENT REQUESTS APPEAR IN THE SAME TRACE.
+    TRACES ARE CHROME TRACE JSON (chrome://tracing OR ui.perfetto.dev), KEPT
+    AS A RING OF THE LAST max_traces FILES (0 = NO LIMIT).
+    """
+
+    def __init__(self, trace_dir: str, max_traces: int, sample_rate: float, token: str):
+        self.trace_dir = trace_dir
+        self.max_traces = max_traces
+        self.sample_rate = sample_rate
+        self.token = token
+        self._lock = threading.Lock()
+
+    # ---------------------------------------------------------
+    # GATING
+    # ---------------------------------------------------------
+    def authorized(self, header_value: Optional[str]) -> bool:
+        if header_value is None or not self.token:
+            return False
+        # BYTES: compare_digest REJECTS NON-ASCII str
+        return hmac.compare_digest(header_value.encode(), self.token.encode())
+
+    def requested(self, header_value: Optional[str]) -> bool:
+        return settings.PROFILING_ENABLED and self.authorized(header_value)
+
+    def sampled(self) -> bool:
+        return settings.PROFILING_ENABLED and self.sample_rate > 0 and random.random() < self.sample_rate
+
+    # ---------------------------------------------------------
+    # CAPTURE
+    # ---------------------------------------------------------
+    def run(self, fn: Callable[..., Any], *args, label: str = "request") -> Tuple[Any, Optional[str]]:
+        """
+        RETURNS (fn(*args), TRACE ID). THE TRACE ID IS NONE IF ANOTHER PROFILE
+        WAS ALREADY RUNNING OR THE TRACE COULD NOT BE WRITTEN.
+        SYNCHRONOUS FUNCTION (CALLED INSIDE THREADPOOL).
+        """
+        if not self._lock.acquire(blocking=False):
+            logger.info("PROFILER BUSY. RUNNING REQUEST UNPROFILED.")
+            return fn(*args), None
+
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if settings.DEVICE.startswith("cuda") and torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+
+        try:
+            with torch.profiler.profile(
+                activities=activities,
+                record_shapes=True,
+                experimental_config=all_threads_config()
+            ) as profile:
+                profiling_active.set()
+                try:
+                    with torch.profiler.record_function(label):
+                        result = fn(*args)
+                finally:
+                    profiling_active.clear()
+        finally:
+            self._lock.release()
+
+        return result, self._export(profile)
+
+    def _export(self, profile) -> Optional[str]:
+        trace_id = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:8]}"
+        try:
+            os.makedirs(self.trace_dir, exist_ok=True)
+            profile.export_chrome_trace(self.trace_path(trace_id))
+            self._trim()
+        except Exception as e:
+            # THE REQUEST ITSELF SUCCEEDED: A LOST TRACE MUST NOT FAIL IT
+            logger.warning(f"FAILED TO WRITE PROFILE TRACE: {e}")
+            return None
+
+        logger.info(f"PROFILE TRACE WRITTEN: {trace_id}")
+        return trace_id
+
+    def _trim(self):
+        if self.max_traces <= 0:
+            return
+        # OLDEST FIRST: TRACE IDS START WITH THEIR TIMESTAMP
+        for trace in self.list_traces()[:-self.max_traces]:
+            try:
+                os.remove(self.trace_path(trace["trace_id"]))
+            except OSError:
+                pass
+
+    # ---------------------------------------------------------
+    # RING ACCESS
+    # ---------------------------------------------------------
+    def trace_path(self, trace_id: str) -> Optional[str]:
+        if not TRACE_ID_PATTERN.fullmatch(trace_id):
+            return None
+        return os.path.join(self.trace_dir, f"{trace_id}.json")
+
+    def list_traces(self) -> List[dict]:
+        try:
+            names = sorted(os.listdir(self.trace_dir))
+        except OSError:
+            return []
+
+        traces = []
+        for name in names:
+            trace_id, extension = os.path.splitext(name)
+            if extension != ".json" or not TRACE_ID_PATTERN.fullmatch(trace_id):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.trace_dir, name))
+            except OSError:
+                continue
+            traces.append({"trace_id": trace_id, "size_bytes": stat.st_size, "created_at": stat.st_mtime})
+        return traces
+
+
+# GLOBAL SINGLETON INSTANCE
+request_profiler = RequestProfiler(
+    trace_dir=settings.PROFILING_DIR,
+    max_traces=settings.PROFILING_MAX_TRACES,
+    sample_rate=settings.PROFILING_SAMPLE_RATE,
+    token=settings.PROFILING_TOKEN
+)
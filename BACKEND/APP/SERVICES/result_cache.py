@@ -0,0 +1,275 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from APP.CORE.config import settings
+from APP.CORE.logging import logger
+
+
+class ResultCache:
+    """
+    CONTENT-ADDRESSED CACHE OF PIPELINE RESULTS.
+    TIER 1: IN-MEMORY LRU BOUNDED BY BYTES.
+    TIER 2: FILES ON DISK BOUNDED BY BYTES, LEAST RECENTLY USED EVICTED FIRST.
+    EACH FILE IS A ONE-LINE JSON HEADER FOLLOWED BY THE RAW ENCODED IMAGE,
+    SO IMAGES ARE NEVER BASE64-INFLATED AT REST.
+    RAW-UPLOAD HASHES ARE KEPT AS ALIASES OF PIXEL HASHES SO A BYTE-IDENTICAL
+    RE-UPLOAD IS FOUND WITHOUT DECODING THE IMAGE AGAIN.
+    WITH SEVERAL WORKERS (WEB_CONCURRENCY>1) EVERY PROCESS SHARES THE DISK
+    DIRECTORY, SO IT IS THE SOURCE OF TRUTH: EVICTION RESCANS IT AGAINST ONE
+    BUDGET AND A FILE REMOVED BY ANOTHER WORKER IS A MISS.
+    """
+
+    MAX_ALIASES = 4096
+    FILE_SUFFIX = ".res"
+
+    def __init__(self, memory_bytes: int, disk_dir: str, disk_bytes: int):
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, dict]" = OrderedDict()
+        self._memory_sizes: Dict[str, int] = {}
+        self._memory_used = 0
+        self._aliases: "OrderedDict[str, str]" = OrderedDict()
+
+        # DISK INDEX: KEY -> SIZE, ORDERED FROM LEAST TO MOST RECENTLY USED.
+        # A SNAPSHOT OF THE DIRECTORY (REFRESHED ON EVERY EVICTION PASS), FOR STATS
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_used = 0
+
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "stores": 0,
+        }
+
+        if self.disk_bytes > 0:
+            self._load_disk_index()
+
+    # ---------------------------------------------------------
+    # KEYS
+    # ---------------------------------------------------------
+    @staticmethod
+    def make_key(content_digest: str, params: dict) -> str:
+        """
+        COMBINES A CONTENT HASH WITH EVERY PARAMETER THAT AFFECTS THE OUTPUT.
+        """
+        payload = json.dumps(params, sort_keys=True)
+        return hashlib.sha256(f"{content_digest}|{payload}".encode()).hexdigest()
+
+    # ---------------------------------------------------------
+    # LOOKUP
+    # ---------------------------------------------------------
+    def get(self, key: str) -> Optional[dict]:
+        """
+        RETURNS A CACHED RESULT OR NONE. DISK HITS ARE PROMOTED TO MEMORY.
+        """
+        with self._lock:
+            key = self._aliases.get(key, key)
+
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return result
+
+            if self.disk_bytes <= 0:
+                self.counters["misses"] += 1
+                return None
+
+        # NOT ONLY INDEXED KEYS: ANOTHER WORKER MAY HAVE WRITTEN THE FILE
+        result = self._read_disk(key)
+        with self._lock:
+            if result is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["disk_hits"] += 1
+            self._store_memory(key, result, size=self._disk.get(key))
+            return result
+
+    def alias(self, alias_key: str, key: str):
+        """
+        POINTS AN ADDITIONAL KEY (E.G. RAW UPLOAD HASH) AT AN EXISTING ENTRY.
+        """
+        with self._lock:
+            self._aliases[alias_key] = key
+            self._aliases.move_to_end(alias_key)
+            while len(self._aliases) > self.MAX_ALIASES:
+                self._aliases.popitem(last=False)
+
+    # ---------------------------------------------------------
+    # STORE
+    # ---------------------------------------------------------
+    def put(self, key: str, result: dict):
+        """
+        STORES A RESULT IN BOTH TIERS. CALL FROM A WORKER THREAD (DISK I/O).
+        """
+        payload = self.serialize(result)
+
+        with self._lock:
+            self.counters["stores"] += 1
+            self._store_memory(key, result, size=len(payload))
+
+        if self.disk_bytes > 0 and len(payload) <= self.disk_bytes:
+            self._write_disk(key, payload)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            return {
+                **self.counters,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_used,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_used,
+            }
+
+    # ---------------------------------------------------------
+    # SERIALIZATION
+    # ---------------------------------------------------------
+    @staticmethod
+    def serialize(result: dict) -> bytes:
+        header = {k: v for k, v in result.items() if k != "image_bytes"}
+        return json.dumps(header).encode() + b"\n" + result.get("image_bytes", b"")
+
+    @staticmethod
+    def deserialize(payload: bytes) -> dict:
+        header, _, image_bytes = payload.partition(b"\n")
+        result = json.loads(header)
+        result["image_bytes"] = image_bytes
+        return result
+
+    # ---------------------------------------------------------
+    # MEMORY TIER (CALLER HOLDS THE LOCK)
+    # ---------------------------------------------------------
+    def _store_memory(self, key: str, result: dict, size: int = None):
+        if size is None:
+            size = len(self.serialize(result))
+        if size > self.memory_bytes:
+            return
+
+        if key in self._memory:
+            self._memory_used -= self._memory_sizes[key]
+        self._memory[key] = result
+        self._memory_sizes[key] = size
+        self._memory.move_to_end(key)
+        self._memory_used += size
+
+        while self._memory_used > self.memory_bytes:
+            old_key, _ = self._memory.popitem(last=False)
+            self._memory_used -= self._memory_sizes.pop(old_key)
+            self.counters["memory_evictions"] += 1
+
+    # ---------------------------------------------------------
+    # DISK TIER
+    # ---------------------------------------------------------
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}{self.FILE_SUFFIX}")
+
+    def _load_disk_index(self):
+        """
+        BUILDS THE DISK INDEX FROM AN EXISTING CACHE DIRECTORY.
+        """
+        os.makedirs(self.disk_dir, exist_ok=True)
+
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".json"):
+                # PRE-BINARY (BASE64 JSON) ENTRIES CANNOT BE SERVED ANY MORE
+                try:
+                    os.remove(os.path.join(self.disk_dir, name))
+                except OSError:
+                    pass
+
+        self._evict_disk()
+        logger.info(f"RESULT CACHE: {len(self._disk)} ENTRIES ({self._disk_used / 1e6:.1f}MB) ON DISK.")
+
+    def _read_disk(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                payload = f.read()
+            result = self.deserialize(payload)
+            # TOUCH: EVICTION ORDERS BY MTIME, ACROSS WORKERS AND RESTARTS
+            os.utime(path, (time.time(), time.time()))
+        except (OSError, ValueError):
+            # MISSING (NEVER WRITTEN, OR EVICTED BY ANOTHER WORKER) OR TRUNCATED
+            with self._lock:
+                self._disk_used -= self._disk.pop(key, 0)
+            return None
+
+        with self._lock:
+            self._disk_used += len(payload) - self._disk.pop(key, 0)
+            self._disk[key] = len(payload)
+        return result
+
+    def _write_disk(self, key: str, payload: bytes):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"RESULT CACHE WRITE FAILED: {e}")
+            return
+
+        self._evict_disk()
+
+    def _scan_disk(self) -> list:
+        """
+        (MTIME, KEY, SIZE) OF EVERY ENTRY IN THE DIRECTORY, OLDEST FIRST.
+        """
+        entries = []
+        with os.scandir(self.disk_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(self.FILE_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # EVICTED BY ANOTHER WORKER MID-SCAN
+                    continue
+                entries.append((stat.st_mtime, entry.name[:-len(self.FILE_SUFFIX)], stat.st_size))
+        return sorted(entries)
+
+    def _evict_disk(self):
+        """
+        EVICTS THE OLDEST FILES UNTIL THE DIRECTORY (NOT THIS PROCESS'S VIEW
+        OF IT) FITS THE BUDGET, THEN REFRESHES THE INDEX. NO LOCK HELD FOR THE I/O.
+        """
+        entries = self._scan_disk()
+        used = sum(size for _, _, size in entries)
+
+        evicted = 0
+        while used > self.disk_bytes and evicted < len(entries):
+            _, old_key, size = entries[evicted]
+            used -= size
+            evicted += 1
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+        with self._lock:
+            self._disk = OrderedDict((key, size) for _, key, size in entries[evicted:])
+            self._disk_used = used
+            self.counters["disk_evictions"] += evicted
+
+
+# GLOBAL SINGLETON INSTANCE
+result_cache = ResultCache(
+    memory_bytes=settings.RESULT_CACHE_MEMORY_MB * 1024 * 1024,
+    disk_dir=settings.RESULT_CACHE_DIR,
+    disk_bytes=settings.RESULT_CACHE_DISK_MB * 1024 * 1024
+)
@@ -0,0 +1,53 @@
+import asyncio
+from typing import Awaitable, Callable, Dict
+
+from APP.CORE.logging import logger
+
+
+class SingleFlight:
+    """
+    DEDUPLICATES CONCURRENT CALLS THAT SHARE A KEY.
+    THE FIRST CALLER (LEADER) STARTS THE WORK AS AN INDEPENDENT TASK; LATER
+    CALLERS (FOLLOWERS) AWAIT THE SAME TASK. EVERY CALLER AWAITS THROUGH
+    asyncio.shield, SO A DISCONNECTING CLIENT (INCLUDING THE LEADER) NEVER
+    CANCELS THE SHARED COMPUTATION FOR THE OTHERS.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.counters = {
+            "leaders": 0,
+            "coalesced": 0,
+        }
+
+    async def do(self, key: str, factory: Callable[[], Awaitable]):
+        task = self._inflight.get(key)
+
+        if task is None:
+            task = asyncio.create_task(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.counters["leaders"] += 1
+        else:
+            self.counters["coalesced"] += 1
+            logger.info(f"COALESCED WITH IN-FLIGHT REQUEST ({len(self._inflight)} IN FLIGHT).")
+
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "in_flight": len(self._inflight),
+        }
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+        # MARK THE EXCEPTION AS RETRIEVED IF EVERY CALLER HAS ALREADY LEFT
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"IN-FLIGHT REQUEST FAILED: {task.exception()}")
+
+
+# GLOBAL SINGLETON INSTANCE
+single_flight = SingleFlight()
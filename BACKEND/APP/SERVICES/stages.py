@@ -0,0 +1,190 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from APP.CORE.config import settings
+from APP.CORE.telemetry import EXECUTOR_BUSY_SECONDS, EXECUTOR_PENDING, EXECUTOR_UTILIZATION, EXECUTOR_WORKERS
+from APP.SERVICES.thread_budget import thread_budget
+
+# PIPELINE STAGES WITH THEIR OWN EXECUTOR, IN ORDER. restore (DETECTION +
+# GFPGAN), upscale AND paste (FUSED MODE: GFPGAN'S FACE PARSING NETWORK BLENDS
+# THE FACES IN) RUN THE MODELS: THE DISPATCHER HOLDS A MODEL SLOT AROUND THEM.
+EXECUTOR_STAGES = ("decode", "restore", "upscale", "paste", "metrics", "encode")
+MODEL_STAGES = ("restore", "upscale", "paste")
+
+# UTILIZATION IS THE BUSY FRACTION OF THE STAGE'S WORKERS OVER THIS WINDOW
+UTILIZATION_WINDOW_S = 60.0
+
+
+class StageExecutor:
+    """
+    ONE PIPELINE STAGE: A POOL OF `workers` THREADS WITH ROOM FOR queue_depth
+    MORE CALLS WAITING FOR THEM. FURTHER CALLERS WAIT IN run() ON THE EVENT
+    LOOP (HOLDING NO THREAD), WHICH PUSHES BACK ON THE STAGE BEFORE IT.
+    A MODEL STAGE (per_slot) HAS ONE THREAD PER MODEL SLOT INSTEAD OF A
+    SHARED POOL: CALLS RUN ON THEIR SLOT'S THREAD, PINNED TO THE SLOT'S CORES
+    UNDER THREAD_AFFINITY (RE-PINNED WHEN THE THREAD BUDGET CHANGES), AND KEEP
+    ITS TORCH THREAD TEAM.
+    """
+
+    def __init__(self, name: str, workers: int, queue_depth: int, per_slot: bool = False):
+        self.name = name
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._admission = asyncio.Semaphore(workers + queue_depth)
+        # TASKS HOLDING (OR WAITING FOR) THE PERMITS A SHRINK TOOK AWAY
+        self._withheld = []
+        self.per_slot = per_slot
+        if per_slot:
+            self._lanes = [
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"stage-{name}-{slot}")
+                for slot in range(workers)
+            ]
+        else:
+            self._lanes = [ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"stage-{name}")]
+        self._lock = threading.Lock()
+        # START TIMES OF RUNNING CALLS, (END, DURATION) OF RECENT ONES
+        self._running: Dict[int, float] = {}
+        self._recent = deque()
+        self.pending = 0
+        self.completed = 0
+        self.busy_seconds = 0.0
+        EXECUTOR_WORKERS.labels(executor=name).set(workers)
+
+    async def run(self, fn: Callable[..., Any], *args, slot: Optional[int] = None) -> Any:
+        """
+        fn(*args) ON ONE OF THIS STAGE'S THREADS (THE slot'S THREAD FOR A
+        MODEL STAGE), WITH THE CALLER'S CONTEXT (STAGE TIMER) LIKE run_in_threadpool.
+        """
+        lane = slot % len(self._lanes) if slot is not None else 0
+        state = {"started": False, "lane": lane}
+        self._mark_pending(1)
+        try:
+            async with self._admission:
+                return await asyncio.get_running_loop().run_in_executor(
+                    self._lanes[lane], self._call, state, contextvars.copy_context(), fn, args
+                )
+        finally:
+            # CANCELLED BEFORE A WORKER PICKED IT UP
+            if not state["started"]:
+                self._mark_pending(-1)
+
+    def _call(self, state: dict, context: contextvars.Context, fn: Callable[..., Any], args: tuple) -> Any:
+        state["started"] = True
+        self._mark_pending(-1)
+        if self.per_slot:
+            # CHEAP UNLESS THE THREAD BUDGET CHANGED SINCE THIS LANE'S LAST CALL
+            thread_budget.pin_lane(state["lane"])
+        start = time.perf_counter()
+        with self._lock:
+            self._running[threading.get_ident()] = start
+
+        try:
+            return context.run(fn, *args)
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                del self._running[threading.get_ident()]
+                self._recent.append((end, end - start))
+                while self._recent and self._recent[0][0] < end - UTILIZATION_WINDOW_S:
+                    self._recent.popleft()
+                self.completed += 1
+                self.busy_seconds += end - start
+            EXECUTOR_BUSY_SECONDS.labels(executor=self.name).inc(end - start)
+
+    def _mark_pending(self, delta: int):
+        with self._lock:
+            self.pending += delta
+        EXECUTOR_PENDING.labels(executor=self.name).inc(delta)
+
+    def utilization(self) -> float:
+        """
+        BUSY THREAD-SECONDS IN THE LAST UTILIZATION_WINDOW_S / (WINDOW x WORKERS).
+        """
+        now = time.perf_counter()
+        window_start = now - UTILIZATION_WINDOW_S
+        with self._lock:
+            busy = sum(min(duration, end - window_start) for end, duration in self._recent if end > window_start)
+            busy += sum(now - max(start, window_start) for start in self._running.values())
+        return busy / (UTILIZATION_WINDOW_S * self.workers)
+
+    def stats(self) -> dict:
+        with self._lock:
+            running = len(self._running)
+            pending, completed, busy_seconds = self.pending, self.completed, self.busy_seconds
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "running": running,
+            "pending": pending,
+            "completed": completed,
+            "busy_s": round(busy_seconds, 3),
+            "utilization": round(self.utilization(), 4),
+        }
+
+    def resize(self, workers: int):
+        """
+        MODEL STAGES FOLLOW THE SLOT LIMIT (AUTO-TUNING); SPARE LANES STAY IDLE.
+        THE ADMISSION LIMIT (workers + queue_depth) FOLLOWS: A SHRINK WITHHOLDS
+        PERMITS AS CALLS RETURN THEM. EVENT LOOP ONLY.
+        """
+        workers = max(1, min(workers, len(self._lanes)))
+        delta, self.workers = workers - self.workers, workers
+
+        for _ in range(-delta):
+            self._withheld.append(asyncio.ensure_future(self._admission.acquire()))
+        for _ in range(delta):
+            withheld = self._withheld.pop() if self._withheld else None
+            if withheld is None or withheld.done():
+                self._admission.release()
+            else:
+                withheld.cancel()
+        EXECUTOR_WORKERS.labels(executor=self.name).set(self.workers)
+
+    def shutdown(self):
+        for executor in self._lanes:
+            executor.shutdown(wait=True)
+
+
+class StageExecutors:
+    """
+    ONE StageExecutor PER PIPELINE STAGE. THE MODEL STAGES GET ONE WORKER PER
+    MODEL SLOT (MAX_CONCURRENT_REQUESTS); THE OTHERS STAGE_WORKERS.
+    """
+
+    def __init__(self):
+        self.executors = {
+            name: StageExecutor(
+                name,
+                workers=max(1, settings.MAX_CONCURRENT_REQUESTS if name in MODEL_STAGES else settings.STAGE_WORKERS.get(name, 1)),
+                queue_depth=settings.STAGE_QUEUE_DEPTH,
+                per_slot=name in MODEL_STAGES
+            )
+            for name in EXECUTOR_STAGES
+        }
+
+    async def run(self, name: str, fn: Callable[..., Any], *args, slot: Optional[int] = None) -> Any:
+        return await self.executors[name].run(fn, *args, slot=slot)
+
+    def resize_model_stages(self, slots: int):
+        for name in MODEL_STAGES:
+            self.executors[name].resize(slots)
+
+    def refresh_gauges(self):
+        for name, executor in self.executors.items():
+            EXECUTOR_UTILIZATION.labels(executor=name).set(executor.utilization())
+
+    def stats(self) -> dict:
+        return {name: executor.stats() for name, executor in self.executors.items()}
+
+    def shutdown(self):
+        for executor in self.executors.values():
+            executor.shutdown()
+
+
+# GLOBAL SINGLETON INSTANCE
+stage_executors = StageExecutors()
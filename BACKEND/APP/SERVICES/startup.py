@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from APP.CORE.logging import logger
+
+
+def process_start_time() -> float:
+    """
+    WALL-CLOCK TIME THE PROCESS WAS CREATED (SO THE TIMELINE INCLUDES IMPORTS).
+    FALLS BACK TO "NOW" OFF LINUX.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # FIELD 22 (STARTTIME) IN CLOCK TICKS SINCE BOOT; COMM MAY CONTAIN SPACES
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return time.time()
+
+
+class StartupTimeline:
+    """
+    RECORDS THE STARTUP PHASES OF THIS WORKER AND WHETHER IT IS READY.
+    /health (LIVENESS) ANSWERS AS SOON AS THE SERVER LISTENS; /ready FLIPS
+    ONLY AFTER MODELS ARE LOADED AND WARMED UP.
+    """
+
+    def __init__(self):
+        self.started_at = process_start_time()
+        self.phases = []
+        self.ready = False
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return time.time() - self.started_at
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        TIMES ONE PHASE AND LOGS IT WITH ITS OFFSET FROM PROCESS START.
+        PHASES MAY RUN CONCURRENTLY (ONE PER MODEL).
+        """
+        offset = self.elapsed()
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except Exception:
+            status = "failed"
+            raise
+        finally:
+            self.record(name, offset, (time.perf_counter() - start) * 1000, status)
+
+    def record(self, name: str, offset: float, duration_ms: float, status: str = "ok"):
+        duration_ms = round(duration_ms, 1)
+        with self._lock:
+            self.phases.append({
+                "phase": name,
+                "start_s": round(offset, 3),
+                "duration_ms": duration_ms,
+                "status": status,
+            })
+        logger.info(f"STARTUP: {name.upper()} {status.upper()} IN {duration_ms:.0f}ms (T+{offset:.2f}s).")
+
+    def mark_ready(self):
+        self.ready = True
+        logger.info(f"STARTUP: READY AT T+{self.elapsed():.2f}s.")
+
+    def mark_failed(self, error: Exception):
+        self.error = str(error)
+        logger.critical(f"STARTUP FAILED AT T+{self.elapsed():.2f}s: {error}")
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "error": self.error,
+                "uptime_s": round(self.elapsed(), 3),
+                "phases": list(self.phases),
+            }
+
+
+# GLOBAL SINGLETON INSTANCE
+startup = StartupTimeline()
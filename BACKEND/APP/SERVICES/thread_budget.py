@@ -0,0 +1,259 @@
+import asyncio
+import heapq
+import os
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+import cv2
+import numpy as np
+import torch
+
+from APP.CORE.config import settings
+from APP.CORE.logging import logger
+
+
+def available_cpus() -> List[int]:
+    """
+    CPU IDS THIS PROCESS MAY RUN ON (CGROUP / taskset AWARE ON LINUX).
+    """
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+class ThreadBudget:
+    """
+    DIVIDES THE WORKER'S CORES BETWEEN ITS CONCURRENT MODEL SLOTS.
+    WITHOUT IT EVERY SLOT'S TORCH, ONNX RUNTIME AND OPENCV CALLS EACH START
+    ONE THREAD PER CORE, SO N SLOTS RUN N x CORES THREADS AND THROUGHPUT
+    FALLS AS MAX_CONCURRENT_REQUESTS RISES.
+    TORCH AND OPENCV THREAD COUNTS ARE PROCESS-WIDE; TORCH'S OPENMP TEAM IS
+    PER CALLING THREAD, SO threads_per_slot x slots STAYS WITHIN THE CORES.
+    ONNX RUNTIME SESSIONS TAKE THE COUNT WHEN CREATED (SEE InsightFaceWrapper).
+    """
+
+    def __init__(self):
+        self.cpus = available_cpus()
+        self.cores = len(self.cpus)
+        self.slots = max(1, settings.MAX_CONCURRENT_REQUESTS)
+        self.threads_per_slot = self.plan(self.slots)
+        self.tuning: Optional[dict] = None
+        self._interop_set = False
+        # BUMPED WHENEVER threads_per_slot MAY CHANGE: LANE THREADS RE-PIN ON IT
+        self.generation = 0
+        self._local = threading.local()
+
+    def plan(self, slots: int) -> int:
+        return max(1, self.cores // max(1, slots))
+
+    def share_cores(self, cores: int):
+        """
+        LIMITS THIS WORKER TO `cores` OF THE CPUS IT SEES (GUNICORN WORKERS
+        SPLIT THE MACHINE; CALLED FROM post_fork).
+        """
+        self.cores = max(1, min(cores, len(self.cpus)))
+        self.threads_per_slot = self.plan(self.slots)
+        self.generation += 1
+
+    def apply(self, slots: int = None):
+        """
+        SETS THE TORCH AND OPENCV THREAD COUNTS FOR `slots` CONCURRENT SLOTS
+        (DEFAULT: THE CURRENT NUMBER). NO-OP UNLESS THREAD_BUDGET.
+        """
+        self.slots = max(1, slots or self.slots)
+        self.threads_per_slot = self.plan(self.slots)
+        self.generation += 1
+        if not settings.THREAD_BUDGET:
+            return
+
+        torch.set_num_threads(self.threads_per_slot)
+        cv2.setNumThreads(self.threads_per_slot)
+        if not self._interop_set:
+            # ONLY ALLOWED BEFORE TORCH'S FIRST INTER-OP PARALLEL WORK
+            try:
+                torch.set_num_interop_threads(settings.TORCH_INTEROP_THREADS)
+            except RuntimeError:
+                logger.warning("TORCH INTER-OP THREADS ALREADY STARTED. KEEPING THE DEFAULT.")
+            self._interop_set = True
+
+        logger.info(
+            f"THREAD BUDGET: {self.cores} CORES, {self.slots} SLOT(S) x {self.threads_per_slot} THREAD(S) "
+            f"(TORCH, ONNX RUNTIME, OPENCV)."
+        )
+
+    # ---------------------------------------------------------
+    # AFFINITY
+    # ---------------------------------------------------------
+    def slot_cpus(self, slot: int) -> List[int]:
+        """
+        THE threads_per_slot CPUS OF `slot` (CONTIGUOUS, WRAPPING IF SLOTS
+        OUTNUMBER CORES).
+        """
+        start = (slot * self.threads_per_slot) % self.cores
+        return [self.cpus[(start + offset) % self.cores] for offset in range(self.threads_per_slot)]
+
+    def pin_current_thread(self, slot: int):
+        """
+        PINS THE CALLING THREAD TO ITS SLOT'S CPUS (THREAD_AFFINITY, LINUX).
+        THREADS IT STARTS LATER (TORCH'S OPENMP TEAM) INHERIT THE MASK.
+        """
+        if not settings.THREAD_AFFINITY or not hasattr(os, "sched_setaffinity"):
+            return
+        if self.cores < len(self.cpus):
+            # SEVERAL WORKERS SHARE THESE CPUS; A FIXED SLICE WOULD COLLIDE
+            return
+        # PID 0: THE CALLING THREAD ONLY
+        os.sched_setaffinity(0, self.slot_cpus(slot))
+
+    def pin_lane(self, slot: int):
+        """
+        pin_current_thread() FOR A LONG-LIVED MODEL STAGE THREAD, CALLED BEFORE
+        EACH TASK: REDONE (WITH ITS TORCH THREAD COUNT) ONLY WHEN THE PLAN HAS
+        CHANGED SINCE (AUTO-TUNING, SLOT RESIZE), SO MASKS NEVER GO STALE.
+        """
+        state = (self.generation, slot)
+        if getattr(self._local, "state", None) == state:
+            return
+
+        self.pin_current_thread(slot)
+        if settings.THREAD_BUDGET:
+            torch.set_num_threads(self.threads_per_slot)
+        self._local.state = state
+
+    # ---------------------------------------------------------
+    # CONCURRENCY AUTO-TUNING
+    # ---------------------------------------------------------
+    def tune(self, max_slots: int) -> int:
+        """
+        STARTUP MICRO-BENCHMARK: RUNS THE MODEL STAGES ON A SYNTHETIC IMAGE
+        AT 1, 2, 4, ... UP TO max_slots CONCURRENT SLOTS (EACH WITH ITS THREAD
+        BUDGET) AND RETURNS THE SMALLEST LEVEL AFTER WHICH ANOTHER DOUBLING
+        GAINS LESS THAN AUTO_TUNE_MIN_GAIN THROUGHPUT: IT STOPS AT THE FIRST
+        DOUBLING THAT MISSES THE THRESHOLD. LEAVES THAT LEVEL APPLIED.
+        SYNCHRONOUS FUNCTION (RUNS BEFORE THE WORKER IS READY).
+        """
+        from APP.SCHEMAS.enhancement import EnhancementOptions
+        from APP.SERVICES.model_manager import model_manager
+        from APP.SERVICES.pipeline import EnhancementPipeline
+
+        size = settings.AUTO_TUNE_IMAGE_SIZE
+        img = cv2.GaussianBlur(
+            np.random.default_rng(0).integers(0, 255, size=(size, size, 3), dtype=np.uint8), (0, 0), 2
+        )
+        options = EnhancementOptions()
+
+        def run_slot(slot: int):
+            self.pin_current_thread(slot)
+            for _ in range(settings.AUTO_TUNE_ROUNDS):
+                _, restored = EnhancementPipeline.restore(img, options)
+                EnhancementPipeline.upscale(restored, options)
+
+        levels = sorted({min(2 ** i, max_slots) for i in range(max_slots.bit_length())})
+        results = {}
+        best, best_rate = levels[0], 0.0
+        for slots in levels:
+            self.apply(slots)
+            model_manager.set_num_threads(self.threads_per_slot)
+
+            workers = [threading.Thread(target=run_slot, args=(slot,)) for slot in range(slots)]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+
+            rate = slots * settings.AUTO_TUNE_ROUNDS / elapsed
+            results[str(slots)] = {"threads_per_slot": self.threads_per_slot, "images_per_s": round(rate, 3)}
+            logger.info(f"AUTO-TUNE: {slots} SLOT(S) x {self.threads_per_slot} THREAD(S): {rate:.2f} IMAGES/S.")
+            if slots != levels[0] and rate < best_rate * (1 + settings.AUTO_TUNE_MIN_GAIN):
+                break
+            best, best_rate = slots, rate
+
+        self.apply(best)
+        model_manager.set_num_threads(self.threads_per_slot)
+        self.tuning = {"selected": best, "image_size": size, "levels": results}
+        logger.info(f"AUTO-TUNE: SERVING WITH {best} CONCURRENT SLOT(S).")
+        return best
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.THREAD_BUDGET,
+            "affinity": settings.THREAD_AFFINITY and self.cores == len(self.cpus),
+            "cores": self.cores,
+            "slots": self.slots,
+            "threads_per_slot": self.threads_per_slot,
+            "torch_threads": torch.get_num_threads(),
+            "torch_interop_threads": torch.get_num_interop_threads(),
+            "opencv_threads": cv2.getNumThreads(),
+            "tuning": self.tuning,
+        }
+
+
+class ModelSlots:
+    """
+    THE MODEL CONCURRENCY LIMIT: A SEMAPHORE THAT HANDS OUT NUMBERED SLOTS
+    (THE LOWEST FREE ONE FIRST, SO A SLOT KEEPS ITS PINNED THREADS WARM) AND
+    CAN BE RESIZED WHILE SERVING. AFTER A SHRINK, SLOTS ABOVE THE NEW LIMIT
+    RETIRE AS THEY ARE RELEASED. EVENT LOOP ONLY (resize FROM OTHER THREADS
+    VIA loop.call_soon_threadsafe).
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._free = list(range(self.limit))
+        self._busy = set()
+        self._waiters = deque()
+
+    async def acquire(self) -> int:
+        if self._free and not self._waiters:
+            slot = heapq.heappop(self._free)
+            self._busy.add(slot)
+            return slot
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # HANDED A SLOT IN THE SAME TICK AS THE CANCELLATION
+                self.release(waiter.result())
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, slot: int):
+        self._busy.discard(slot)
+        if slot >= self.limit:
+            return
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._busy.add(slot)
+                waiter.set_result(slot)
+                return
+        heapq.heappush(self._free, slot)
+
+    def resize(self, limit: int):
+        limit = max(1, limit)
+        old, self.limit = self.limit, limit
+        if limit < old:
+            self._free = [slot for slot in self._free if slot < limit]
+            heapq.heapify(self._free)
+            return
+        for slot in range(old, limit):
+            # A SLOT STILL BUSY FROM BEFORE A SHRINK RETURNS WHEN RELEASED
+            if slot not in self._busy:
+                self.release(slot)
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "busy": len(self._busy), "waiting": len(self._waiters)}
+
+
+# GLOBAL SINGLETON INSTANCES
+thread_budget = ThreadBudget()
+model_slots = ModelSlots(settings.MAX_CONCURRENT_REQUESTS)
@@ -0,0 +1,338 @@
+import contextvars
+import os
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Optional
+
+import cv2
+import numpy as np
+
+from APP.CORE.config import settings
+from APP.CORE.logging import logger
+from APP.MODELS.detections import FaceDetections
+from APP.SCHEMAS.enhancement import EnhancementOptions
+from APP.SERVICES.image_utils import ImageUtils
+from APP.SERVICES.model_manager import model_manager
+from APP.SERVICES.pipeline import RESTORE_WEIGHT, EnhancementPipeline
+from APP.UTILS.memory import PeakRSSMonitor
+from APP.UTILS.timing import stage
+
+# CONTAINER MEDIA TYPE -> TEMP FILE SUFFIX (FFMPEG PICKS THE DEMUXER BY CONTENT)
+SUPPORTED_VIDEO_TYPES = {
+    "video/mp4": ".mp4",
+    "video/quicktime": ".mov",
+    "video/webm": ".webm",
+    "video/x-matroska": ".mkv",
+    "video/x-msvideo": ".avi",
+}
+
+# END OF STREAM ON THE FRAME QUEUES (ALSO RETURNED WHEN THE PIPELINE STOPS)
+END = None
+
+# LUCAS-KANADE WINDOW AND PYRAMID DEPTH (FACIAL MOTION BETWEEN FRAMES IS SMALL)
+FLOW_PARAMS = dict(winSize=(21, 21), maxLevel=3, criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+
+class VideoDecodeError(Exception):
+    """
+    RAISED WHEN THE UPLOAD IS NOT A READABLE VIDEO.
+    """
+
+
+class VideoTooLargeError(Exception):
+    """
+    RAISED WHEN A CLIP EXCEEDS MAX_VIDEO_FRAMES.
+    """
+
+
+class VideoCancelledError(Exception):
+    """
+    RAISED BY run() AFTER cancel() (THE CLIENT WENT AWAY).
+    """
+
+
+class FaceTracker:
+    """
+    CARRIES FACE LANDMARKS FROM FRAME TO FRAME WITH PYRAMIDAL LUCAS-KANADE
+    OPTICAL FLOW. THE DETECTOR ONLY RUNS ON KEYFRAMES (EVERY
+    keyframe_interval FRAMES) AND WHEN A TRACK IS LOST: A LANDMARK THE FLOW
+    CANNOT FOLLOW, OR WHOSE FORWARD-BACKWARD ERROR EXCEEDS max_error PX.
+    FACES ENTERING BETWEEN KEYFRAMES ARE PICKED UP AT THE NEXT KEYFRAME.
+    """
+
+    def __init__(self, detect: Callable[[np.ndarray], FaceDetections], keyframe_interval: int, max_error: float):
+        self.detect = detect
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.max_error = max_error
+        self.detections: Optional[FaceDetections] = None
+        self.previous_gray = None
+        self.since_keyframe = 0
+        self.counters = {"detector_runs": 0, "tracked_frames": 0, "tracks_lost": 0}
+
+    def update(self, frame: np.ndarray) -> FaceDetections:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        detections = None
+
+        if self.detections is not None and self.since_keyframe < self.keyframe_interval:
+            detections = self._track(gray) if len(self.detections) else self.detections
+            if detections is None:
+                self.counters["tracks_lost"] += 1
+            else:
+                self.counters["tracked_frames"] += 1
+
+        if detections is None:
+            with stage("detect"):
+                detections = self.detect(frame)
+            self.counters["detector_runs"] += 1
+            self.since_keyframe = 0
+
+        self.detections = detections
+        self.previous_gray = gray
+        self.since_keyframe += 1
+        return detections
+
+    def _track(self, gray: np.ndarray) -> Optional[FaceDetections]:
+        """
+        THE PREVIOUS FRAME'S FACES MOVED TO THIS FRAME, OR NONE IF ANY IS LOST.
+        BOXES FOLLOW THE MEAN MOTION OF THEIR FACE'S LANDMARKS.
+        """
+        points = self.detections.landmarks.reshape(-1, 1, 2)
+        moved, found, _ = cv2.calcOpticalFlowPyrLK(self.previous_gray, gray, points, None, **FLOW_PARAMS)
+        if moved is None:
+            return None
+        back, found_back, _ = cv2.calcOpticalFlowPyrLK(gray, self.previous_gray, moved, None, **FLOW_PARAMS)
+
+        error = np.linalg.norm((back - points).reshape(-1, 2), axis=1)
+        if not (found.all() and found_back.all()) or error.max() > self.max_error:
+            return None
+
+        landmarks = moved.reshape(-1, 5, 2)
+        shift = (landmarks - self.detections.landmarks).mean(axis=1)
+        return FaceDetections(
+            self.detections.boxes + np.tile(shift, 2),
+            self.detections.scores,
+            landmarks
+        )
+
+
+class VideoPipeline:
+    """
+    ENHANCES A CLIP AS A STREAM: A DECODER THREAD, THE MODEL STAGES (ON THE
+    CALLING THREAD) AND AN ENCODER THREAD, CONNECTED BY QUEUES OF
+    VIDEO_QUEUE_FRAMES FRAMES. A FULL QUEUE STALLS THE STAGE BEFORE IT, SO
+    MEMORY IS BOUNDED BY THE QUEUE SIZES, NOT THE CLIP LENGTH.
+    `slot` WRAPS EACH FRAME'S MODEL WORK (THE DISPATCHER'S CONCURRENCY LIMIT),
+    SO STILL IMAGES INTERLEAVE WITH A LONG CLIP INSTEAD OF WAITING FOR IT.
+    THE OUTPUT IS MP4 (mp4v) AT THE SOURCE FRAME RATE, WITHOUT AUDIO.
+    cancel() (FROM ANY THREAD) STOPS EVERY STAGE; A FAILED OR CANCELLED RUN
+    LEAVES NO OUTPUT FILE.
+    """
+
+    def __init__(self, options: EnhancementOptions = None, slot: Callable[[], ContextManager] = nullcontext):
+        self.options = options or EnhancementOptions()
+        self.slot = slot
+        self.decoded = queue.Queue(maxsize=settings.VIDEO_QUEUE_FRAMES)
+        self.enhanced = queue.Queue(maxsize=settings.VIDEO_QUEUE_FRAMES)
+        self.stop = threading.Event()
+        self.cancelled = False
+        self.error: Optional[BaseException] = None
+        self.busy = {"decode": 0.0, "infer": 0.0, "encode": 0.0}
+        self.frames = 0
+        self.output_size = None
+
+    def cancel(self):
+        self.cancelled = True
+        self.stop.set()
+
+    @staticmethod
+    def probe(path: str) -> dict:
+        """
+        FRAME RATE, SIZE AND (CONTAINER-REPORTED, POSSIBLY 0) FRAME COUNT.
+        """
+        capture = cv2.VideoCapture(path)
+        try:
+            if not capture.isOpened():
+                raise VideoDecodeError("UNSUPPORTED OR CORRUPT VIDEO")
+            fps = capture.get(cv2.CAP_PROP_FPS)
+            return {
+                "fps": fps if fps and fps > 0 else 25.0,
+                "frame_count": max(0, int(capture.get(cv2.CAP_PROP_FRAME_COUNT))),
+                "width": int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                "height": int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            }
+        finally:
+            capture.release()
+
+    def run(self, input_path: str, output_path: str) -> dict:
+        """
+        ENHANCES input_path INTO output_path AND RETURNS THE RUN'S STATS.
+        SYNCHRONOUS FUNCTION (CALLED INSIDE THREADPOOL).
+        """
+        source = self.probe(input_path)
+        if source["frame_count"] > settings.MAX_VIDEO_FRAMES:
+            raise VideoTooLargeError(f"VIDEO HAS MORE THAN {settings.MAX_VIDEO_FRAMES} FRAMES")
+
+        tracker = FaceTracker(model_manager.detect_faces, settings.VIDEO_KEYFRAME_INTERVAL, settings.VIDEO_TRACK_MAX_ERROR)
+        start = time.perf_counter()
+
+        with PeakRSSMonitor() as memory:
+            # EACH THREAD GETS ITS OWN COPY OF THE CONTEXT (THE REQUEST'S STAGE TIMER)
+            workers = [
+                threading.Thread(
+                    target=contextvars.copy_context().run, args=(self._guard, target, *args),
+                    name=f"video-{name}", daemon=True
+                )
+                for name, target, args in (
+                    ("decode", self._decode, (input_path,)),
+                    ("encode", self._encode, (output_path, source["fps"])),
+                )
+            ]
+            for worker in workers:
+                worker.start()
+
+            self._guard(self._infer, tracker)
+            for worker in workers:
+                worker.join()
+
+        if self.error is not None or self.cancelled:
+            # THE ENCODER HAS EXITED: NOTHING CAN RECREATE THE FILE AFTER THIS
+            try:
+                os.remove(output_path)
+            except OSError:
+                pass
+            if self.error is not None:
+                raise self.error
+            raise VideoCancelledError("VIDEO PROCESSING CANCELLED")
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            "frames": self.frames,
+            "source_fps": round(source["fps"], 3),
+            "fps": round(self.frames / elapsed, 3) if elapsed > 0 else 0.0,
+            "input_size": [source["width"], source["height"]],
+            "output_size": self.output_size,
+            **tracker.counters,
+            "busy_s": {name: round(seconds, 3) for name, seconds in self.busy.items()},
+            "peak_rss_mb": memory.peak_mb,
+            "processing_time_ms": int(elapsed * 1000),
+        }
+        logger.info(
+            f"VIDEO ENHANCED: {self.frames} FRAMES AT {stats['fps']:.2f} FPS, "
+            f"{tracker.counters['detector_runs']} DETECTIONS, PEAK RSS {memory.peak_mb}MB."
+        )
+        return stats
+
+    # ---------------------------------------------------------
+    # STAGES
+    # ---------------------------------------------------------
+    def _guard(self, target: Callable, *args):
+        # THE FIRST FAILURE STOPS EVERY STAGE AND IS RAISED BY run()
+        try:
+            target(*args)
+        except BaseException as e:
+            if self.error is None:
+                self.error = e
+            self.stop.set()
+
+    def _decode(self, input_path: str):
+        capture = cv2.VideoCapture(input_path)
+        try:
+            count = 0
+            while True:
+                started = time.perf_counter()
+                with stage("video_decode"):
+                    ok, frame = capture.read()
+                    if ok:
+                        frame = ImageUtils.constrain_image_size(frame, settings.MAX_INPUT_DIMENSION)
+                self.busy["decode"] += time.perf_counter() - started
+
+                if not ok:
+                    break
+                count += 1
+                if count > settings.MAX_VIDEO_FRAMES:
+                    raise VideoTooLargeError(f"VIDEO HAS MORE THAN {settings.MAX_VIDEO_FRAMES} FRAMES")
+                if not self._put(self.decoded, frame):
+                    return
+
+            if count == 0:
+                raise VideoDecodeError("UNSUPPORTED OR CORRUPT VIDEO")
+            self._put(self.decoded, END)
+        finally:
+            capture.release()
+
+    def _infer(self, tracker: FaceTracker):
+        fused = EnhancementPipeline.fused(self.options)
+        while (frame := self._get(self.decoded)) is not END:
+            started = time.perf_counter()
+            with self.slot():
+                detections = tracker.update(frame)
+                with stage("gfpgan"):
+                    if fused:
+                        restoration = model_manager.restore_faces(
+                            frame, detections, weight=RESTORE_WEIGHT, speed=self.options.speed.value
+                        )
+                    else:
+                        restored = model_manager.enhance_face(
+                            frame, weight=RESTORE_WEIGHT, detections=detections, speed=self.options.speed.value
+                        )
+                try:
+                    with stage("realesrgan"):
+                        upscaled = model_manager.upscale_image(
+                            frame if fused else restored,
+                            scale=self.options.scale,
+                            speed=self.options.speed.value,
+                            quality=self.options.upscale_quality.value
+                        )
+                    if fused:
+                        with stage("paste"):
+                            upscaled = model_manager.paste_faces(restoration, upscaled, scale=self.options.scale)
+                finally:
+                    if fused:
+                        # KEEPS GFPGAN PINNED FROM RESTORE TO PASTE; IDEMPOTENT
+                        restoration.release()
+            self.busy["infer"] += time.perf_counter() - started
+
+            if not self._put(self.enhanced, upscaled):
+                return
+        self._put(self.enhanced, END)
+
+    def _encode(self, output_path: str, fps: float):
+        writer = None
+        try:
+            while (frame := self._get(self.enhanced)) is not END:
+                started = time.perf_counter()
+                with stage("video_encode"):
+                    if writer is None:
+                        # EVERY FRAME OF A CLIP HAS THE SAME SIZE, SO THE FIRST ONE FIXES THE OUTPUT
+                        self.output_size = [frame.shape[1], frame.shape[0]]
+                        writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, tuple(self.output_size))
+                        if not writer.isOpened():
+                            raise RuntimeError("FAILED TO OPEN VIDEO ENCODER")
+                    writer.write(frame)
+                self.busy["encode"] += time.perf_counter() - started
+                self.frames += 1
+        finally:
+            if writer is not None:
+                writer.release()
+
+    # ---------------------------------------------------------
+    # BOUNDED HAND-OFF (GIVES UP ONCE ANOTHER STAGE HAS FAILED)
+    # ---------------------------------------------------------
+    def _put(self, frames: queue.Queue, item) -> bool:
+        while not self.stop.is_set():
+            try:
+                frames.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, frames: queue.Queue):
+        while not self.stop.is_set():
+            try:
+                return frames.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return END
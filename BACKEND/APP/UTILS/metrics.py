@@ -1,9 +1,6 @@
 import cv2
 import torch
-import lpips
 import numpy as np
-from skimage.metrics import structural_similarity as ssim_func
-from skimage.metrics import peak_signal_noise_ratio as psnr_func
 from APP.CORE.config import settings
 from APP.SERVICES.image_utils import ImageUtils
 
@@ -21,6 +18,8 @@ class MetricsCalculator:
         LOADS ONLY ON FIRST CALL.
         """
         if cls._lpips_model is None:
+            import lpips
+
             device = torch.device(settings.DEVICE)
             cls._lpips_model = lpips.LPIPS(net='alex').to(device)
             cls._lpips_model.eval()
@@ -37,6 +36,7 @@ class MetricsCalculator:
         if img1.shape != img2.shape:
             img2 = ImageUtils.resize_image(img2, img1.shape)
 
+        from skimage.metrics import peak_signal_noise_ratio as psnr_func
         return float(psnr_func(img1, img2, data_range=255))
 
     # ---------------------------------------------------------
@@ -53,6 +53,7 @@ class MetricsCalculator:
         gray1 = cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY)
         gray2 = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY)
 
+        from skimage.metrics import structural_similarity as ssim_func
         return float(ssim_func(gray1, gray2, data_range=255))
 
     # ---------------------------------------------------------
@@ -66,14 +67,17 @@ class MetricsCalculator:
         device = torch.device(settings.DEVICE)
         loss_fn = cls.get_lpips_model()
 
-        if img1.shape != img2.shape:
+        # ALEXNET FEATURES ARE STABLE UNDER DOWNSAMPLING; COST GROWS WITH PIXELS
+        if settings.METRICS_LPIPS_MAX_SIZE > 0:
+            img1, img2 = cls.downsample_pair(img1, img2, settings.METRICS_LPIPS_MAX_SIZE)
+        elif img1.shape != img2.shape:
             img2 = ImageUtils.resize_image(img2, img1.shape)
 
         def preprocess(img):
-            img = ImageUtils.bgr_to_rgb(img)
+            img = ImageUtils.bgr_to_rgb(img).astype(np.float32)
             img = (img / 127.5) - 1.0
-            img = img.transpose((2, 0, 1))
-            img = torch.from_numpy(img).float().unsqueeze(0)
+            img = np.ascontiguousarray(img.transpose((2, 0, 1)))
+            img = torch.from_numpy(img).unsqueeze(0)
             return img.to(device)
 
         tensor1 = preprocess(img1)
@@ -84,6 +88,92 @@ class MetricsCalculator:
 
         return float(dist.item())
 
+    # ---------------------------------------------------------
+    # FAST TIER (DOWNSAMPLED, VECTORIZED, NO SKIMAGE)
+    # ---------------------------------------------------------
+    @staticmethod
+    def downsample_pair(img1: np.ndarray, img2: np.ndarray, max_side: int) -> tuple:
+        """
+        RESIZES BOTH IMAGES (INTER_AREA) TO img1'S ASPECT WITH THE LONG SIDE <= max_side.
+        """
+        h, w = img1.shape[:2]
+        scale = min(1.0, max_side / max(h, w))
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+
+        def fit(img):
+            if img.shape[1::-1] == size:
+                return img
+            return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+        return fit(img1), fit(img2)
+
+    @staticmethod
+    def calculate_psnr_fast(img1: np.ndarray, img2: np.ndarray) -> float:
+        diff = img1.astype(np.float32) - img2.astype(np.float32)
+        mse = float(np.mean(diff * diff))
+        if mse == 0.0:
+            return 100.0
+        return float(10.0 * np.log10((255.0 ** 2) / mse))
+
+    @staticmethod
+    def calculate_ssim_fast(img1: np.ndarray, img2: np.ndarray) -> float:
+        """
+        GAUSSIAN-WINDOW SSIM (WANG ET AL. 2004: 11x11, SIGMA 1.5) ON GRAYSCALE,
+        COMPUTED WITH FIVE cv2.GaussianBlur PASSES IN FLOAT32.
+        """
+        x = cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY).astype(np.float32)
+        y = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY).astype(np.float32)
+        c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+
+        def blur(a):
+            return cv2.GaussianBlur(a, (11, 11), 1.5)
+
+        mu_x, mu_y = blur(x), blur(y)
+        mu_xx, mu_yy, mu_xy = mu_x * mu_x, mu_y * mu_y, mu_x * mu_y
+        var_x = blur(x * x) - mu_xx
+        var_y = blur(y * y) - mu_yy
+        cov = blur(x * y) - mu_xy
+
+        ssim_map = ((2 * mu_xy + c1) * (2 * cov + c2)) / ((mu_xx + mu_yy + c1) * (var_x + var_y + c2))
+        return float(ssim_map.mean())
+
+    @classmethod
+    def calculate_fast(cls, img1: np.ndarray, img2: np.ndarray) -> dict:
+        """
+        PSNR AND SSIM ON A FIXED DOWNSAMPLED SIZE. NO LPIPS, NO IDENTITY.
+        DOWNSAMPLING AVERAGES OUT FINE DETAIL AND NOISE, SO VALUES ARE ONLY
+        COMPARABLE WITH OTHER FAST-MODE VALUES, NOT WITH FULL MODE.
+        """
+        small1, small2 = cls.downsample_pair(img1, img2, settings.METRICS_FAST_SIZE)
+        try:
+            psnr_val = cls.calculate_psnr_fast(small1, small2)
+            ssim_val = cls.calculate_ssim_fast(small1, small2)
+        except Exception:
+            psnr_val, ssim_val = 0.0, 0.0
+
+        return {
+            "psnr": round(psnr_val, 2),
+            "ssim": round(ssim_val, 4),
+            "lpips": None,
+            "identity_score": None,
+        }
+
+    # ---------------------------------------------------------
+    # IDENTITY (ARCFACE COSINE SIMILARITY)
+    # ---------------------------------------------------------
+    @staticmethod
+    def calculate_identity(embeddings1: np.ndarray, embeddings2: np.ndarray) -> np.ndarray:
+        """
+        COSINE SIMILARITY OF EACH PAIR OF FACE EMBEDDINGS (N, D) -> (N,).
+        1.0 = SAME IDENTITY, ~0.0 = UNRELATED.
+        """
+        if len(embeddings1) == 0:
+            return np.zeros((0,), dtype=np.float32)
+
+        e1 = embeddings1 / np.linalg.norm(embeddings1, axis=1, keepdims=True)
+        e2 = embeddings2 / np.linalg.norm(embeddings2, axis=1, keepdims=True)
+        return np.einsum("ij,ij->i", e1, e2)
+
     # ---------------------------------------------------------
     # CALCULATE ALL METRICS (PIPELINE FIX)
     # ---------------------------------------------------------
@@ -115,6 +205,6 @@ class MetricsCalculator:
             "psnr": round(float(psnr_val), 2),
             "ssim": round(float(ssim_val), 4),
             "lpips": round(float(lpips_val), 4),
-            # IDENTITY WILL BE FILLED BY PIPELINE IF USED
+            # IDENTITY IS FILLED BY THE PIPELINE FROM THE SHARED FACE DETECTIONS
             "identity_score": 0.0
         }
@@ -0,0 +1,125 @@
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import ContextManager, Dict, Iterator, Optional
+
+import torch
+
+from APP.CORE.telemetry import REQUEST_SECONDS, STAGE_SECONDS, STAGES, refresh_process_gauges
+
+
+class StageTimer:
+    """
+    COLLECTS THE STAGE DURATIONS OF ONE REQUEST FOR ITS Server-Timing HEADER.
+    THE ACTIVE TIMER LIVES IN A CONTEXTVAR; run_in_threadpool COPIES THE
+    CONTEXT, SO STAGES RUNNING IN WORKER THREADS LAND ON THE SAME TIMER.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.start = time.perf_counter()
+
+    def add(self, name: str, seconds: float):
+        # A STAGE THAT RUNS TWICE (E.G. RETRIES) IS SUMMED
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        """
+        Server-Timing HEADER VALUE: THE STAGES IN PIPELINE ORDER, THEN THE TOTAL.
+        """
+        order = {name: index for index, name in enumerate(STAGES)}
+        entries = [
+            f"{name};dur={seconds * 1000:.1f}"
+            for name, seconds in sorted(self.stages.items(), key=lambda item: order.get(item[0], len(order)))
+        ]
+        entries.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[StageTimer]] = ContextVar("stage_timer", default=None)
+
+
+def current_timer() -> Optional[StageTimer]:
+    return _current.get()
+
+
+@contextmanager
+def request_timer() -> Iterator[StageTimer]:
+    """
+    MAKES A NEW TIMER CURRENT FOR THE DURATION OF A REQUEST.
+    """
+    timer = StageTimer()
+    token = _current.set(timer)
+    try:
+        yield timer
+    finally:
+        _current.reset(token)
+
+
+# SET BY RequestProfiler WHILE IT RECORDS. PROCESS-WIDE LIKE THE PROFILER ITSELF
+# (torch.autograd._profiler_enabled() IS FALSE UNDER profile_all_threads).
+profiling_active = threading.Event()
+
+
+def annotate(name: str) -> ContextManager:
+    """
+    NAMED RANGE IN A torch.profiler TRACE (SEE APP/SERVICES/profiler.py).
+    A PLAIN NO-OP WHILE NO PROFILE IS BEING RECORDED.
+    """
+    if not profiling_active.is_set():
+        return nullcontext()
+    return torch.profiler.record_function(name)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    TIMES A BLOCK AS ONE PIPELINE STAGE: OBSERVED IN THE PROMETHEUS HISTOGRAM
+    AND ADDED TO THE CURRENT REQUEST'S TIMER (NONE FOR JOB QUEUE WORK).
+    """
+    start = time.perf_counter()
+    try:
+        with annotate(f"stage:{name}"):
+            yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage=name).observe(elapsed)
+        timer = _current.get()
+        if timer is not None:
+            timer.add(name, elapsed)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI MIDDLEWARE: ONE StageTimer PER HTTP REQUEST, REPORTED IN A
+    Server-Timing RESPONSE HEADER AND THE REQUEST LATENCY HISTOGRAM.
+    STREAMED RESPONSES SEND THEIR HEADERS EARLY AND ONLY CARRY THE STAGES
+    FINISHED BY THEN.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timer.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        with request_timer() as timer:
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                # THE ROUTER STORES THE MATCHED ENDPOINT IN THE SCOPE (UNMATCHED: 404)
+                endpoint = scope.get("endpoint")
+                REQUEST_SECONDS.labels(endpoint=getattr(endpoint, "__name__", "unmatched")).observe(
+                    time.perf_counter() - timer.start
+                )
+                refresh_process_gauges()
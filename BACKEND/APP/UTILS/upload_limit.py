@@ -0,0 +1,65 @@
+import json
+from typing import Dict
+
+from fastapi import HTTPException
+
+# MULTIPART BOUNDARIES, PART HEADERS AND SMALL FORM FIELDS ON TOP OF THE FILE LIMIT
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI MIDDLEWARE: CAPS REQUEST BODIES BEFORE THE MULTIPART PARSER SPOOLS
+    THEM. A Content-Length OVER THE LIMIT IS ANSWERED WITH 413 WITHOUT READING
+    THE BODY; A CHUNKED BODY IS CUT OFF (413) AS SOON AS IT CROSSES THE LIMIT.
+    `limits` MAPS PATH PREFIXES TO BYTE LIMITS (LONGEST PREFIX WINS);
+    OTHER PATHS GET `default`. THE ENDPOINTS STILL CHECK EACH FILE EXACTLY.
+    """
+
+    def __init__(self, app, limits: Dict[str, int], default: int):
+        self.app = app
+        self.limits = sorted(limits.items(), key=lambda item: len(item[0]), reverse=True)
+        self.default = default
+
+    def limit_for(self, path: str) -> int:
+        limit = next((limit for prefix, limit in self.limits if path.startswith(prefix)), self.default)
+        return limit + MULTIPART_OVERHEAD_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limit_for(scope["path"])
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await self.reject(send)
+            return
+
+        received = 0
+
+        async def receive_with_limit():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # RAISED INSIDE THE ROUTE'S FORM PARSING: THE ROUTE ANSWERS 413
+                    raise HTTPException(status_code=413, detail="FILE TOO LARGE")
+            return message
+
+        await self.app(scope, receive_with_limit, send)
+
+    @staticmethod
+    async def reject(send):
+        body = json.dumps({"detail": "FILE TOO LARGE"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,35 +1,87 @@
+import asyncio
 import cv2  
 import numpy as np
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
 from APP.CORE.config import settings
 from APP.CORE.logging import logger
+from APP.CORE.telemetry import render_metrics
 from APP.API.V1.api import api_router
+from APP.SCHEMAS.enhancement import BINARY_RESPONSE_HEADERS, VIDEO_RESPONSE_HEADERS
 from APP.SERVICES.model_manager import model_manager
+from APP.SERVICES.job_queue import job_queue
+from APP.SERVICES.stages import stage_executors
+from APP.SERVICES.startup import startup
+from APP.SERVICES.thread_budget import model_slots, thread_budget
+from APP.UTILS.memory import read_memory_stats, format_memory_stats
+from APP.UTILS.timing import ServerTimingMiddleware
+from APP.UTILS.upload_limit import UploadLimitMiddleware
+
+
+def warm_start(loop: asyncio.AbstractEventLoop):
+    """
+    LOADS AND WARMS UP THE MODELS IN A BACKGROUND THREAD, THEN MARKS THE
+    WORKER READY. THE SERVER ANSWERS /health MEANWHILE.
+    """
+    # BEFORE ANY MODEL WORK: TORCH FIXES ITS INTER-OP POOL ON FIRST USE
+    thread_budget.apply()
+
+    try:
+        with startup.phase("model loading"):
+            model_manager.load_all_models()
+    except Exception as e:
+        startup.mark_failed(e)
+        return
+
+    # LAZY LOADING DEFERS THE COST TO THE FIRST REQUEST; A WARMUP WOULD UNDO THAT
+    if settings.STARTUP_WARMUP and not settings.LAZY_MODEL_LOADING:
+        logger.info("WARMING UP MODELS...")
+        try:
+            with startup.phase("warmup"):
+                dummy_img = np.zeros((512, 512, 3), dtype=np.uint8)
+                dummy_bytes = cv2.imencode('.jpg', dummy_img)[1].tobytes()
+                from APP.SERVICES.pipeline import EnhancementPipeline
+                EnhancementPipeline.process_image(dummy_bytes)
+            logger.info("WARMUP COMPLETED. MODELS HOT.")
+        except Exception as e:
+            logger.warning(f"WARMUP FAILED (NON-CRITICAL): {e}")
+
+    # NEEDS LOADED MODELS; LAZY LOADING WOULD TIME THE LOADS INSTEAD
+    if settings.AUTO_TUNE_CONCURRENCY and settings.MAX_CONCURRENT_REQUESTS > 1 and not settings.LAZY_MODEL_LOADING:
+        try:
+            with startup.phase("concurrency tuning"):
+                slots = thread_budget.tune(settings.MAX_CONCURRENT_REQUESTS)
+            # THE SLOT LIMIT AND THE STAGE ADMISSION SEMAPHORES BELONG TO THE EVENT LOOP
+            loop.call_soon_threadsafe(model_slots.resize, slots)
+            loop.call_soon_threadsafe(stage_executors.resize_model_stages, slots)
+        except Exception as e:
+            logger.warning(f"CONCURRENCY TUNING FAILED (NON-CRITICAL): {e}")
+            thread_budget.apply(settings.MAX_CONCURRENT_REQUESTS)
+            model_manager.set_num_threads(thread_budget.threads_per_slot)
+
+    startup.mark_ready()
+    logger.info(f"WORKER MEMORY: {format_memory_stats(read_memory_stats())}")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # EVERYTHING BEFORE THIS POINT: INTERPRETER START AND MODULE IMPORTS
+    startup.record("imports", 0.0, startup.elapsed() * 1000)
     logger.info(f"STARTING UP {settings.PROJECT_NAME}...")
-    try:
-        model_manager.load_all_models()
-    except Exception as e:
-        logger.critical(f"FAILED TO LOAD MODELS: {e}")
-    
-    logger.info("WARMING UP MODELS...")
-    try:
-        dummy_img = np.zeros((512, 512, 3), dtype=np.uint8)
-        dummy_bytes = cv2.imencode('.jpg', dummy_img)[1].tobytes()
-        from APP.SERVICES.pipeline import EnhancementPipeline
-        EnhancementPipeline.process_image(dummy_bytes)
-        logger.info("WARMUP COMPLETED. MODELS HOT.")
-    except Exception as e:
-        logger.warning(f"WARMUP FAILED (NON-CRITICAL): {e}")
+
+    await job_queue.start()
+    loader = asyncio.create_task(asyncio.to_thread(warm_start, asyncio.get_running_loop()))
 
     yield
     logger.info("SHUTTING DOWN...")
+    await job_queue.stop()
+    if not loader.done():
+        logger.warning("SHUTDOWN DURING STARTUP. WAITING FOR MODEL LOADING TO FINISH...")
+    await loader
+    stage_executors.shutdown()
     model_manager.unload_all_models()
 
 app = FastAPI(
@@ -52,18 +104,54 @@ if settings.BACKEND_CORS_ORIGINS:
     for origin in settings.BACKEND_CORS_ORIGINS:
         origins.append(str(origin))
 
+# OVERSIZED UPLOADS ARE REFUSED BEFORE THEY ARE BUFFERED (INSIDE CORS SO 413s CARRY ITS HEADERS)
+MB = 1024 * 1024
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={
+        f"{settings.API_V1_STR}/images/enhance/batch": settings.MAX_BATCH_UPLOAD_MB * MB,
+        f"{settings.API_V1_STR}/videos": settings.MAX_VIDEO_UPLOAD_MB * MB,
+    },
+    default=settings.MAX_UPLOAD_SIZE_BYTES
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=sorted(set(BINARY_RESPONSE_HEADERS + VIDEO_RESPONSE_HEADERS)) + ["Server-Timing"],
 )
 
+# PER-STAGE Server-Timing HEADER + REQUEST LATENCY HISTOGRAM
+app.add_middleware(ServerTimingMiddleware)
+
 @app.get("/health", tags=["Status"])
 async def health_check():
+    # LIVENESS: THE PROCESS SERVES HTTP. MODELS MAY STILL BE LOADING (SEE /ready)
     return JSONResponse(status_code=200, content={"status": "healthy", "version": "1.0.0"})
 
+@app.get("/ready", tags=["Status"])
+async def readiness_check():
+    # READINESS: MODELS LOADED AND WARMED UP. 503 WHILE STARTING OR AFTER A FAILED LOAD
+    report = startup.report()
+    if report["ready"]:
+        status = "ready"
+    else:
+        status = "failed" if report["error"] else "starting"
+    return JSONResponse(status_code=200 if report["ready"] else 503, content={"status": status, **report})
+
+@app.get("/memory", tags=["Status"])
+async def memory_report():
+    # PER-WORKER REPORT: EACH CALL IS ANSWERED BY WHICHEVER WORKER ACCEPTED IT
+    return read_memory_stats()
+
+@app.get("/metrics", tags=["Status"], include_in_schema=False)
+async def prometheus_metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/", tags=["Status"])
 async def root():
     return {"message": f"WELCOME TO {settings.PROJECT_NAME}", "docs": "/docs"}
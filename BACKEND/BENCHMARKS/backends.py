@@ -0,0 +1,81 @@
+"""
+INFERENCE BACKEND BENCHMARK.
+
+TIMES ONE FORWARD PASS OF EACH NETWORK ON EVERY AVAILABLE BACKEND:
+  GFPGAN:      ONE 512x512 ALIGNED FACE (BATCH --faces)
+  REAL-ESRGAN: ONE --tile x --tile TILE
+AND REPORTS THE MAX ABSOLUTE DIFFERENCE AGAINST TORCH EAGER.
+ONNX RUNTIME NEEDS THE EXPORTED MODELS (python -m SCRIPTS.export_onnx);
+MISSING EXPORTS ARE REPORTED AS SKIPPED.
+
+USAGE (FROM BACKEND/, WEIGHTS REQUIRED):
+    python -m BENCHMARKS.backends --tile 128
+"""
+import argparse
+
+import torch
+
+from APP.CORE.config import settings
+from APP.MODELS.backends import BACKENDS, artifact_path, create_backend
+from APP.MODELS.gfpgan import GFPGANInferenceModule, GFPGANWrapper
+from APP.MODELS.realesrgan import RealESRGANWrapper
+from BENCHMARKS.common import measure, write_report
+
+
+def benchmark_network(module: torch.nn.Module, weights_path: str, example_shape: tuple,
+                      device: torch.device, repeats: int, static_batch: int = None) -> dict:
+    sample = torch.rand(*example_shape) * 2 - 1
+    trace_shape = (static_batch,) + example_shape[1:] if static_batch else example_shape
+    reference = create_backend("torch", module, device)(sample).cpu()
+    report = {}
+
+    for name in BACKENDS:
+        path = artifact_path(weights_path, name) if name != "torch" else None
+        try:
+            backend = create_backend(
+                name, module, device, path=path, example_shape=trace_shape, static_batch=static_batch
+            )
+        except FileNotFoundError as e:
+            report[name] = {"skipped": str(e)}
+            continue
+
+        # WARM-UP (ORT GRAPH OPTIMIZATION, TORCHSCRIPT PROFILING RUNS)
+        output = backend(sample).cpu()
+        report[name] = {
+            **measure(lambda: backend(sample), repeats),
+            "max_abs_diff": float((output - reference).abs().max()),
+        }
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faces", type=int, default=1)
+    parser.add_argument("--tile", type=int, default=128)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", type=str, default=None, help="OPTIONAL JSON REPORT PATH")
+    args = parser.parse_args()
+
+    device = torch.device(settings.DEVICE)
+    gfpgan = GFPGANWrapper(model_path=settings.GFPGAN_MODEL_PATH, device=settings.DEVICE)
+    gfpgan.load()
+    realesrgan = RealESRGANWrapper(model_path=settings.REALESRGAN_MODEL_PATH, device=settings.DEVICE)
+    realesrgan.load()
+
+    write_report({
+        "device": str(device),
+        "torch_threads": torch.get_num_threads(),
+        "gfpgan": benchmark_network(
+            GFPGANInferenceModule(gfpgan.model.gfpgan), settings.GFPGAN_MODEL_PATH,
+            (args.faces, 3, 512, 512), device, args.repeats, static_batch=1
+        ),
+        "realesrgan": benchmark_network(
+            realesrgan.model.model.float(), settings.REALESRGAN_MODEL_PATH,
+            (1, 3, args.tile, args.tile), device, args.repeats
+        ),
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+SHARED HELPERS FOR THE BENCHMARK SCRIPTS.
+RUN BENCHMARKS FROM THE BACKEND DIRECTORY, E.G.:
+    python -m BENCHMARKS.face_detection
+"""
+import json
+import os
+import time
+from typing import Callable
+
+import cv2
+import numpy as np
+
+# SAMPLE PORTRAIT SHIPPED WITH THE REPO (512x512, ONE FACE)
+SAMPLE_FACE_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "VISUALS", "TEST", "TEST.png"
+)
+
+
+def load_sample_face() -> np.ndarray:
+    img = cv2.imread(SAMPLE_FACE_PATH, cv2.IMREAD_COLOR)
+    if img is None:
+        raise FileNotFoundError(f"SAMPLE IMAGE NOT FOUND: {SAMPLE_FACE_PATH}")
+    return img
+
+
+def make_test_image(num_faces: int = 1, size: int = 512, seed: int = 0) -> np.ndarray:
+    """
+    BUILDS A size x size BGR IMAGE CONTAINING `num_faces` COPIES OF THE SAMPLE
+    PORTRAIT ON A GRID OVER A NOISY BACKGROUND. 0 FACES = BACKGROUND ONLY.
+    """
+    rng = np.random.default_rng(seed)
+    canvas = rng.integers(60, 190, size=(size, size, 3), dtype=np.uint8)
+    canvas = cv2.GaussianBlur(canvas, (0, 0), 3)
+
+    if num_faces == 0:
+        return canvas
+
+    grid = int(np.ceil(np.sqrt(num_faces)))
+    cell = size // grid
+    face = cv2.resize(load_sample_face(), (cell, cell), interpolation=cv2.INTER_AREA)
+
+    for i in range(num_faces):
+        row, col = divmod(i, grid)
+        canvas[row * cell:(row + 1) * cell, col * cell:(col + 1) * cell] = face
+
+    return canvas
+
+
+def grid_detections(num_faces: int = 1, size: int = 512):
+    """
+    DETECTIONS MATCHING make_test_image's GRID LAYOUT WITHOUT RUNNING A
+    DETECTOR (LETS BENCHMARKS RUN WITHOUT THE INSIGHTFACE WEIGHTS).
+    """
+    from APP.MODELS.detections import FaceDetections
+
+    return FaceDetections.grid(num_faces, size)
+
+
+def measure(fn: Callable, repeats: int = 5, warmup: int = 1) -> dict:
+    """
+    CALLS fn() warmup + repeats TIMES AND RETURNS LATENCY STATS (MS).
+    """
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings = np.array(timings)
+    return {
+        "runs": repeats,
+        "mean_ms": round(float(timings.mean()), 2),
+        "p50_ms": round(float(np.percentile(timings, 50)), 2),
+        "p95_ms": round(float(np.percentile(timings, 95)), 2),
+    }
+
+
+def write_report(report: dict, path: str = None):
+    """
+    PRINTS THE REPORT AND OPTIONALLY SAVES IT AS JSON.
+    """
+    text = json.dumps(report, indent=2)
+    print(text)
+    if path:
+        with open(path, "w") as f:
+            f.write(text)
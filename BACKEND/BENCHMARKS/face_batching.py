@@ -0,0 +1,80 @@
+"""
+GFPGAN MICRO-BATCHING BENCHMARK.
+
+COMPARES ONE FORWARD PASS PER FACE AGAINST THE CROSS-REQUEST BATCHER:
+  GROUP PHOTO: ONE IMAGE WITH --faces FACES, RESTORED BY ONE CALLER.
+  CONCURRENT:  --concurrency CALLER THREADS, EACH RESTORING A ONE-FACE IMAGE.
+REPORTS FACES PER SECOND FOR BOTH MODES AND THE BATCH SIZES ACHIEVED.
+FACES ARE PLACED ON A KNOWN GRID, SO NO DETECTOR WEIGHTS ARE NEEDED.
+
+USAGE (FROM BACKEND/, GFPGAN WEIGHTS REQUIRED):
+    python -m BENCHMARKS.face_batching --faces 6 --concurrency 4
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from APP.CORE.config import settings
+from APP.MODELS.batching import MicroBatcher
+from APP.MODELS.gfpgan import GFPGANWrapper
+from BENCHMARKS.common import grid_detections, make_test_image, measure, write_report
+
+
+def faces_per_second(stats: dict, faces: int) -> float:
+    return round(faces / (stats["mean_ms"] / 1000), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faces", type=int, default=6)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--batch-size", type=int, default=max(2, settings.GFPGAN_MAX_BATCH_SIZE))
+    parser.add_argument("--wait-ms", type=float, default=settings.GFPGAN_BATCH_WAIT_MS)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", type=str, default=None, help="OPTIONAL JSON REPORT PATH")
+    args = parser.parse_args()
+
+    gfpgan = GFPGANWrapper(model_path=settings.GFPGAN_MODEL_PATH, device=settings.DEVICE)
+    gfpgan.load()
+    batcher = MicroBatcher(gfpgan.restore_batch, args.batch_size, args.wait_ms, name="benchmark-batcher")
+
+    group_img = make_test_image(args.faces, args.size)
+    group_faces = grid_detections(args.faces, args.size)
+    single_img = make_test_image(1, args.size // 2)
+    single_face = grid_detections(1, args.size // 2)
+    pool = ThreadPoolExecutor(max_workers=args.concurrency)
+
+    def group_photo():
+        gfpgan.restore_detected(group_img, group_faces)
+
+    def concurrent():
+        list(pool.map(lambda _: gfpgan.restore_detected(single_img, single_face), range(args.concurrency)))
+
+    report = {"faces": args.faces, "concurrency": args.concurrency, "batch_size": args.batch_size}
+    batch_size = settings.GFPGAN_MAX_BATCH_SIZE
+    for mode, mode_batcher in (("per_face", None), ("batched", batcher)):
+        gfpgan.batcher = mode_batcher
+        # WITHOUT A BATCHER THE FACES OF ONE IMAGE ARE STILL BATCHED UP TO THIS SIZE
+        settings.GFPGAN_MAX_BATCH_SIZE = 1 if mode_batcher is None else batch_size
+        start_items, start_batches = batcher.counters["items"], batcher.counters["batches"]
+        started = time.perf_counter()
+
+        group_stats = measure(group_photo, args.repeats)
+        concurrent_stats = measure(concurrent, args.repeats)
+
+        report[mode] = {
+            "group_photo": {**group_stats, "faces_per_s": faces_per_second(group_stats, args.faces)},
+            "concurrent": {**concurrent_stats, "faces_per_s": faces_per_second(concurrent_stats, args.concurrency)},
+            "wall_s": round(time.perf_counter() - started, 2),
+        }
+        if mode_batcher is not None:
+            batches = batcher.counters["batches"] - start_batches
+            items = batcher.counters["items"] - start_items
+            report[mode]["mean_batch"] = round(items / batches, 2) if batches else 0.0
+
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+SHARED FACE DETECTION BENCHMARK.
+
+COMPARES THE DETECTOR WORK PER REQUEST:
+  LEGACY: GFPGANER RUNS FACEXLIB RETINAFACE (RESNET50) INSIDE enhance(), AND
+          IDENTITY SCORING VIA FaceAnalysis.get() RUNS THE INSIGHTFACE
+          DETECTOR AGAIN ON THE ORIGINAL AND ON THE RESTORED IMAGE.
+  SHARED: ONE INSIGHTFACE DETECTION FEEDS GFPGAN ALIGNMENT AND THE
+          RECOGNITION HEAD.
+
+USAGE (FROM BACKEND/, REAL WEIGHTS REQUIRED):
+    SHARED_FACE_DETECTION=false python -m BENCHMARKS.face_detection --faces 1 --size 800
+SHARED_FACE_DETECTION=false KEEPS GFPGAN'S RETINAFACE LOADED FOR THE LEGACY PATH.
+"""
+import argparse
+
+from APP.CORE.config import settings
+from APP.SERVICES.model_manager import model_manager
+from BENCHMARKS.common import make_test_image, measure, write_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faces", type=int, default=1)
+    parser.add_argument("--size", type=int, default=settings.MAX_INPUT_DIMENSION)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", type=str, default=None, help="OPTIONAL JSON REPORT PATH")
+    args = parser.parse_args()
+
+    if settings.SHARED_FACE_DETECTION:
+        parser.error("RUN WITH SHARED_FACE_DETECTION=false SO THE LEGACY DETECTOR STAYS LOADED")
+
+    model_manager.load_all_models()
+    gfpgan = model_manager.gfpgan
+    insightface = model_manager.insightface
+
+    img = make_test_image(args.faces, args.size)
+    detections = insightface.detect(img)
+    restored = gfpgan.predict(img, detections=detections)
+
+    # ---------------------------------------------------------
+    # DETECTORS IN ISOLATION
+    # ---------------------------------------------------------
+    retinaface = measure(lambda: gfpgan.model.face_helper.face_det.detect_faces(img, 0.97), args.repeats)
+    scrfd = measure(lambda: insightface.detect(img), args.repeats)
+
+    # ---------------------------------------------------------
+    # END-TO-END RESTORE + IDENTITY
+    # ---------------------------------------------------------
+    def legacy():
+        restored_img = gfpgan.predict(img)
+        insightface.get_embedding(img)
+        insightface.get_embedding(restored_img)
+
+    def shared():
+        found = insightface.detect(img)
+        restored_img = gfpgan.predict(img, detections=found)
+        insightface.get_batched_embeddings([(img, found.landmarks), (restored_img, found.landmarks)])
+
+    legacy_stats = measure(legacy, args.repeats)
+    shared_stats = measure(shared, args.repeats)
+
+    # LEGACY RUNS RETINAFACE ONCE AND THE INSIGHTFACE DETECTOR TWICE
+    legacy_detector_ms = retinaface["p50_ms"] + 2 * scrfd["p50_ms"]
+    shared_detector_ms = scrfd["p50_ms"]
+
+    write_report({
+        "image": {"size": args.size, "faces_requested": args.faces, "faces_detected": len(detections)},
+        "restored_shape": list(restored.shape),
+        "detector_ms": {
+            "retinaface_resnet50": retinaface,
+            "insightface_scrfd": scrfd,
+            "legacy_per_request": round(legacy_detector_ms, 2),
+            "shared_per_request": round(shared_detector_ms, 2),
+            "saved_per_request": round(legacy_detector_ms - shared_detector_ms, 2),
+        },
+        "end_to_end_ms": {
+            "legacy": legacy_stats,
+            "shared": shared_stats,
+            "saved_p50": round(legacy_stats["p50_ms"] - shared_stats["p50_ms"], 2),
+        },
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+FUSED RESTORE + UPSCALE BENCHMARK.
+
+COMPARES THE TWO ORDERINGS OF THE MODEL STAGES ON A DEGRADED IMAGE:
+  SEQUENTIAL: GFPGAN PASTES THE FACES AT 1x, THE UPSCALER RUNS ON THE RESULT.
+  FUSED:      THE UPSCALER RUNS ON THE INPUT, GFPGAN PASTES THE FACES AT THE
+              TARGET SCALE (FUSED_UPSCALE=true).
+  FUSED CONCURRENT: AS FUSED, WITH RESTORATION AND UPSCALING ON TWO THREADS
+              (AS THE DISPATCHER RUNS THEM; NEEDS MORE THAN ONE CORE TO GAIN).
+THE INPUT IS A --size PX make_test_image, DOWNSCALED BY --scale AND JPEG
+COMPRESSED; THE UNDEGRADED IMAGE IS THE GROUND TRUTH. REPORTS LATENCY (MS),
+PSNR / SSIM / LPIPS OF EACH AGAINST THE GROUND TRUTH AND OF FUSED AGAINST
+SEQUENTIAL. FACES ARE PLACED ON A KNOWN GRID, SO NO DETECTOR WEIGHTS ARE NEEDED.
+
+USAGE (FROM BACKEND/, GFPGAN AND UPSCALER WEIGHTS REQUIRED):
+    python -m BENCHMARKS.fused --size 512 --faces 1 4 --scale 2
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from APP.CORE.config import settings
+from APP.MODELS.realesrgan import UPSCALE_QUALITY_LEVELS
+from APP.SERVICES.model_manager import model_manager
+from APP.SERVICES.pipeline import RESTORE_WEIGHT
+from APP.UTILS.metrics import MetricsCalculator
+from BENCHMARKS.common import grid_detections, make_test_image, measure, write_report
+
+
+def degrade(img, scale: float, jpeg_quality: int):
+    """
+    DOWNSCALED BY `scale` AND JPEG COMPRESSED: THE KIND OF INPUT THE SERVICE ENHANCES.
+    """
+    height, width = img.shape[:2]
+    small = cv2.resize(img, (round(width / scale), round(height / scale)), interpolation=cv2.INTER_AREA)
+    _, encoded = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    return cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=512, help="GROUND TRUTH SIZE (PX)")
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--scale", type=float, default=2.0)
+    parser.add_argument("--quality", type=str, default=settings.DEFAULT_UPSCALE_QUALITY, choices=UPSCALE_QUALITY_LEVELS)
+    parser.add_argument("--jpeg-quality", type=int, default=60)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", type=str, default=None, help="OPTIONAL JSON REPORT PATH")
+    args = parser.parse_args()
+
+    model_manager.register_models()
+    upscaler_name = model_manager.select_upscaler(args.scale, args.quality)
+    gfpgan = model_manager.pool.load("gfpgan")
+    upscaler = model_manager.pool.load(f"upscaler:{upscaler_name}")
+    MetricsCalculator.get_lpips_model()
+
+    pool = ThreadPoolExecutor(max_workers=2)
+    report = {"size": args.size, "scale": args.scale, "upscaler": upscaler_name}
+    for faces in args.faces:
+        truth = make_test_image(faces, args.size)
+        img = degrade(truth, args.scale, args.jpeg_quality)
+        detections = grid_detections(faces, img.shape[0])
+
+        def sequential():
+            restored = gfpgan.restore_detected(img, detections, weight=RESTORE_WEIGHT)
+            return upscaler.predict(restored, outscale=args.scale)
+
+        def fused():
+            restoration = gfpgan.restore_faces(img, detections, weight=RESTORE_WEIGHT)
+            background = upscaler.predict(img, outscale=args.scale)
+            return gfpgan.paste_faces(restoration, background, scale=args.scale)
+
+        def fused_concurrent():
+            restoration = pool.submit(gfpgan.restore_faces, img, detections, weight=RESTORE_WEIGHT)
+            background = pool.submit(upscaler.predict, img, outscale=args.scale)
+            return gfpgan.paste_faces(restoration.result(), background.result(), scale=args.scale)
+
+        results = {}
+        outputs = {}
+        modes = (("sequential", sequential), ("fused", fused), ("fused_concurrent", fused_concurrent))
+        for mode, run in modes:
+            stats = measure(run, args.repeats)
+            output = outputs[mode] = run()
+            if output.shape != truth.shape:
+                output = cv2.resize(output, (truth.shape[1], truth.shape[0]), interpolation=cv2.INTER_AREA)
+            results[mode] = {**stats, "vs_ground_truth": MetricsCalculator.calculate_all(truth, output)}
+
+        for mode in ("fused", "fused_concurrent"):
+            results[mode]["speedup"] = round(results["sequential"]["mean_ms"] / results[mode]["mean_ms"], 3)
+        results["fused"]["vs_sequential"] = MetricsCalculator.calculate_all(outputs["sequential"], outputs["fused"])
+        report[f"{faces}_faces"] = results
+
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+QUALITY METRICS TIER BENCHMARK.
+
+MEASURES THE CRITICAL-PATH COST OF EACH METRICS MODE FOR AN INPUT OF --size PX
+AND ITS 2x OUTPUT:
+  FULL (NATIVE LPIPS): SKIMAGE PSNR / SSIM + LPIPS AT INPUT RESOLUTION (PREVIOUS BEHAVIOUR)
+  FULL:                SKIMAGE PSNR / SSIM + LPIPS DOWNSAMPLED TO METRICS_LPIPS_MAX_SIZE
+  FAST:                VECTORIZED PSNR / SSIM AT METRICS_FAST_SIZE
+  DEFERRED:            TIME TO HAND THE IMAGES TO THE BACKGROUND EVALUATOR
+  NONE:                0
+IDENTITY SCORING IS EXCLUDED (IT NEEDS THE INSIGHTFACE WEIGHTS; SEE face_detection).
+
+USAGE (FROM BACKEND/):
+    python -m BENCHMARKS.metrics --size 1024
+"""
+import argparse
+
+import cv2
+import numpy as np
+
+from APP.CORE.config import settings
+from APP.SERVICES.deferred_metrics import DeferredMetrics
+from APP.UTILS.metrics import MetricsCalculator
+from BENCHMARKS.common import make_test_image, measure, write_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=settings.MAX_INPUT_DIMENSION)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", type=str, default=None, help="OPTIONAL JSON REPORT PATH")
+    args = parser.parse_args()
+
+    original = make_test_image(1, args.size)
+    noise = np.random.default_rng(0).normal(0, 4, (args.size * 2, args.size * 2, 3))
+    output = cv2.resize(original, (args.size * 2, args.size * 2), interpolation=cv2.INTER_CUBIC)
+    output = np.clip(output + noise, 0, 255).astype(np.uint8)
+
+    # LOAD ALEXNET OUTSIDE THE TIMINGS
+    MetricsCalculator.get_lpips_model()
+
+    lpips_max_size = settings.METRICS_LPIPS_MAX_SIZE
+    settings.METRICS_LPIPS_MAX_SIZE = 0
+    full_native = measure(lambda: MetricsCalculator.calculate_all(original, output), args.repeats)
+    native_values = MetricsCalculator.calculate_all(original, output)
+    settings.METRICS_LPIPS_MAX_SIZE = lpips_max_size
+
+    full = measure(lambda: MetricsCalculator.calculate_all(original, output), args.repeats)
+    fast = measure(lambda: MetricsCalculator.calculate_fast(original, output), args.repeats)
+
+    # SUBMISSION ONLY: THE EVALUATION ITSELF RUNS AFTER THE RESPONSE
+    store = DeferredMetrics(max_pending=args.repeats * 4, ttl_seconds=60)
+    deferred = measure(lambda: store.submit(lambda: None), args.repeats)
+
+    write_report({
+        "input_size": args.size,
+        "output_size": args.size * 2,
+        "metrics_fast_size": settings.METRICS_FAST_SIZE,
+        "metrics_lpips_max_size": lpips_max_size,
+        "full_native_lpips": {**full_native, "values": native_values},
+        "full": {**full, "values": MetricsCalculator.calculate_all(original, output)},
+        "fast": {**fast, "values": MetricsCalculator.calculate_fast(original, output)},
+        "deferred": deferred,
+        "none": {"mean_ms": 0.0},
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
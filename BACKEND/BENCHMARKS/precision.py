@@ -0,0 +1,74 @@
+"""
+PRECISION MODE QUALITY / LATENCY REPORT.
+
+RUNS GFPGAN (ONE FACE, --size PX IMAGE) AND REAL-ESRGAN (2x OF THE RESTORED
+IMAGE) IN EVERY PRECISION MODE AND COMPARES EACH OUTPUT WITH THE FP32 OUTPUT
+USING THE SERVICE'S OWN PSNR / SSIM / LPIPS:
+  fp32: REFERENCE
+  bf16: AUTOCAST (NEEDS AVX512-BF16 / AMX FOR A SPEED-UP)
+  int8: DYNAMICALLY QUANTIZED ONNX (python -m SCRIPTS.export_onnx --int8)
+MODES THAT ARE UNAVAILABLE ON THIS MACHINE FALL BACK TO FP32 (SEE THE LOG).
+
+USAGE (FROM BACKEND/, WEIGHTS REQUIRED):
+    python -m BENCHMARKS.precision --size 256
+"""
+import argparse
+
+from APP.CORE.config import settings
+from APP.MODELS.backends import PRECISIONS, bf16_supported
+from APP.MODELS.gfpgan import GFPGANWrapper
+from APP.MODELS.realesrgan import RealESRGANWrapper
+from APP.UTILS.metrics import MetricsCalculator
+from BENCHMARKS.common import grid_detections, make_test_image, measure, write_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", type=str, default=None, help="OPTIONAL JSON REPORT PATH")
+    args = parser.parse_args()
+
+    gfpgan = GFPGANWrapper(model_path=settings.GFPGAN_MODEL_PATH, device=settings.DEVICE)
+    gfpgan.load()
+    gfpgan.batcher = None
+    realesrgan = RealESRGANWrapper(model_path=settings.REALESRGAN_MODEL_PATH, device=settings.DEVICE)
+    realesrgan.load()
+
+    img = make_test_image(1, args.size)
+    faces = grid_detections(1, args.size)
+    MetricsCalculator.get_lpips_model()
+
+    # EVERY MODE UPSCALES THE SAME (FP32-RESTORED) IMAGE
+    gfpgan.backend = gfpgan.build_backend("fp32")
+    restored = gfpgan.restore_detected(img, faces)
+
+    report = {"size": args.size, "device": settings.DEVICE, "bf16_supported": bf16_supported(gfpgan.device)}
+    reference = {}
+
+    for precision in PRECISIONS:
+        gfpgan.backend = gfpgan.build_backend(precision)
+        sr_backend = realesrgan.build_backend(precision)
+
+        outputs = {}
+
+        def restore():
+            outputs["gfpgan"] = gfpgan.restore_detected(img, faces)
+
+        def upscale():
+            outputs["realesrgan"], _ = realesrgan.tiler.upscale(restored, 2.0, network=sr_backend)
+
+        stages = {"gfpgan": measure(restore, args.repeats), "realesrgan": measure(upscale, args.repeats)}
+        if precision == "fp32":
+            reference = dict(outputs)
+
+        report[precision] = {
+            stage: {**stats, "vs_fp32": MetricsCalculator.calculate_all(reference[stage], outputs[stage])}
+            for stage, stats in stages.items()
+        }
+
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
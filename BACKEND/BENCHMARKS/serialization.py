@@ -0,0 +1,77 @@
+"""
+RESPONSE SERIALIZATION BENCHMARK.
+
+FOR EACH OUTPUT FORMAT / QUALITY, MEASURES ON AN ALREADY-UPSCALED IMAGE:
+  ENCODE: cv2 IMAGE ENCODING (SHARED BY BOTH RESPONSE MODES)
+  JSON:   BASE64 + PYDANTIC EnhancementResponse -> JSON BODY (ORIGINAL API)
+  BINARY: RAW BODY + X-METRIC-* HEADERS
+AND THE RESPONSE BODY SIZE OF EACH MODE. NO MODEL WEIGHTS REQUIRED.
+
+USAGE (FROM BACKEND/):
+    python -m BENCHMARKS.serialization --size 2560
+"""
+import argparse
+
+from APP.API.V1.ENDPOINTS.enhancement import build_binary_response, build_response
+from APP.CORE.config import settings
+from APP.SERVICES.image_utils import ImageUtils
+from BENCHMARKS.common import make_test_image, measure, write_report
+
+# (FORMAT, QUALITY) COMBINATIONS TO COMPARE
+CASES = [
+    ("jpeg", 95),
+    ("jpeg", 85),
+    ("webp", 90),
+    ("webp", 80),
+    ("png", None),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=settings.MAX_INPUT_DIMENSION * 2, help="OUTPUT IMAGE SIDE (PX)")
+    parser.add_argument("--faces", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", type=str, default=None, help="OPTIONAL JSON REPORT PATH")
+    args = parser.parse_args()
+
+    img = make_test_image(args.faces, args.size)
+    metrics = {
+        "psnr": 30.0,
+        "ssim": 0.9,
+        "lpips": 0.1,
+        "identity_score": 0.8,
+        "face_identity_scores": [{"box": [10.0, 10.0, 200.0, 200.0], "score": 0.8}] * args.faces,
+    }
+
+    results = []
+    for output_format, quality in CASES:
+        image_bytes = ImageUtils.encode_image(img, output_format, quality or 95)
+        result = {
+            "success": True,
+            "image_bytes": image_bytes,
+            "media_type": ImageUtils.media_type(output_format),
+            "metrics": metrics,
+            "peak_rss_mb": 0.0,
+        }
+
+        json_body = build_response(result, 0.0).model_dump_json().encode()
+        binary_body = build_binary_response(result, 0.0).body
+
+        results.append({
+            "format": output_format,
+            "quality": quality,
+            "image_bytes": len(image_bytes),
+            "json_body_bytes": len(json_body),
+            "binary_body_bytes": len(binary_body),
+            "json_overhead_pct": round(100 * (len(json_body) / len(binary_body) - 1), 1),
+            "encode": measure(lambda: ImageUtils.encode_image(img, output_format, quality or 95), args.repeats),
+            "json_serialize": measure(lambda: build_response(result, 0.0).model_dump_json(), args.repeats),
+            "binary_serialize": measure(lambda: build_binary_response(result, 0.0), args.repeats),
+        })
+
+    write_report({"size": args.size, "faces": args.faces, "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+OFFLINE PIPELINE BENCHMARK SUITE.
+
+RUNS EVERY CASE OF A GENERATED INPUT MATRIX:
+  --sizes    SQUARE IMAGE SIZES (PX), CAPPED AT MAX_INPUT_DIMENSION
+  --faces    FACES PER IMAGE (0 = BACKGROUND ONLY)
+  --formats  UPLOAD FORMAT (THE OUTPUT IS ENCODED IN THE SAME FORMAT)
+UNDER EVERY --threads SETTING (torch.set_num_threads), AND REPORTS:
+  PER-STAGE LATENCY (DECODE, DETECT, GFPGAN, REAL-ESRGAN, ENCODE)
+  END-TO-END EnhancementPipeline LATENCY, THROUGHPUT AND PEAK RSS AT EACH
+  --concurrency LEVEL (CALLER THREADS SHARING ONE SET OF MODELS)
+
+--baseline COMPARES THE RUN AGAINST A SAVED REPORT AND EXITS WITH STATUS 1 IF
+ANY LATENCY, THROUGHPUT OR PEAK RSS IS WORSE BY MORE THAN --tolerance.
+--compare SKIPS THE RUN AND COMPARES AN EXISTING REPORT INSTEAD.
+--synthetic-detections PLACES FACES ON make_test_image'S GRID INSTEAD OF
+RUNNING INSIGHTFACE (NO DETECTOR WEIGHTS NEEDED, NO DETECT STAGE).
+
+USAGE (FROM BACKEND/):
+    python -m BENCHMARKS.suite --sizes 256 512 --faces 0 1 4 --output baseline.json
+    python -m BENCHMARKS.suite --sizes 256 512 --faces 0 1 4 --baseline baseline.json
+    python -m BENCHMARKS.suite --compare current.json --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+from APP.CORE.config import settings
+from APP.SCHEMAS.enhancement import EnhancementOptions, MetricsMode, OutputFormat
+from APP.SERVICES.image_utils import ImageUtils
+from APP.SERVICES.model_manager import model_manager
+from APP.SERVICES.pipeline import RESTORE_WEIGHT, EnhancementPipeline
+from APP.UTILS.memory import PeakRSSMonitor
+from BENCHMARKS.common import grid_detections, make_test_image, measure, write_report
+
+# REPORT FIELDS COMPARED AGAINST THE BASELINE, AND WHETHER HIGHER IS BETTER
+COMPARED_FIELDS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "throughput_ips": True,
+    "peak_rss_mb": False,
+}
+
+# CHANGES BELOW THESE ARE NOISE, WHATEVER THEIR RELATIVE SIZE
+MIN_DELTA = {"p50_ms": 1.0, "p95_ms": 1.0, "throughput_ips": 0.01, "peak_rss_mb": 16.0}
+
+
+class GridDetector:
+    """
+    STANDS IN FOR INSIGHTFACE: RETURNS THE GRID make_test_image DREW FACES ON.
+    """
+
+    def __init__(self):
+        self.num_faces = 0
+
+    def detect(self, img):
+        return grid_detections(self.num_faces, img.shape[0])
+
+
+def case_id(threads: int, size: int, faces: int, image_format: str) -> str:
+    return f"t{threads}/{size}px/{faces}f/{image_format}"
+
+
+def encode_input(img: np.ndarray, image_format: str) -> bytes:
+    # MAXIMUM JPEG QUALITY: THE UPLOAD SHOULD LOOK LIKE THE GENERATED IMAGE
+    return ImageUtils.encode_image(img, image_format, 100)
+
+
+def measure_with_rss(fn, repeats: int) -> dict:
+    with PeakRSSMonitor() as memory:
+        stats = measure(fn, repeats, warmup=0)
+    return {**stats, "peak_rss_mb": memory.peak_mb}
+
+
+def run_concurrent(fn, concurrency: int, repeats: int) -> dict:
+    """
+    concurrency CALLER THREADS, repeats CALLS EACH. LATENCY IS PER CALL,
+    THROUGHPUT IS CALLS PER SECOND OF WALL TIME.
+    """
+    def timed(_):
+        start = time.perf_counter()
+        fn()
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        with PeakRSSMonitor() as memory:
+            started = time.perf_counter()
+            timings = np.array(list(pool.map(timed, range(concurrency * repeats))))
+            elapsed = time.perf_counter() - started
+
+    return {
+        "runs": len(timings),
+        "mean_ms": round(float(timings.mean()), 2),
+        "p50_ms": round(float(np.percentile(timings, 50)), 2),
+        "p95_ms": round(float(np.percentile(timings, 95)), 2),
+        "throughput_ips": round(len(timings) / elapsed, 3),
+        "peak_rss_mb": memory.peak_mb,
+    }
+
+
+def run_case(size: int, faces: int, image_format: str, args, detector) -> dict:
+    image_bytes = encode_input(make_test_image(faces, size), image_format)
+    options = EnhancementOptions(
+        output_format=OutputFormat(image_format),
+        metrics=MetricsMode(args.metrics),
+        scale=args.scale
+    )
+    if detector is not None:
+        detector.num_faces = faces
+
+    # ONE UNTIMED PASS: LAZY MODEL LOADS, ALLOCATOR AND ONEDNN WARM-UP
+    EnhancementPipeline.process_image(image_bytes, options)
+
+    img = EnhancementPipeline.decode_image(image_bytes)
+    detections = model_manager.detect_faces(img)
+    restored = model_manager.enhance_face(img, weight=RESTORE_WEIGHT, detections=detections)
+    upscaled = model_manager.upscale_image(restored, scale=args.scale)
+
+    stages = {
+        "decode": measure_with_rss(lambda: EnhancementPipeline.decode_image(image_bytes), args.repeats),
+        "gfpgan": measure_with_rss(
+            lambda: model_manager.enhance_face(img, weight=RESTORE_WEIGHT, detections=detections), args.repeats
+        ),
+        "realesrgan": measure_with_rss(lambda: model_manager.upscale_image(restored, scale=args.scale), args.repeats),
+        "encode": measure_with_rss(
+            lambda: ImageUtils.encode_image(upscaled, image_format, options.quality), args.repeats
+        ),
+    }
+    if detector is None:
+        stages["detect"] = measure_with_rss(lambda: model_manager.detect_faces(img), args.repeats)
+
+    pipeline = {
+        f"c{concurrency}": run_concurrent(
+            lambda: EnhancementPipeline.process_image(image_bytes, options), concurrency, args.repeats
+        )
+        for concurrency in args.concurrency
+    }
+
+    return {
+        "size": size,
+        "faces": faces,
+        "detected_faces": len(detections),
+        "format": image_format,
+        "input_bytes": len(image_bytes),
+        "stages": stages,
+        "pipeline": pipeline,
+    }
+
+
+# ---------------------------------------------------------
+# BASELINE COMPARISON
+# ---------------------------------------------------------
+def flatten(report: dict) -> dict:
+    """
+    {"<CASE>/<STAGE OR cN>/<FIELD>": VALUE} FOR EVERY COMPARED FIELD.
+    """
+    values = {}
+    for case, result in report.get("cases", {}).items():
+        for group in ("stages", "pipeline"):
+            for name, stats in result.get(group, {}).items():
+                for field in COMPARED_FIELDS:
+                    if field in stats:
+                        values[f"{case}/{name}/{field}"] = stats[field]
+    return values
+
+
+def compare_reports(current: dict, baseline: dict, tolerance: float) -> dict:
+    """
+    REGRESSIONS / IMPROVEMENTS BEYOND tolerance (RELATIVE) AND MIN_DELTA
+    (ABSOLUTE). ONLY KEYS PRESENT IN BOTH REPORTS ARE COMPARED.
+    """
+    current_values, baseline_values = flatten(current), flatten(baseline)
+    regressions, improvements = [], []
+
+    for key in sorted(current_values.keys() & baseline_values.keys()):
+        field = key.rsplit("/", 1)[1]
+        now, before = current_values[key], baseline_values[key]
+        if before == 0 or abs(now - before) < MIN_DELTA[field]:
+            continue
+
+        change = (now - before) / before
+        if abs(change) <= tolerance:
+            continue
+
+        entry = {"key": key, "baseline": before, "current": now, "change": round(change, 3)}
+        worse = change < 0 if COMPARED_FIELDS[field] else change > 0
+        (regressions if worse else improvements).append(entry)
+
+    return {
+        "tolerance": tolerance,
+        "compared": len(current_values.keys() & baseline_values.keys()),
+        "environment_changed": current.get("environment") != baseline.get("environment"),
+        "regressions": regressions,
+        "improvements": improvements,
+    }
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "cpu_count": os.cpu_count(),
+        "device": settings.DEVICE,
+        "max_input_dimension": settings.MAX_INPUT_DIMENSION,
+    }
+
+
+def load_report(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 512, settings.MAX_INPUT_DIMENSION])
+    parser.add_argument("--faces", type=int, nargs="+", default=[0, 1, 4])
+    parser.add_argument("--formats", nargs="+", choices=["jpeg", "png"], default=["jpeg", "png"])
+    parser.add_argument("--threads", type=int, nargs="+", default=[torch.get_num_threads()])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--scale", type=float, default=float(settings.DEFAULT_UPSCALE_FACTOR))
+    parser.add_argument("--metrics", choices=[mode.value for mode in MetricsMode], default=MetricsMode.NONE.value)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--synthetic-detections", action="store_true")
+    parser.add_argument("--baseline", type=str, default=None, help="SAVED REPORT TO COMPARE AGAINST")
+    parser.add_argument("--compare", type=str, default=None, help="COMPARE THIS REPORT INSTEAD OF RUNNING")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="ALLOWED RELATIVE SLOWDOWN (0.10 = 10%%)")
+    parser.add_argument("--output", type=str, default=None, help="OPTIONAL JSON REPORT PATH")
+    args = parser.parse_args()
+
+    if args.compare:
+        if not args.baseline:
+            parser.error("--compare REQUIRES --baseline")
+        comparison = compare_reports(load_report(args.compare), load_report(args.baseline), args.tolerance)
+        write_report(comparison, args.output)
+        raise SystemExit(1 if comparison["regressions"] else 0)
+
+    sizes = sorted({min(size, settings.MAX_INPUT_DIMENSION) for size in args.sizes})
+
+    detector = None
+    if args.synthetic_detections:
+        detector = GridDetector()
+        model_manager.pool.register("insightface", lambda: detector)
+    model_manager.load_all_models()
+
+    report = {
+        "environment": environment(),
+        "matrix": {
+            "sizes": sizes,
+            "faces": args.faces,
+            "formats": args.formats,
+            "threads": args.threads,
+            "concurrency": args.concurrency,
+            "scale": args.scale,
+            "metrics": args.metrics,
+            "repeats": args.repeats,
+            "synthetic_detections": args.synthetic_detections,
+            "upscaler": model_manager.select_upscaler(args.scale),
+        },
+        "cases": {},
+    }
+
+    default_threads = torch.get_num_threads()
+    try:
+        for threads in args.threads:
+            torch.set_num_threads(threads)
+            for size in sizes:
+                for faces in args.faces:
+                    for image_format in args.formats:
+                        key = case_id(threads, size, faces, image_format)
+                        print(f"RUNNING {key}...", flush=True)
+                        report["cases"][key] = {
+                            "threads": threads,
+                            **run_case(size, faces, image_format, args, detector),
+                        }
+    finally:
+        torch.set_num_threads(default_threads)
+
+    if args.baseline:
+        report["comparison"] = compare_reports(report, load_report(args.baseline), args.tolerance)
+
+    write_report(report, args.output)
+
+    if args.baseline and report["comparison"]["regressions"]:
+        print(f"{len(report['comparison']['regressions'])} REGRESSION(S) AGAINST {args.baseline}.")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
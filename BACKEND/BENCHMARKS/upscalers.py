@@ -0,0 +1,71 @@
+"""
+UPSCALER REGISTRY BENCHMARK.
+
+UPSCALES ONE --size PX IMAGE WITH EVERY REGISTERED UPSCALER WHOSE WEIGHTS ARE
+PRESENT, AT EACH --scales FACTOR IT CAN REACH, AND REPORTS:
+  LATENCY (MS) AND COST RELATIVE TO X4PLUS
+  PSNR / SSIM / LPIPS AGAINST THE X4PLUS OUTPUT (THE PREVIOUS PIPELINE)
+  WHICH MODEL THE SERVICE SELECTS FOR EACH (SCALE, UPSCALE QUALITY)
+
+USAGE (FROM BACKEND/):
+    python -m BENCHMARKS.upscalers --size 256 --scales 2 4
+"""
+import argparse
+
+from APP.CORE.config import settings
+from APP.MODELS.realesrgan import UPSCALE_QUALITY_LEVELS, UPSCALERS
+from APP.SERVICES.model_manager import model_manager
+from APP.UTILS.metrics import MetricsCalculator
+from BENCHMARKS.common import make_test_image, measure, write_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--scales", type=float, nargs="+", default=[2.0, 4.0])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", type=str, default=None, help="OPTIONAL JSON REPORT PATH")
+    args = parser.parse_args()
+
+    # EVERY UPSCALER WITH WEIGHTS, WHATEVER settings.UPSCALERS SAYS
+    settings.UPSCALERS = list(UPSCALERS)
+    model_manager.register_models()
+    for name in model_manager.upscaler_names:
+        model_manager.pool.load(f"upscaler:{name}")
+
+    img = make_test_image(1, args.size)
+    MetricsCalculator.get_lpips_model()
+    report = {"size": args.size, "models": sorted(model_manager.upscalers)}
+
+    for scale in args.scales:
+        reference = model_manager.upscalers["x4plus"].predict(img, outscale=scale)
+        x4plus_ms = None
+        results = {}
+
+        # X4PLUS FIRST: IT IS THE COST AND QUALITY REFERENCE
+        for name in sorted(model_manager.upscalers, key=lambda n: n != "x4plus"):
+            upscaler = model_manager.upscalers[name]
+            if upscaler.spec.scale < scale:
+                continue
+
+            stats = measure(lambda: upscaler.predict(img, outscale=scale), args.repeats)
+            x4plus_ms = x4plus_ms or stats["mean_ms"]
+            output = upscaler.predict(img, outscale=scale)
+            results[name] = {
+                **stats,
+                "relative_cost": round(stats["mean_ms"] / x4plus_ms, 3),
+                "vs_x4plus": MetricsCalculator.calculate_all(reference, output),
+            }
+
+        report[f"{scale:g}x"] = {
+            "selected": {
+                quality: model_manager.select_upscaler(scale, quality) for quality in UPSCALE_QUALITY_LEVELS
+            },
+            "models": results,
+        }
+
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
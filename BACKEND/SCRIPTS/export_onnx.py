@@ -0,0 +1,163 @@
+"""
+EXPORTS THE GFPGAN AND REAL-ESRGAN NETWORKS FOR THE NON-EAGER BACKENDS.
+
+WRITES <WEIGHTS>.onnx (AND <WEIGHTS>.ts WITH --torchscript) NEXT TO EACH .pth,
+WHERE THE SERVICE LOOKS FOR THEM WHEN GFPGAN_BACKEND / REALESRGAN_BACKEND
+SELECT onnxruntime / torchscript.
+  GFPGAN:      FIXED 1x3x512x512. THE STYLEGAN DECODER'S MODULATED CONVS USE
+               PER-SAMPLE WEIGHTS (GROUPED CONV OVER THE BATCH), WHICH THE
+               ONNX EXPORTER CANNOT EXPRESS WITH A SYMBOLIC BATCH; THE RUNTIME
+               LOOPS OVER BATCHED CROPS INSTEAD
+  UPSCALERS:   DYNAMIC BATCH, HEIGHT AND WIDTH (ANY TILE SIZE). EVERY
+               REGISTERED UPSCALER (x4plus, x2plus, general-x4v3) WHOSE
+               WEIGHTS ARE PRESENT IS EXPORTED BY DEFAULT
+--int8 ALSO WRITES <WEIGHTS>.int8.onnx (DYNAMIC INT8 WEIGHT QUANTIZATION)
+FOR THE int8 PRECISION MODE.
+--verify RUNS EACH EXPORT AGAINST THE EAGER MODEL ON RANDOM INPUTS AND FAILS
+IF THE MAX ABSOLUTE DIFFERENCE EXCEEDS --tolerance (--int8-tolerance FOR INT8).
+THE SERVICE REPEATS A ONE-INPUT CHECK WHENEVER IT LOADS AN EXPORTED MODEL
+(BACKEND_PARITY_CHECK).
+
+USAGE (FROM BACKEND/):
+    python -m SCRIPTS.export_onnx --verify
+"""
+import argparse
+import os
+import sys
+from typing import List, Tuple
+
+import torch
+
+from APP.CORE.config import settings
+from APP.CORE.logging import logger
+from APP.MODELS.backends import artifact_path, create_backend, max_abs_diff, trace_module
+from APP.MODELS.gfpgan import GFPGANInferenceModule, GFPGANWrapper
+from APP.MODELS.realesrgan import UPSCALERS, RealESRGANWrapper
+
+MODEL_NAMES = ["gfpgan", *UPSCALERS]
+
+
+def load_network(name: str, device: torch.device) -> Tuple[torch.nn.Module, str, dict, int, List[tuple]]:
+    """
+    (EAGER MODULE, WEIGHTS PATH, ONNX DYNAMIC AXES, STATIC BATCH, VERIFICATION SHAPES).
+    """
+    if name == "gfpgan":
+        gfpgan = GFPGANWrapper(model_path=settings.GFPGAN_MODEL_PATH, device=str(device))
+        gfpgan.load()
+        return (
+            GFPGANInferenceModule(gfpgan.model.gfpgan).eval(),
+            settings.GFPGAN_MODEL_PATH,
+            None,
+            1,
+            [(1, 3, 512, 512), (2, 3, 512, 512)],
+        )
+
+    upscaler = RealESRGANWrapper(model_path=UPSCALERS[name].model_path, device=str(device), name=name)
+    upscaler.load()
+    return (
+        upscaler.model.model.float().eval(),
+        upscaler.model_path,
+        {"input": {0: "batch", 2: "height", 3: "width"}, "output": {0: "batch", 2: "height", 3: "width"}},
+        None,
+        [(1, 3, 64, 64), (2, 3, 48, 80)],
+    )
+
+
+def export_onnx(module: torch.nn.Module, example_shape: tuple, path: str, dynamic_axes: dict, opset: int):
+    example = torch.rand(*example_shape, device=next(module.parameters()).device)
+    with torch.no_grad():
+        torch.onnx.export(
+            module, example, path,
+            input_names=["input"],
+            output_names=["output"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True,
+            dynamo=False
+        )
+    logger.info(f"WROTE {path}")
+
+
+def export_int8(onnx_path: str, path: str):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(onnx_path, path, weight_type=QuantType.QInt8)
+    logger.info(f"WROTE {path}")
+
+
+def export_torchscript(module: torch.nn.Module, example_shape: tuple, path: str, device: torch.device):
+    torch.jit.save(trace_module(module, example_shape, device), path)
+    logger.info(f"WROTE {path}")
+
+
+def verify(name: str, module: torch.nn.Module, path: str, backend_name: str, static_batch: int,
+           shapes: List[tuple], device: torch.device, tolerance: float, label: str = None) -> bool:
+    """
+    COMPARES THE EXPORTED MODEL WITH THE EAGER ONE (OUTPUTS IN [-1, 1]).
+    """
+    label = label or backend_name
+    backend = create_backend(backend_name, module, device, path=path, static_batch=static_batch)
+    reference = create_backend("torch", module, device)
+    passed = True
+
+    for shape in shapes:
+        diff = max_abs_diff(backend, reference, shape)
+        ok = diff <= tolerance
+        passed = passed and ok
+        logger.info(f"PARITY {name} / {label} {shape}: MAX ABS DIFF {diff:.2e} {'OK' if ok else 'FAILED'}")
+
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", choices=MODEL_NAMES, default=None,
+                        help="DEFAULT: GFPGAN AND EVERY UPSCALER WITH WEIGHTS")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--torchscript", action="store_true", help="ALSO WRITE TRACED .ts MODULES")
+    parser.add_argument("--int8", action="store_true", help="ALSO WRITE DYNAMICALLY QUANTIZED .int8.onnx MODELS")
+    parser.add_argument("--verify", action="store_true", help="CHECK PARITY WITH THE EAGER MODELS")
+    parser.add_argument("--tolerance", type=float, default=settings.BACKEND_PARITY_TOLERANCE)
+    parser.add_argument("--int8-tolerance", type=float, default=settings.BACKEND_PARITY_TOLERANCE_INT8)
+    args = parser.parse_args()
+
+    # EXPORT ON THE CPU IN FP32; THE RUNTIME PICKS THE EXECUTION PROVIDER
+    device = torch.device("cpu")
+    models = args.models or [
+        name for name in MODEL_NAMES
+        if name == "gfpgan" or os.path.exists(UPSCALERS[name].model_path)
+    ]
+    passed = True
+
+    for name in models:
+        module, weights_path, dynamic_axes, static_batch, shapes = load_network(name, device)
+        backends = ["onnxruntime"] + (["torchscript"] if args.torchscript else [])
+
+        for backend_name in backends:
+            path = artifact_path(weights_path, backend_name)
+            if backend_name == "onnxruntime":
+                export_onnx(module, shapes[0], path, dynamic_axes, args.opset)
+            else:
+                export_torchscript(module, shapes[0], path, device)
+
+            if args.verify:
+                passed = verify(
+                    name, module, path, backend_name, static_batch, shapes, device, args.tolerance
+                ) and passed
+
+            if backend_name == "onnxruntime" and args.int8:
+                int8_path = artifact_path(weights_path, backend_name, "int8")
+                export_int8(path, int8_path)
+                if args.verify:
+                    passed = verify(
+                        name, module, int8_path, backend_name, static_batch, shapes, device,
+                        args.int8_tolerance, label="onnxruntime int8"
+                    ) and passed
+
+    if not passed:
+        logger.error(f"PARITY CHECK FAILED (TOLERANCE {args.tolerance})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+LOAD GENERATOR FOR THE ENHANCEMENT API.
+
+POSTS IMAGES TO /api/v1/images/enhance AT A FIXED --rate (REQUESTS PER
+SECOND) FOR --duration SECONDS AND REPORTS:
+  LATENCY p50 / p90 / p95 / p99 / MAX OF SUCCESSFUL REQUESTS
+  ACHIEVED THROUGHPUT AND THE COUNT OF EVERY RESPONSE STATUS
+  REJECTION RATE (ANY NON-200 RESPONSE) AND ERROR RATE (TIMEOUTS, RESETS)
+  MEAN SERVER-SIDE STAGE DURATIONS (FROM THE Server-Timing HEADER)
+  WORKER RSS, SAMPLED FROM /memory (PEAK PER WORKER PID)
+
+THE LOAD IS OPEN-LOOP: REQUEST i IS DUE AT i / --rate WHETHER OR NOT EARLIER
+ONES HAVE ANSWERED, AND ITS LATENCY COUNTS FROM THAT DUE TIME (A SATURATED
+CLIENT DOES NOT HIDE SERVER QUEUEING). EVERY REQUEST UPLOADS A DIFFERENT
+IMAGE, SO THE RESULT CACHE ANSWERS NONE OF THEM (--same-image TO TEST IT).
+
+WITHOUT WEIGHTS, START THE SERVER WITH THE STUB MODELS (SEE STUB_* SETTINGS):
+    STUB_MODELS=true MAX_CONCURRENT_REQUESTS=2 gunicorn -c gunicorn.conf.py APP.main:app
+
+USAGE (FROM BACKEND/):
+    python -m SCRIPTS.load_test --url http://localhost:8000 --rate 2 --duration 60
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+import cv2
+import numpy as np
+
+ENHANCE_PATH = "/api/v1/images/enhance"
+
+
+class Target:
+    """
+    HOST / PORT OF THE SERVER UNDER TEST. ONE CONNECTION PER REQUEST.
+    """
+
+    def __init__(self, url: str, timeout: float):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, body: bytes = None, headers: dict = None):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            return response.status, response.getheaders(), response.read()
+        finally:
+            connection.close()
+
+
+def make_images(count: int, size: int, image_format: str) -> list:
+    """
+    `count` DISTINCT ENCODED UPLOADS: ONE NOISY BACKGROUND, EACH WITH ITS
+    INDEX DRAWN IN THE CORNER (LARGE ENOUGH TO SURVIVE JPEG QUANTIZATION).
+    """
+    rng = np.random.default_rng(0)
+    base = cv2.GaussianBlur(rng.integers(60, 190, size=(size, size, 3), dtype=np.uint8), (0, 0), 3)
+    extension = ".png" if image_format == "png" else ".jpg"
+
+    images = []
+    for index in range(count):
+        img = base.copy()
+        cv2.putText(img, str(index), (4, 24), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        images.append(cv2.imencode(extension, img)[1].tobytes())
+    return images
+
+
+def multipart_body(image_bytes: bytes, image_format: str) -> tuple:
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="load.{image_format}"\r\n'
+        f"Content-Type: image/{image_format}\r\n\r\n"
+    ).encode()
+    body = head + image_bytes + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def parse_server_timing(value: str) -> dict:
+    """
+    "decode;dur=1.2, gfpgan;dur=950.0" -> {"decode": 1.2, "gfpgan": 950.0}
+    """
+    stages = {}
+    for entry in value.split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, number = param.strip().partition("=")
+            if key == "dur":
+                stages[name] = float(number)
+    return stages
+
+
+def wait_until_ready(target: Target, timeout: float):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if target.request("GET", "/ready")[0] == 200:
+                return
+        except OSError:
+            pass
+        if time.monotonic() > deadline:
+            raise SystemExit(f"SERVER NOT READY AFTER {timeout:.0f}s")
+        time.sleep(1.0)
+
+
+class MemorySampler:
+    """
+    POLLS /memory IN THE BACKGROUND. WITH SEVERAL WORKERS EACH POLL IS
+    ANSWERED BY ONE OF THEM, SO PEAKS ARE KEPT PER PID.
+    """
+
+    def __init__(self, target: Target, interval: float):
+        self.target = target
+        self.interval = interval
+        self.peak_rss_mb = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            try:
+                status, _, body = self.target.request("GET", "/memory")
+            except OSError:
+                continue
+            if status != 200:
+                continue
+            stats = json.loads(body)
+            pid = str(stats["pid"])
+            self.peak_rss_mb[pid] = max(self.peak_rss_mb.get(pid, 0.0), stats.get("rss_mb", 0.0))
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {}
+    values = np.array(values)
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 1),
+        "p90_ms": round(float(np.percentile(values, 90)), 1),
+        "p95_ms": round(float(np.percentile(values, 95)), 1),
+        "p99_ms": round(float(np.percentile(values, 99)), 1),
+        "max_ms": round(float(values.max()), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", type=str, default="http://localhost:8000")
+    parser.add_argument("--rate", type=float, default=1.0, help="REQUESTS PER SECOND")
+    parser.add_argument("--duration", type=float, default=30.0, help="SECONDS OF LOAD")
+    parser.add_argument("--size", type=int, default=512, help="UPLOAD SIZE (PX)")
+    parser.add_argument("--format", choices=["jpeg", "png"], default="jpeg")
+    parser.add_argument("--scale", type=float, default=None)
+    parser.add_argument("--metrics", type=str, default="none")
+    parser.add_argument("--same-image", action="store_true", help="UPLOAD ONE IMAGE (RESULT CACHE HITS)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="CLIENT TIMEOUT PER REQUEST (S)")
+    parser.add_argument("--max-connections", type=int, default=64)
+    parser.add_argument("--memory-interval", type=float, default=1.0)
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    parser.add_argument("--output", type=str, default=None, help="OPTIONAL JSON REPORT PATH")
+    args = parser.parse_args()
+
+    target = Target(args.url, args.timeout)
+    wait_until_ready(target, args.ready_timeout)
+
+    total = max(1, int(args.rate * args.duration))
+    images = make_images(1 if args.same_image else total, args.size, args.format)
+    query = {"response_format": "binary", "output_format": "jpeg", "metrics": args.metrics}
+    if args.scale is not None:
+        query["scale"] = args.scale
+    path = f"{ENHANCE_PATH}?{urlencode(query)}"
+
+    statuses = Counter()
+    latencies = []
+    stage_totals = defaultdict(float)
+    lock = threading.Lock()
+
+    def send(index: int, due: float):
+        body, content_type = multipart_body(images[index % len(images)], args.format)
+        try:
+            status, headers, _ = target.request("POST", path, body, {"Content-Type": content_type})
+        except (OSError, http.client.HTTPException) as e:
+            status, headers = type(e).__name__, []
+        latency_ms = (time.perf_counter() - due) * 1000
+
+        with lock:
+            statuses[str(status)] += 1
+            if status == 200:
+                latencies.append(latency_ms)
+                for name, value in headers:
+                    if name.lower() == "server-timing":
+                        for stage, ms in parse_server_timing(value).items():
+                            stage_totals[stage] += ms
+
+    print(f"SENDING {total} REQUESTS AT {args.rate:g}/s TO {args.url}...", flush=True)
+    with MemorySampler(target, args.memory_interval) as memory:
+        with ThreadPoolExecutor(max_workers=args.max_connections) as pool:
+            started = time.perf_counter()
+            for index in range(total):
+                due = started + index / args.rate
+                time.sleep(max(0.0, due - time.perf_counter()))
+                pool.submit(send, index, due)
+        elapsed = time.perf_counter() - started
+
+    succeeded = statuses.get("200", 0)
+    errors = sum(count for status, count in statuses.items() if not status.isdigit())
+    report = {
+        "target_rate": args.rate,
+        "requests": total,
+        "elapsed_s": round(elapsed, 1),
+        "throughput_rps": round(succeeded / elapsed, 3),
+        "statuses": dict(statuses),
+        "rejection_rate": round((total - succeeded - errors) / total, 4),
+        "error_rate": round(errors / total, 4),
+        "latency": percentiles(latencies),
+        "server_timing_mean_ms": {
+            stage: round(value / succeeded, 1) for stage, value in stage_totals.items()
+        },
+        "peak_rss_mb": memory.peak_rss_mb,
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
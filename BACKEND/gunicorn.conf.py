@@ -0,0 +1,74 @@
+# =========================
+# GUNICORN CONFIGURATION
+# WORKERS: SET VIA WEB_CONCURRENCY (DEFAULTS TO 1)
+# PRELOAD: SET PRELOAD_MODELS=true TO LOAD THE PYTORCH WEIGHTS ONCE IN THE
+# MASTER AND SHARE THEM COPY-ON-WRITE WITH EVERY FORKED WORKER
+# STATE: ASYNC JOBS (/images/jobs) AND DEFERRED METRICS (/images/metrics)
+# LIVE IN THE MEMORY OF THE WORKER THAT ACCEPTED THEM. WITH SEVERAL WORKERS A
+# POLL ANSWERED BY ANOTHER WORKER RETURNS 404, SO THOSE APIS NEED ONE WORKER
+# (OR A LOAD BALANCER WITH STICKY SESSIONS IN FRONT OF SINGLE-WORKER PROCESSES)
+# =========================
+import os
+
+from APP.CORE.config import settings
+
+bind = "0.0.0.0:8000"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+
+# LONG REQUEST TIMEOUT (10 MIN)
+timeout = 600
+
+# IMPORT THE APP IN THE MASTER SO WORKERS INHERIT ITS MODULES AS WELL
+preload_app = settings.PRELOAD_MODELS
+
+
+def on_starting(server):
+    if workers > 1:
+        server.log.warning(
+            f"{workers} WORKERS: JOB AND DEFERRED METRICS STATE IS PER WORKER. "
+            f"GET /images/jobs/{{id}} AND /images/metrics/{{id}} RETURN 404 WHEN ANOTHER "
+            f"WORKER ANSWERS THE POLL. USE WEB_CONCURRENCY=1 FOR THOSE APIS."
+        )
+        if settings.DEFAULT_METRICS_MODE == "deferred":
+            server.log.warning("DEFAULT_METRICS_MODE=deferred WITH SEVERAL WORKERS: METRICS POLLS MAY 404.")
+
+    if not settings.PRELOAD_MODELS:
+        return
+
+    from APP.SERVICES.model_manager import model_manager
+    from APP.UTILS.memory import read_memory_stats, format_memory_stats
+
+    try:
+        model_manager.preload_for_fork()
+    except Exception as e:
+        # WORKERS WILL RETRY THE LOAD IN THEIR OWN LIFESPAN
+        server.log.error(f"PRELOAD FAILED: {e}")
+        return
+
+    server.log.info(f"MASTER MEMORY AFTER PRELOAD: {format_memory_stats(read_memory_stats())}")
+
+
+def post_fork(server, worker):
+    # SPLIT THE CORES BETWEEN WORKERS, THEN EACH WORKER'S SHARE BETWEEN ITS
+    # MODEL SLOTS (THREAD BUDGET). THIS ALSO MATTERS FOR PRELOAD MODE:
+    # PYTORCH RESETS A FORKED CHILD TO 1 INTRA-OP THREAD IF THE MASTER
+    # ALREADY STARTED ITS THREAD POOL WHILE LOADING WEIGHTS
+    from APP.SERVICES.thread_budget import available_cpus, thread_budget
+
+    thread_budget.share_cores(len(available_cpus()) // workers)
+    thread_budget.apply()
+
+
+def child_exit(server, worker):
+    # DROP THE DEAD WORKER'S LIVE GAUGES FROM THE SHARED PROMETHEUS FILES
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    from APP.UTILS.memory import read_memory_stats, format_memory_stats
+
+    worker.log.info(f"WORKER BOOTED. {format_memory_stats(read_memory_stats())}")
@@ -41,6 +41,10 @@ export default function MetricsPanel({ metrics }: MetricsPanelProps) {
     return "text-white";
   };
 
+  // NOT COMPUTED (FAST MODE) OR NO FACE MATCHED
+  const formatScore = (value: number | null, digits: number) =>
+    value == null ? "N/A" : value.toFixed(digits);
+
   const items = [
     {
       label: "PSNR (DB)",
@@ -58,16 +62,19 @@ export default function MetricsPanel({ metrics }: MetricsPanelProps) {
     },
     {
       label: "LPIPS",
-      value: metrics.lpips.toFixed(3),
+      value: formatScore(metrics.lpips, 3),
       icon: Activity,
-      color: getScoreColor(metrics.lpips, "lpips"),
+      color: metrics.lpips == null ? "text-muted-foreground" : getScoreColor(metrics.lpips, "lpips"),
       desc: "PERCEPTUAL ERROR",
     },
     {
       label: "IDENTITY",
-      value: metrics.identity_score.toFixed(3),
+      value: formatScore(metrics.identity_score, 3),
       icon: Fingerprint,
-      color: getScoreColor(metrics.identity_score, "identity"),
+      color:
+        metrics.identity_score == null
+          ? "text-muted-foreground"
+          : getScoreColor(metrics.identity_score, "identity"),
       desc: "FACE VERIFICATION",
     },
   ];
@@ -21,13 +21,19 @@ export default function ResultViewer({
   const getResultSrc = () => {
     if (result.image_base64.startsWith("data:image"))
       return result.image_base64;
-    return `data:image/jpeg;base64,${result.image_base64}`;
+    return `data:${result.media_type ?? "image/jpeg"};base64,${result.image_base64}`;
+  };
+
+  // FILE EXTENSION MATCHING THE RETURNED FORMAT
+  const getExtension = () => {
+    const subtype = (result.media_type ?? "image/jpeg").split("/")[1];
+    return subtype === "jpeg" ? "jpg" : subtype;
   };
 
   const handleDownload = () => {
     const link = document.createElement("a");
     link.href = getResultSrc();
-    link.download = `RESTORED_FACE_${Date.now()}.jpg`;
+    link.download = `RESTORED_FACE_${Date.now()}.${getExtension()}`;
     document.body.appendChild(link);
     link.click();
     document.body.removeChild(link);
@@ -48,12 +54,14 @@ export default function ResultViewer({
       </div>
 
       {/* 2. METRICS PANEL */}
-      <div className="space-y-2">
-        <h3 className="text-sm font-bold text-muted-foreground uppercase tracking-widest pl-1">
-          RESTORATION ANALYTICS
-        </h3>
-        <MetricsPanel metrics={result.metrics} />
-      </div>
+      {result.metrics && (
+        <div className="space-y-2">
+          <h3 className="text-sm font-bold text-muted-foreground uppercase tracking-widest pl-1">
+            RESTORATION ANALYTICS
+          </h3>
+          <MetricsPanel metrics={result.metrics} />
+        </div>
+      )}
 
       {/* 3. ACTION BUTTONS */}
       <div className="flex flex-col sm:flex-row gap-4 pt-4 border-t border-border">
@@ -1,15 +1,25 @@
+export interface FaceIdentityScore {
+  box: number[];
+  score: number;
+}
+
 export interface EnhancementMetrics {
   psnr: number;
   ssim: number;
-  lpips: number;
-  identity_score: number;
+  // NULL IN FAST METRICS MODE / WHEN NO FACE WAS MATCHED
+  lpips: number | null;
+  identity_score: number | null;
+  face_identity_scores?: FaceIdentityScore[];
 }
 
 export interface EnhancementResponse {
   success: boolean;
   message: string;
   image_base64: string; 
-  metrics: EnhancementMetrics;
+  media_type?: string;
+  // NULL IN NONE / DEFERRED METRICS MODE
+  metrics: EnhancementMetrics | null;
+  metrics_id?: string | null;
   processing_time_ms: number;
 }
 
@@ -29,6 +29,17 @@ else
     echo "✅ REAL-ESRGAN WEIGHTS FOUND."
 fi
 
+# OPTIONAL LIGHTER UPSCALERS (PICKED PER REQUEST BY SCALE / UPSCALE QUALITY)
+if [ ! -f "weights/RealESRGAN_x2plus.pth" ]; then
+    echo "⬇️ DOWNLOADING REAL-ESRGAN X2PLUS WEIGHTS..."
+    wget -q --show-progress https://github.com/xinntao/Real-ESRGAN/releases/download/v0.2.1/RealESRGAN_x2plus.pth -P weights/
+fi
+
+if [ ! -f "weights/realesr-general-x4v3.pth" ]; then
+    echo "⬇️ DOWNLOADING REAL-ESRGAN GENERAL-X4V3 WEIGHTS..."
+    wget -q --show-progress https://github.com/xinntao/Real-ESRGAN/releases/download/v0.2.5.0/realesr-general-x4v3.pth -P weights/
+fi
+
 # 3. BUILD AND RUN CONTAINERS
 echo "🐳 BUILDING CONTAINERS..."
 